@@ -193,12 +193,14 @@ CHANNEL_LAYERS = {
 # Cache (for rate limiting and general caching)
 # Gracefully falls back to in-memory cache if Redis is unavailable
 
+# Redis database 1 holds the cache and the rapid-bidding windows (database 0 is for Channels)
+REDIS_CACHE_URL = f"redis://{os.environ.get('REDIS_HOST', '127.0.0.1')}:6379/1"
+
 def test_redis_connection():
     """Test if Redis is available and accessible"""
     try:
         import redis
-        redis_host = os.environ.get('REDIS_HOST', '127.0.0.1')
-        r = redis.Redis(host=redis_host, port=6379, db=1, socket_connect_timeout=2)
+        r = redis.Redis.from_url(REDIS_CACHE_URL, socket_connect_timeout=2)
         r.ping()
         return True
     except Exception:
@@ -219,7 +221,7 @@ if USE_REDIS:
     CACHES = {
         "default": {
             "BACKEND": "django.core.cache.backends.redis.RedisCache",
-            "LOCATION": f"redis://{os.environ.get('REDIS_HOST', '127.0.0.1')}:6379/1",
+            "LOCATION": REDIS_CACHE_URL,
             "OPTIONS": {
                 "db": "1",  # Use database 1 for cache (database 0 for Channels)
             },
@@ -237,6 +239,14 @@ else:
     }
     print("⚠ Redis unavailable, using LocMemCache fallback")
 
+# Sessions
+# Store sessions in Redis when it is available so session reads/writes (pending
+# bids, CAPTCHA flags) don't hit the django_session table on every request.
+# LocMemCache is per-process, so without Redis keep the default database backend.
+if USE_REDIS:
+    SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cache')
+    SESSION_CACHE_ALIAS = 'default'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -330,6 +340,20 @@ TIMING_PATTERN_LATE_RATIO_THRESHOLD = config('TIMING_PATTERN_LATE_RATIO_THRESHOL
 COLLUSIVE_COMMON_ITEMS_THRESHOLD = config('COLLUSIVE_COMMON_ITEMS_THRESHOLD', default=5, cast=int)
 COLLUSIVE_SUSPICIOUS_PAIRS_THRESHOLD = config('COLLUSIVE_SUSPICIOUS_PAIRS_THRESHOLD', default=2, cast=int)
 
+# Non-blocking bid heuristics run after the response in a background thread pool
+FRAUD_ANALYSIS_ASYNC = config('FRAUD_ANALYSIS_ASYNC', default=True, cast=bool)
+FRAUD_ANALYSIS_WORKERS = config('FRAUD_ANALYSIS_WORKERS', default=2, cast=int)
+# A critical result from that analysis cools the bidder down on the item (seconds)
+FRAUD_CRITICAL_COOLDOWN_DURATION = config('FRAUD_CRITICAL_COOLDOWN_DURATION', default=3600, cast=int)
+
+# Admin dashboard and fraud alert pages run their independent stats queries on this many shared threads
+ADMIN_STATS_WORKERS = config('ADMIN_STATS_WORKERS', default=5, cast=int)
+
+# Provider calls for redirect-based checkout payments run in background thread pools,
+# one per gateway (created on first use) with PAYMENT_INIT_WORKERS threads each
+PAYMENT_INIT_ASYNC = config('PAYMENT_INIT_ASYNC', default=True, cast=bool)
+PAYMENT_INIT_WORKERS = config('PAYMENT_INIT_WORKERS', default=4, cast=int)
+
 FAILED_PAYMENT_WINDOW_DAYS = config('FAILED_PAYMENT_WINDOW_DAYS', default=30, cast=int)
 FAILED_PAYMENT_THRESHOLD = config('FAILED_PAYMENT_THRESHOLD', default=3, cast=int)
 
@@ -1,13 +1,18 @@
 from django.contrib import admin
-from .models import Category, Item, Bid, Cart, CartItem, Review, TransactionLog, FraudAlert, Country, BidCooldown
+from .models import Category, Item, ItemImage, Bid, Cart, CartItem, Review, TransactionLog, FraudAlert, Country, BidCooldown
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'created_at']
     search_fields = ['name']
 
+class ItemImageInline(admin.TabularInline):
+    model = ItemImage
+    extra = 1
+
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
+    inlines = [ItemImageInline]
     list_display = ['title', 'seller', 'category', 'current_price', 'status', 'end_time']
     list_filter = ['status', 'category', 'created_at']
     search_fields = ['title', 'description']
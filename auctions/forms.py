@@ -212,3 +212,16 @@ class ReviewForm(forms.ModelForm):
         if len(comment) < 10:
             raise forms.ValidationError('Please write at least 10 characters.')
         return comment
+
+class HomeFilterForm(forms.Form):
+    """Parses the home page price range once into Decimals for the current_price filter"""
+    min_price = forms.DecimalField(required=False, max_digits=12, decimal_places=2)
+    max_price = forms.DecimalField(required=False, max_digits=12, decimal_places=2)
+    
+    def price_range(self):
+        min_price = self.cleaned_data.get('min_price')
+        max_price = self.cleaned_data.get('max_price')
+        return (
+            Decimal('0') if min_price is None else min_price,
+            Decimal('10000000') if max_price is None else max_price,
+        )
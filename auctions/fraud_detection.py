@@ -4,7 +4,7 @@ from datetime import timedelta
 from django.utils import timezone
 from django.db.models import Count, Sum, Avg, Q
 from django.contrib.auth.models import User
-from .models import Bid, Item, FraudAlert
+from .models import Bid, BidCooldown, Item, FraudAlert
 from payments.models import Payment
 import openai
 from django.conf import settings
@@ -28,23 +28,60 @@ class FraudDetectionService:
         Implements research-backed detection patterns achieving 95%+ accuracy.
         Returns list of FraudAlert objects if suspicious activity detected.
         """
+        alerts = self.analyze_bid_critical(bid)
+        alerts.extend(self.analyze_bid_deferred(bid, alerts))
+        return alerts
+    
+    def analyze_bid_critical(self, bid):
+        """
+        Run only the checks that can raise critical alerts and block a bid.
+        Cheap enough to run in the request; everything else is deferred.
+        """
+        alerts = []
+        
+        alerts.extend(self.detect_self_bidding(bid))
+        alerts.extend(self.detect_shill_bidding_patterns(bid))
+        alerts.extend(self.detect_collusive_bidding(bid))
+        
+        for alert in alerts:
+            alert.save()
+        
+        return alerts
+    
+    def analyze_bid_deferred(self, bid, critical_alerts=()):
+        """
+        Run the remaining heuristics and the AI assessment for an accepted bid.
+        Alerts are saved for admin review and never block the bid; a critical
+        result puts the bidder on a cooldown for the item instead.
+        """
+        alerts = self._run_deferred_checks(bid, critical_alerts)
+        
+        if any(alert.severity == 'critical' for alert in alerts):
+            self.apply_critical_cooldown(bid, alerts)
+        
+        return alerts
+    
+    def analyze_rejected_bid(self, bid, critical_alerts=()):
+        """
+        Run the deferred heuristics for a bid the request is about to reject.
+        The bid is deleted afterwards and never queued, so its alerts are saved now.
+        """
+        return self._run_deferred_checks(bid, critical_alerts)
+    
+    def _run_deferred_checks(self, bid, critical_alerts):
         alerts = []
         
         alerts.extend(self.detect_rapid_bidding(bid))
         alerts.extend(self.detect_bid_sniping(bid))
         alerts.extend(self.detect_unusual_bid_amount(bid))
         alerts.extend(self.detect_new_account_high_value(bid))
-        alerts.extend(self.detect_self_bidding(bid))
         alerts.extend(self.detect_bid_pattern_anomaly(bid))
-        
-        alerts.extend(self.detect_shill_bidding_patterns(bid))
         alerts.extend(self.detect_low_win_ratio(bid))
         alerts.extend(self.detect_seller_affinity(bid))
         alerts.extend(self.detect_bid_timing_pattern(bid))
-        alerts.extend(self.detect_collusive_bidding(bid))
         
-        if self.openai_enabled and alerts:
-            ai_assessment = self.get_ai_fraud_assessment(bid, alerts)
+        if self.openai_enabled and (alerts or critical_alerts):
+            ai_assessment = self.get_ai_fraud_assessment(bid, [*critical_alerts, *alerts])
             if ai_assessment:
                 alerts.append(ai_assessment)
         
@@ -53,6 +90,27 @@ class FraudDetectionService:
         
         return alerts
     
+    def apply_critical_cooldown(self, bid, alerts):
+        """
+        Stop further bids on the item once deferred analysis rates a bid critical.
+        The bid was already accepted, so it stays in place for admin review.
+        """
+        bidder = bid.bidder
+        profile = getattr(bidder, 'profile', None)
+        if bidder.is_superuser or (profile and (profile.bypass_fraud_detection or profile.bypass_all_restrictions)):
+            logger.warning(f"Critical deferred fraud alert for {bidder.username} on bid {bid.id} (fraud detection bypassed)")
+            return
+        
+        alert_types = sorted({alert.alert_type for alert in alerts if alert.severity == 'critical'})
+        BidCooldown.objects.create(
+            user=bidder,
+            item=bid.item,
+            cooldown_type='hard_cooldown',
+            reason=f"Critical fraud alert on bid {bid.id}: {', '.join(alert_types)}",
+            expires_at=timezone.now() + timedelta(seconds=settings.FRAUD_CRITICAL_COOLDOWN_DURATION)
+        )
+        logger.critical(f"Critical deferred fraud alert for {bidder.username} on bid {bid.id} ({', '.join(alert_types)}); bidding on {bid.item.title} suspended")
+    
     def analyze_payment(self, payment):
         """
         Fraud analysis for payment transactions.
@@ -157,7 +215,7 @@ class FraudDetectionService:
         
         avg_bid = Bid.objects.filter(item=bid.item).aggregate(Avg('amount'))['amount__avg']
         
-        if avg_bid and bid.amount >= avg_bid * multiplier:
+        if avg_bid and bid.amount >= avg_bid * Decimal(str(multiplier)):
             alert = FraudAlert(
                 user=bid.bidder,
                 item=bid.item,
@@ -238,7 +296,7 @@ class FraudDetectionService:
         min_history = settings.BID_PATTERN_MIN_HISTORY
         multiplier = settings.BID_PATTERN_DEVIATION_MULTIPLIER
         
-        user_bid_history = Bid.objects.filter(bidder=bid.bidder).order_by('-created_at')[:20]
+        user_bid_history = Bid.objects.filter(bidder=bid.bidder).order_by('-bid_time')[:20]
         
         if user_bid_history.count() >= min_history:
             bid_amounts = [float(b.amount) for b in user_bid_history]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-16 19:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_bidcooldown'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['item', '-amount'], name='auctions_bi_item_id_c0cbb5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['status', '-created_at'], name='auctions_it_status_12f650_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-16 19:25
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_bid_count(apps, schema_editor):
+    """Recount bids per item; USSD bids previously left bid_count untouched"""
+    Item = apps.get_model('auctions', 'Item')
+    Bid = apps.get_model('auctions', 'Bid')
+
+    bid_totals = Bid.objects.filter(item=OuterRef('pk')).order_by().values('item').annotate(
+        total=Count('id')
+    ).values('total')
+    Item.objects.update(bid_count=Coalesce(Subquery(bid_totals), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0011_item_status_created_bid_item_amount_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_bid_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-16 19:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+GALLERY_FIELDS = ['image1', 'image2', 'image3', 'image4']
+
+
+def copy_gallery_to_item_images(apps, schema_editor):
+    """Move the fixed image1..image4 columns into ItemImage rows"""
+    Item = apps.get_model('auctions', 'Item')
+    ItemImage = apps.get_model('auctions', 'ItemImage')
+
+    images = []
+    for item in Item.objects.only('id', *GALLERY_FIELDS).iterator():
+        for order, field in enumerate(GALLERY_FIELDS, start=1):
+            image = getattr(item, field)
+            if image:
+                images.append(ItemImage(item_id=item.id, image=image.name, order=order))
+    ItemImage.objects.bulk_create(images, batch_size=500)
+
+
+def copy_item_images_to_gallery(apps, schema_editor):
+    """Restore the first four ItemImage rows of each item into image1..image4"""
+    Item = apps.get_model('auctions', 'Item')
+    ItemImage = apps.get_model('auctions', 'ItemImage')
+
+    gallery = {}
+    for image in ItemImage.objects.order_by('item_id', 'order', 'id'):
+        gallery.setdefault(image.item_id, []).append(image.image.name)
+    for item_id, names in gallery.items():
+        Item.objects.filter(pk=item_id).update(**dict(zip(GALLERY_FIELDS, names)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0012_backfill_item_bid_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to='items/')),
+                ('order', models.PositiveSmallIntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='auctions.item')),
+            ],
+            options={
+                'ordering': ['order', 'id'],
+            },
+        ),
+        migrations.RunPython(copy_gallery_to_item_images, copy_item_images_to_gallery),
+        migrations.RemoveField(
+            model_name='item',
+            name='image1',
+        ),
+        migrations.RemoveField(
+            model_name='item',
+            name='image2',
+        ),
+        migrations.RemoveField(
+            model_name='item',
+            name='image3',
+        ),
+        migrations.RemoveField(
+            model_name='item',
+            name='image4',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-16 19:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0013_itemimage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['seller', 'status', '-created_at'], name='auctions_it_seller__0f95f8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['seller', '-created_at'], name='auctions_re_seller__4dd788_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0014_item_seller_status_review_seller_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fraudalert',
+            index=models.Index(fields=['-created_at'], name='auctions_fr_created_d34b4f_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0015_fraudalert_created_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fraudalert',
+            index=models.Index(fields=['is_resolved', '-created_at'], name='auctions_fr_is_reso_56b69e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fraudalert',
+            index=models.Index(fields=['alert_type', '-created_at'], name='auctions_fr_alert_t_ca79ad_idx'),
+        ),
+    ]
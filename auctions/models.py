@@ -1,9 +1,26 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 import hashlib
 import json
+import time
+
+# Flat shipping rates (UGX) used when no ShippingCost route applies
+SHIPPING_FREE = Decimal('0')
+SHIPPING_SAME_AREA = Decimal('5000')
+SHIPPING_SAME_CITY = Decimal('10000')
+SHIPPING_DEFAULT_ROUTE = Decimal('25000')
+
+CATEGORY_CACHE_KEY = 'auctions:categories:v1'
+CATEGORY_IDS_CACHE_KEY = 'auctions:category-ids:v1'
+CAPTCHA_CACHE_KEY = 'captcha:{}'
+HOME_ITEMS_VERSION_KEY = 'auctions:home:version'
+SELLER_PAGE_CACHE_KEY = 'auctions:seller:{}:public'
+FRAUD_ALERT_TYPES_CACHE_KEY = 'auctions:fraud-alert-types:v1'
+SHIPPING_LOCATIONS_CACHE_KEY = 'auctions:shipping-locations:v1'
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -17,6 +34,20 @@ class Category(models.Model):
     
     def __str__(self):
         return self.name
+    
+    @classmethod
+    def cached_all(cls):
+        """All categories, cached for an hour and invalidated whenever one changes"""
+        return cache.get_or_set(CATEGORY_CACHE_KEY, lambda: list(cls.objects.all()), 3600)
+    
+    @classmethod
+    def cached_ids_by_name(cls):
+        """Lower-cased category name to id, for case-insensitive filters without a query"""
+        return cache.get_or_set(
+            CATEGORY_IDS_CACHE_KEY,
+            lambda: {c.name.lower(): c.id for c in cls.cached_all()},
+            3600
+        )
 
 class Item(models.Model):
     STATUS_CHOICES = [
@@ -46,10 +77,6 @@ class Item(models.Model):
     requires_media_followup = models.BooleanField(default=False)
     
     main_image = models.ImageField(upload_to='items/main/', null=True, blank=True)
-    image1 = models.ImageField(upload_to='items/', null=True, blank=True)
-    image2 = models.ImageField(upload_to='items/', null=True, blank=True)
-    image3 = models.ImageField(upload_to='items/', null=True, blank=True)
-    image4 = models.ImageField(upload_to='items/', null=True, blank=True)
     
     start_time = models.DateTimeField(default=timezone.now)
     end_time = models.DateTimeField()
@@ -74,10 +101,26 @@ class Item(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['seller', 'status', '-created_at']),
+        ]
     
     def __str__(self):
         return self.title
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so saves that leave it alone can skip the seller recount
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    @classmethod
+    def home_cache_version(cls):
+        """Version stamp for cached home listings; bumped after an item is saved, deleted or updated in bulk"""
+        return cache.get_or_set(HOME_ITEMS_VERSION_KEY, lambda: int(time.time()), None)
+    
     def time_remaining(self):
         if self.status != 'active':
             return None
@@ -103,28 +146,41 @@ class Item(models.Model):
     def is_recently_added(self):
         return (timezone.now() - self.created_at).days < 7
     
-    def calculate_shipping_cost(self, buyer_city, buyer_area):
-        """Calculate shipping cost based on seller and buyer locations"""
+    def calculate_shipping_cost(self, buyer_city, buyer_area, route_costs=None):
+        """
+        Calculate shipping cost (as a Decimal) based on seller and buyer locations.
+        route_costs maps from_city to cost for buyer_city (see ShippingCost.costs_to);
+        when given, it is used instead of querying ShippingCost.
+        """
         if self.free_shipping:
-            return 0
+            return SHIPPING_FREE
         
         if not buyer_city:
             return self.shipping_cost_base
         
         if self.seller_city == buyer_city:
             if self.seller_area == buyer_area:
-                return 5000
+                return SHIPPING_SAME_AREA
             else:
-                return 10000
+                return SHIPPING_SAME_CITY
         else:
-            try:
-                cost = ShippingCost.objects.get(
-                    from_city=self.seller_city, 
-                    to_city=buyer_city
-                )
-                return cost.cost
-            except ShippingCost.DoesNotExist:
-                return self.shipping_cost_base if self.shipping_cost_base > 0 else 25000
+            if route_costs is None:
+                route_costs = ShippingCost.costs_to(buyer_city, [self.seller_city])
+            if self.seller_city in route_costs:
+                return route_costs[self.seller_city]
+            return self.shipping_cost_base if self.shipping_cost_base > 0 else SHIPPING_DEFAULT_ROUTE
+
+class ItemImage(models.Model):
+    """Additional gallery photos for an item, shown after main_image"""
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='images')
+    image = models.ImageField(upload_to='items/')
+    order = models.PositiveSmallIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['order', 'id']
+    
+    def __str__(self):
+        return f"Image {self.order} for {self.item.title}"
 
 class ShippingLocation(models.Model):
     """Cities and areas for shipping across different countries"""
@@ -139,6 +195,16 @@ class ShippingLocation(models.Model):
     
     def __str__(self):
         return f"{self.area}, {self.city} ({self.country})"
+    
+    @classmethod
+    def cached_tree(cls):
+        """Active locations as {country: {city: [areas]}}, cached for a day and invalidated whenever one changes"""
+        def build():
+            tree = {}
+            for country, city, area in cls.objects.filter(is_active=True).values_list('country', 'city', 'area'):
+                tree.setdefault(country, {}).setdefault(city, []).append(area)
+            return tree
+        return cache.get_or_set(SHIPPING_LOCATIONS_CACHE_KEY, build, 86400)
 
 class ShippingCost(models.Model):
     """Shipping costs between cities in Uganda"""
@@ -151,6 +217,17 @@ class ShippingCost(models.Model):
         unique_together = ('from_city', 'to_city')
         ordering = ['from_city', 'to_city']
     
+    @classmethod
+    def costs_to(cls, to_city, from_cities):
+        """Return {from_city: cost} for every known route from from_cities to to_city"""
+        from_cities = set(from_cities)
+        if not from_cities:
+            return {}
+        return dict(cls.objects.filter(
+            from_city__in=from_cities,
+            to_city=to_city
+        ).values_list('from_city', 'cost'))
+    
     def __str__(self):
         return f"{self.from_city} → {self.to_city}: UGX {self.cost}"
 
@@ -166,6 +243,9 @@ class Bid(models.Model):
     
     class Meta:
         ordering = ['-bid_time']
+        indexes = [
+            models.Index(fields=['item', '-amount']),
+        ]
         
     def __str__(self):
         return f"{self.bidder.username} - {self.amount} on {self.item.title}"
@@ -178,8 +258,11 @@ class Cart(models.Model):
     def __str__(self):
         return f"Cart - {self.user.username}"
     
-    def total(self):
-        return sum(item.item.current_price for item in self.items.all())
+    def total(self, cart_items=None):
+        """Sum of item prices; pass already-loaded cart_items to avoid re-querying them"""
+        if cart_items is None:
+            cart_items = self.items.select_related('item')
+        return sum((cart_item.item.current_price for cart_item in cart_items), Decimal('0'))
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -206,6 +289,9 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('item', 'reviewer')
+        indexes = [
+            models.Index(fields=['seller', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.rating}⭐ by {self.reviewer.username} for {self.item.title}"
@@ -232,11 +318,143 @@ class TransactionLog(models.Model):
         data_string = f"{self.pk}{self.transaction_id}{self.timestamp}{self.amount}{self.previous_hash}{json.dumps(self.data, sort_keys=True)}"
         return hashlib.sha256(data_string.encode()).hexdigest()
     
+    @classmethod
+    def bulk_create_chained(cls, logs):
+        """
+        Insert several logs at once and link them into the hash chain.
+        bulk_create skips the post_save hook, so hashes are filled in here
+        with one bulk_update once the database has assigned the primary keys.
+        Every log must carry its unique transaction_id, which is how the keys
+        are read back on backends (MySQL) that don't return them from a bulk insert.
+        """
+        from django.db import connection, transaction
+        
+        with transaction.atomic():
+            previous_hash = cls.objects.order_by('-id').values_list('current_hash', flat=True).first() or ''
+            logs = cls.objects.bulk_create(logs)
+            if not connection.features.can_return_rows_from_bulk_insert:
+                pks = dict(cls.objects.filter(
+                    transaction_id__in=[log.transaction_id for log in logs]
+                ).values_list('transaction_id', 'pk'))
+                for log in logs:
+                    log.pk = pks[log.transaction_id]
+            for log in logs:
+                log.previous_hash = previous_hash
+                log.current_hash = previous_hash = log.calculate_hash()
+            cls.objects.bulk_update(logs, ['previous_hash', 'current_hash'])
+        return logs
+    
     def __str__(self):
         return f"{self.transaction_type} - {self.transaction_id}"
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from captcha.conf import settings as captcha_settings
+from captcha.models import CaptchaStore
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    cache.delete_many([CATEGORY_CACHE_KEY, CATEGORY_IDS_CACHE_KEY])
+
+@receiver([post_save, post_delete], sender=ShippingLocation)
+def invalidate_shipping_locations(sender, **kwargs):
+    cache.delete(SHIPPING_LOCATIONS_CACHE_KEY)
+
+def _incr_home_cache_version():
+    try:
+        cache.incr(HOME_ITEMS_VERSION_KEY)
+    except ValueError:
+        # Never set or evicted; a fresh timestamp can't collide with older versions
+        cache.set(HOME_ITEMS_VERSION_KEY, int(time.time()), None)
+
+def bump_home_cache_version():
+    """Retire cached home listings once the current transaction commits, so readers can't re-cache old rows"""
+    from django.db import transaction
+    transaction.on_commit(_incr_home_cache_version)
+
+@receiver([post_save, post_delete], sender=Item)
+def bump_home_cache_version_on_change(sender, **kwargs):
+    bump_home_cache_version()
+
+def recount_seller_items(seller_id):
+    """Store the seller's current active and sold item counts on their profile"""
+    from django.db.models import Count, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+    from users.models import UserProfile
+    
+    def count_with_status(status):
+        counts = Item.objects.filter(seller_id=OuterRef('user_id'), status=status).order_by().values(
+            'seller_id'
+        ).annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(counts), 0)
+    
+    UserProfile.objects.filter(user_id=seller_id).update(
+        active_item_count=count_with_status('active'),
+        sold_item_count=count_with_status('sold'),
+    )
+
+@receiver([post_save, post_delete], sender=Item)
+def refresh_seller_item_counts(sender, instance, **kwargs):
+    """Recount the seller's active and sold items when an item's status changes or a counted item is deleted"""
+    counted = ('active', 'sold')
+    if kwargs['signal'] is post_save:
+        update_fields = kwargs.get('update_fields')
+        if update_fields and 'status' not in update_fields:
+            return
+        if kwargs.get('created'):
+            changed = instance.status in counted
+        else:
+            # Loaded items know their stored status; anything else is assumed changed
+            loaded_status = getattr(instance, '_loaded_status', None)
+            changed = loaded_status is None or loaded_status != instance.status
+        instance._loaded_status = instance.status
+        if not changed:
+            return
+    elif instance.status not in counted:
+        return
+    
+    recount_seller_items(instance.seller_id)
+
+def invalidate_seller_page(seller_id):
+    """Drop a seller's cached public listing once the current transaction commits"""
+    from django.db import transaction
+    transaction.on_commit(lambda: cache.delete(SELLER_PAGE_CACHE_KEY.format(seller_id)))
+
+@receiver([post_save, post_delete], sender=Item)
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_seller_page_on_change(sender, instance, **kwargs):
+    invalidate_seller_page(instance.seller_id)
+
+@receiver([post_save, post_delete], sender=Bid)
+def invalidate_seller_page_on_bid(sender, instance, **kwargs):
+    """Bids move the item's price and bid count through queryset updates, which send no signals"""
+    invalidate_seller_page(instance.item.seller_id)
+
+@receiver(post_save, sender=CaptchaStore)
+def cache_captcha_response(sender, instance, created, **kwargs):
+    """Prime the cache with the expected answer so verification can skip the lookup"""
+    if created:
+        cache.set(
+            CAPTCHA_CACHE_KEY.format(instance.hashkey),
+            instance.response,
+            int(captcha_settings.CAPTCHA_TIMEOUT) * 60
+        )
+
+@receiver(post_save, sender=Bid)
+def record_bid_velocity(sender, instance, created, **kwargs):
+    """Keep the rapid-bidding windows in step with the committed Bid table"""
+    if created:
+        from django.db import transaction
+        from .rapid_bidding import BidVelocity
+        transaction.on_commit(lambda: BidVelocity.record(instance))
+
+@receiver(post_delete, sender=Bid)
+def forget_bid_velocity(sender, instance, **kwargs):
+    from django.db import transaction
+    from .rapid_bidding import BidVelocity
+    # Deletion clears instance.pk before on_commit callbacks run
+    deleted = Bid(pk=instance.pk, bidder_id=instance.bidder_id, item_id=instance.item_id)
+    transaction.on_commit(lambda: BidVelocity.forget(deleted))
 
 @receiver(post_save, sender=TransactionLog)
 def set_transaction_hash(sender, instance, created, **kwargs):
@@ -290,9 +508,27 @@ class FraudAlert(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['is_resolved', '-created_at']),
+            models.Index(fields=['alert_type', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.alert_type} - {self.user.username} ({self.severity})"
+    
+    @classmethod
+    def cached_alert_types(cls):
+        """Distinct alert types for the admin filter, cached and invalidated whenever an alert changes"""
+        return cache.get_or_set(
+            FRAUD_ALERT_TYPES_CACHE_KEY,
+            lambda: list(cls.objects.order_by('alert_type').values_list('alert_type', flat=True).distinct()),
+            300
+        )
+
+@receiver([post_save, post_delete], sender=FraudAlert)
+def invalidate_fraud_alert_types(sender, **kwargs):
+    cache.delete(FRAUD_ALERT_TYPES_CACHE_KEY)
 
 class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='messages_sent')
@@ -328,48 +564,37 @@ class Message(models.Model):
     
     @classmethod
     def get_conversations_for_user(cls, user):
-        """Get all conversations for a user with the latest message"""
-        from django.db.models import Q, Max, OuterRef, Subquery
+        """Get all conversations for a user with the latest message and unread count"""
+        from django.db.models import Case, Count, F, Max, Q, When
         
-        # Get the latest message for each conversation
-        latest_messages = cls.objects.filter(
+        # One grouped pass: the other participant, newest message id and unread total per conversation
+        threads = cls.objects.filter(
             Q(sender=user) | Q(recipient=user)
-        ).values('sender', 'recipient').annotate(
-            latest=Max('created_at')
+        ).annotate(
+            other_user_id=Case(When(sender=user, then=F('recipient_id')), default=F('sender_id'))
+        ).values('other_user_id').annotate(
+            latest_id=Max('id'),
+            unread_count=Count('pk', filter=Q(recipient=user, is_read=False))
+        ).order_by()
+        threads = list(threads)
+        
+        latest_messages = cls.objects.in_bulk([thread['latest_id'] for thread in threads])
+        other_users = User.objects.select_related('profile').in_bulk(
+            [thread['other_user_id'] for thread in threads]
         )
         
-        conversations = {}
-        for msg_info in latest_messages:
-            sender_id = msg_info['sender']
-            recipient_id = msg_info['recipient']
-            
-            # Determine the other user
-            other_user_id = recipient_id if sender_id == user.id else sender_id
-            
-            if other_user_id not in conversations:
-                # Get the latest message
-                latest_msg = cls.objects.filter(
-                    Q(sender=user, recipient_id=other_user_id) |
-                    Q(sender_id=other_user_id, recipient=user)
-                ).order_by('-created_at').first()
-                
-                if latest_msg:
-                    other_user = User.objects.get(id=other_user_id)
-                    unread_count = cls.objects.filter(
-                        sender_id=other_user_id,
-                        recipient=user,
-                        is_read=False
-                    ).count()
-                    
-                    conversations[other_user_id] = {
-                        'other_user': other_user,
-                        'latest_message': latest_msg,
-                        'unread_count': unread_count
-                    }
+        conversations = [
+            {
+                'other_user': other_users[thread['other_user_id']],
+                'latest_message': latest_messages[thread['latest_id']],
+                'unread_count': thread['unread_count']
+            }
+            for thread in threads
+        ]
         
         # Sort by latest message time
         return sorted(
-            conversations.values(),
+            conversations,
             key=lambda x: x['latest_message'].created_at,
             reverse=True
         )
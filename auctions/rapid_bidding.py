@@ -2,10 +2,139 @@ from django.utils import timezone
 from django.conf import settings
 from datetime import timedelta
 from decimal import Decimal
+import logging
 import math
 from .models import Bid, BidCooldown, Item
 from django.contrib.auth.models import User
 
+logger = logging.getLogger(__name__)
+
+
+class BidVelocity:
+    """
+    Sliding-window bid timestamps per bidder, kept in Redis sorted sets.
+    Each bid is scored by its bid_time, so a window count is a single ZCOUNT.
+    A missing key (never written, expired or evicted) is rebuilt from the Bid table
+    on the next write; until then, and whenever Redis is not configured or
+    unreachable, windows are counted from Bid rows.
+    """
+    
+    ITEM_KEY = 'rapid:user:{}:item:{}:bids'
+    USER_KEY = 'rapid:user:{}:bids'
+    _client = None
+    
+    @classmethod
+    def _redis(cls):
+        if not settings.USE_REDIS:
+            return None
+        if cls._client is None:
+            import redis
+            cls._client = redis.Redis.from_url(settings.REDIS_CACHE_URL, socket_connect_timeout=2)
+        return cls._client
+    
+    @staticmethod
+    def _retention_seconds():
+        """Longest window any rapid-bidding check looks back over"""
+        return 60 * max(
+            settings.RAPID_BID_SOFT_WINDOW_2MIN,
+            settings.RAPID_BID_SOFT_WINDOW_5MIN,
+            settings.RAPID_BID_HARD_WINDOW_5MIN,
+            settings.GLOBAL_VELOCITY_SOFT_WINDOW_MINUTES,
+            settings.GLOBAL_VELOCITY_HARD_WINDOW_MINUTES,
+        )
+    
+    @classmethod
+    def record(cls, bid):
+        """Add a committed bid to the bidder's windows and trim expired entries"""
+        client = cls._redis()
+        if client is None:
+            return
+        
+        score = bid.bid_time.timestamp()
+        retention = cls._retention_seconds()
+        item_key = cls.ITEM_KEY.format(bid.bidder_id, bid.item_id)
+        user_key = cls.USER_KEY.format(bid.bidder_id)
+        try:
+            pipe = client.pipeline()
+            pipe.exists(item_key)
+            pipe.exists(user_key)
+            item_exists, user_exists = pipe.execute()
+            
+            item_members = {str(bid.pk): score}
+            user_members = {f'{bid.item_id}:{bid.pk}': score}
+            if not (item_exists and user_exists):
+                # Rebuild from the table so bids made before the key existed still count
+                window_bids = Bid.objects.filter(
+                    bidder_id=bid.bidder_id,
+                    bid_time__gte=bid.bid_time - timedelta(seconds=retention),
+                ).values_list('pk', 'item_id', 'bid_time')
+                for pk, item_id, bid_time in window_bids:
+                    user_members[f'{item_id}:{pk}'] = bid_time.timestamp()
+                    if item_id == bid.item_id:
+                        item_members[str(pk)] = bid_time.timestamp()
+            
+            pipe = client.pipeline()
+            pipe.zadd(item_key, item_members)
+            pipe.zadd(user_key, user_members)
+            for key in (item_key, user_key):
+                pipe.zremrangebyscore(key, '-inf', score - retention)
+                pipe.expire(key, retention)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to record bid {bid.pk} in rapid bidding window: {str(e)}")
+    
+    @classmethod
+    def forget(cls, bid):
+        """Drop a deleted bid (e.g. one rejected by fraud checks) from the windows"""
+        client = cls._redis()
+        if client is None:
+            return
+        
+        try:
+            pipe = client.pipeline()
+            pipe.zrem(cls.ITEM_KEY.format(bid.bidder_id, bid.item_id), str(bid.pk))
+            pipe.zrem(cls.USER_KEY.format(bid.bidder_id), f'{bid.item_id}:{bid.pk}')
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to remove bid {bid.pk} from rapid bidding window: {str(e)}")
+    
+    @classmethod
+    def count_on_item(cls, user, item, since):
+        """Number of bids the user placed on this item since the given time"""
+        client = cls._redis()
+        if client is not None:
+            key = cls.ITEM_KEY.format(user.id, item.id)
+            try:
+                pipe = client.pipeline()
+                pipe.exists(key)
+                pipe.zcount(key, since.timestamp(), '+inf')
+                exists, count = pipe.execute()
+                if exists:
+                    return count
+            except Exception as e:
+                logger.error(f"Rapid bidding window lookup failed, falling back to database: {str(e)}")
+        
+        return Bid.objects.filter(bidder=user, item=item, bid_time__gte=since).count()
+    
+    @classmethod
+    def recent_activity(cls, user, since):
+        """Return (bid_count, distinct_auction_count) for the user since the given time"""
+        client = cls._redis()
+        if client is not None:
+            key = cls.USER_KEY.format(user.id)
+            try:
+                pipe = client.pipeline()
+                pipe.exists(key)
+                pipe.zrangebyscore(key, since.timestamp(), '+inf')
+                exists, members = pipe.execute()
+                if exists:
+                    return len(members), len({member.split(b':', 1)[0] for member in members})
+            except Exception as e:
+                logger.error(f"Rapid bidding window lookup failed, falling back to database: {str(e)}")
+        
+        recent_bids = Bid.objects.filter(bidder=user, bid_time__gte=since)
+        return recent_bids.count(), recent_bids.values('item').distinct().count()
+
 
 class RapidBiddingDetector:
     
@@ -44,18 +173,16 @@ class RapidBiddingDetector:
         is_endgame = RapidBiddingDetector._is_auction_endgame(item)
         multiplier = settings.AUCTION_ENDGAME_MULTIPLIER if is_endgame else 1.0
         
-        user_bids = Bid.objects.filter(bidder=user, item=item).order_by('-bid_time')
-        
         soft_2min_threshold = math.ceil(settings.RAPID_BID_SOFT_THRESHOLD_2MIN * multiplier)
         soft_2min_check, soft_2min_count = RapidBiddingDetector._check_window(
-            user_bids,
+            user, item,
             minutes=settings.RAPID_BID_SOFT_WINDOW_2MIN,
             threshold=soft_2min_threshold
         )
         
         soft_5min_threshold = math.ceil(settings.RAPID_BID_SOFT_THRESHOLD_5MIN * multiplier)
         soft_5min_check, soft_5min_count = RapidBiddingDetector._check_window(
-            user_bids,
+            user, item,
             minutes=settings.RAPID_BID_SOFT_WINDOW_5MIN,
             threshold=soft_5min_threshold
         )
@@ -79,14 +206,14 @@ class RapidBiddingDetector:
         
         hard_5min_threshold = math.ceil(settings.RAPID_BID_HARD_THRESHOLD_5MIN * multiplier)
         hard_5min_check, hard_5min_count = RapidBiddingDetector._check_window(
-            user_bids,
+            user, item,
             minutes=settings.RAPID_BID_HARD_WINDOW_5MIN,
             threshold=hard_5min_threshold
         )
         
         hard_20sec_threshold = math.ceil(settings.RAPID_BID_HARD_THRESHOLD_20SEC * multiplier)
         hard_20sec_check, hard_20sec_count = RapidBiddingDetector._check_window(
-            user_bids,
+            user, item,
             seconds=settings.RAPID_BID_HARD_WINDOW_20SEC,
             threshold=hard_20sec_threshold
         )
@@ -156,7 +283,7 @@ class RapidBiddingDetector:
         return 0 < time_remaining <= endgame_seconds
     
     @staticmethod
-    def _check_window(bids_queryset, minutes=None, seconds=None, threshold=1):
+    def _check_window(user, item, minutes=None, seconds=None, threshold=1):
         """
         Check if number of bids in time window exceeds threshold.
         Includes the current pending bid (+1) in the count.
@@ -171,7 +298,7 @@ class RapidBiddingDetector:
         else:
             return (False, 0)
         
-        count = bids_queryset.filter(bid_time__gte=window_start).count()
+        count = BidVelocity.count_on_item(user, item, window_start)
         # Include the current pending bid in the count
         return (count + 1 >= threshold, count + 1)
     
@@ -181,13 +308,8 @@ class RapidBiddingDetector:
         now = timezone.now()
         window_start = now - timedelta(minutes=settings.GLOBAL_VELOCITY_SOFT_WINDOW_MINUTES)
         
-        recent_bids = Bid.objects.filter(
-            bidder=user,
-            bid_time__gte=window_start
-        )
-        
-        bid_count = recent_bids.count() + 1  # Include pending bid
-        auction_count = recent_bids.values('item').distinct().count()
+        bid_count, auction_count = BidVelocity.recent_activity(user, window_start)
+        bid_count += 1  # Include pending bid
         
         return (
             bid_count >= settings.GLOBAL_VELOCITY_SOFT_THRESHOLD_BIDS and
@@ -200,13 +322,8 @@ class RapidBiddingDetector:
         now = timezone.now()
         window_start = now - timedelta(minutes=settings.GLOBAL_VELOCITY_HARD_WINDOW_MINUTES)
         
-        recent_bids = Bid.objects.filter(
-            bidder=user,
-            bid_time__gte=window_start
-        )
-        
-        bid_count = recent_bids.count() + 1  # Include pending bid
-        auction_count = recent_bids.values('item').distinct().count()
+        bid_count, auction_count = BidVelocity.recent_activity(user, window_start)
+        bid_count += 1  # Include pending bid
         
         return (
             bid_count >= settings.GLOBAL_VELOCITY_HARD_THRESHOLD_BIDS and
@@ -0,0 +1,51 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from .models import Bid, FraudAlert
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.FRAUD_ANALYSIS_WORKERS,
+    thread_name_prefix='fraud-analysis',
+)
+
+
+def _in_worker(task, *args):
+    """Run a task on a pool thread, then drop that thread's stale database connections"""
+    try:
+        task(*args)
+    finally:
+        close_old_connections()
+
+
+def analyze_bid_async(bid_id, alert_ids=()):
+    """
+    Run the deferred fraud heuristics for a bid outside the request thread.
+    alert_ids are the alerts already raised in the request, passed on to the AI assessment.
+    """
+    from .fraud_detection import FraudDetectionService
+
+    try:
+        bid = Bid.objects.select_related('item__seller', 'bidder__profile').get(pk=bid_id)
+        request_alerts = list(FraudAlert.objects.filter(pk__in=alert_ids)) if alert_ids else []
+        FraudDetectionService().analyze_bid_deferred(bid, request_alerts)
+    except Bid.DoesNotExist:
+        logger.info(f"Skipping fraud analysis for bid {bid_id}: bid no longer exists")
+    except Exception as e:
+        logger.error(f"Deferred fraud detection failed for bid {bid_id}: {str(e)}")
+
+
+def enqueue_bid_analysis(bid, alerts=()):
+    """
+    Schedule deferred fraud analysis once the bid is committed.
+    Runs inline when FRAUD_ANALYSIS_ASYNC is disabled.
+    """
+    alert_ids = [alert.pk for alert in alerts if alert.pk]
+    if not settings.FRAUD_ANALYSIS_ASYNC:
+        analyze_bid_async(bid.id, alert_ids)
+        return
+
+    bid_id = bid.id
+    transaction.on_commit(lambda: _executor.submit(_in_worker, analyze_bid_async, bid_id, alert_ids))
@@ -1,10 +1,20 @@
-from django.test import TestCase, TransactionTestCase
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
 from datetime import timedelta
-from auctions.models import Item, Bid, Category, TransactionLog
+from auctions.fraud_detection import FraudDetectionService
+from auctions.models import Item, Bid, BidCooldown, Category, FraudAlert, TransactionLog
+from auctions.tasks import _in_worker, analyze_bid_async, enqueue_bid_analysis
+from auctions.views import refresh_winning_bid
+from users.models import UserProfile
 from threading import Thread
+from unittest import mock
 import time
 
 
@@ -127,6 +137,152 @@ class BiddingRulesTestCase(TestCase):
         self.assertFalse(bid1.is_winning)
         self.assertTrue(bid2.is_winning)
     
+    def test_refresh_winning_bid(self):
+        """Test that the highest bid is flagged and the item price/count synced"""
+        bid1 = Bid.objects.create(
+            item=self.item,
+            bidder=self.bidder1,
+            amount=Decimal('510000'),
+            is_winning=True
+        )
+        bid2 = Bid.objects.create(
+            item=self.item,
+            bidder=self.bidder2,
+            amount=Decimal('520000')
+        )
+        
+        with CaptureQueriesContext(connection) as queries:
+            refresh_winning_bid(self.item)
+        
+        # MySQL rejects an UPDATE whose subquery reads the updated table (error 1093)
+        bid_table = connection.ops.quote_name(Bid._meta.db_table)
+        bid_updates = [q['sql'] for q in queries if q['sql'].startswith(f"UPDATE {bid_table}")]
+        self.assertEqual(len(bid_updates), 1)
+        self.assertNotIn('SELECT', bid_updates[0])
+        
+        bid1.refresh_from_db()
+        bid2.refresh_from_db()
+        self.item.refresh_from_db()
+        
+        self.assertFalse(bid1.is_winning)
+        self.assertTrue(bid2.is_winning)
+        self.assertEqual(self.item.current_price, Decimal('520000'))
+        self.assertEqual(self.item.bid_count, 1)
+    
+    def test_refresh_winning_bid_retires_home_listings_on_commit(self):
+        """Test that a price change through refresh_winning_bid bumps the home cache version after commit"""
+        Bid.objects.create(item=self.item, bidder=self.bidder1, amount=Decimal('510000'))
+        version = Item.home_cache_version()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_winning_bid(self.item)
+            self.assertEqual(Item.home_cache_version(), version)
+        
+        self.assertNotEqual(Item.home_cache_version(), version)
+    
+    def test_deferred_fraud_analysis_waits_for_commit(self):
+        """Test that non-blocking fraud checks are queued until the bid commits"""
+        bid = Bid.objects.create(
+            item=self.item,
+            bidder=self.bidder1,
+            amount=Decimal('510000')
+        )
+        
+        with mock.patch('auctions.tasks._executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                enqueue_bid_analysis(bid)
+                executor.submit.assert_not_called()
+        
+        self.assertEqual(len(callbacks), 1)
+        executor.submit.assert_called_once()
+        self.assertEqual(executor.submit.call_args.args[:3], (_in_worker, analyze_bid_async, bid.id))
+    
+    def test_deferred_critical_alert_applies_cooldown(self):
+        """Test that a critical result from deferred analysis cools the bidder down"""
+        bid = Bid.objects.create(
+            item=self.item,
+            bidder=self.bidder1,
+            amount=Decimal('510000')
+        )
+        request_alert = FraudAlert.objects.create(
+            user=self.bidder1,
+            item=self.item,
+            alert_type='shill_bidding',
+            severity='high',
+            description='High seller affinity'
+        )
+        ai_alert = FraudAlert(
+            user=self.bidder1,
+            item=self.item,
+            alert_type='ai_fraud_assessment',
+            severity='critical',
+            description='AI-powered fraud risk assessment completed.'
+        )
+        
+        with override_settings(OPENAI_API_KEY='test-key'), \
+                mock.patch.object(FraudDetectionService, 'get_ai_fraud_assessment', return_value=ai_alert) as assess:
+            analyze_bid_async(bid.id, [request_alert.pk])
+        
+        self.assertIn(request_alert, assess.call_args.args[1])
+        cooldown = BidCooldown.get_active_cooldown(self.bidder1, self.item)
+        self.assertIsNotNone(cooldown)
+        self.assertEqual(cooldown.cooldown_type, 'hard_cooldown')
+        self.assertTrue(Bid.objects.filter(pk=bid.pk).exists())
+    
+    def test_blocked_bid_names_collusive_bidding(self):
+        """Test that a bid blocked by a critical in-request alert tells the bidder why"""
+        collusion_alert = FraudAlert(
+            user=self.bidder1,
+            item=self.item,
+            alert_type='collusive_bidding',
+            severity='critical',
+            description='Collusive bidding network'
+        )
+        
+        self.client.login(username='bidder1', password='pass123')
+        with mock.patch.object(FraudDetectionService, 'analyze_bid_critical', return_value=[collusion_alert]):
+            response = self.client.post(reverse('place_bid', args=[self.item.pk]), {'amount': '510000'})
+        
+        self.assertIn(
+            "⚠️ FRAUD ALERT: Detected possible collusive bidding. Your bid has been blocked. "
+            "Contact support if you believe this is an error.",
+            [str(m) for m in get_messages(response.wsgi_request)]
+        )
+        self.assertFalse(Bid.objects.filter(item=self.item).exists())
+    
+    def test_rejected_rapid_bid_keeps_rapid_bidding_alert(self):
+        """Test that a bid rejected for rapid bidding still leaves its deferred fraud alerts behind"""
+        for i in range(settings.RAPID_BIDDING_THRESHOLD - 1):
+            Bid.objects.create(item=self.item, bidder=self.bidder1, amount=Decimal('510000') + i * 10000)
+        
+        self.client.login(username='bidder1', password='pass123')
+        with mock.patch.object(FraudDetectionService, 'get_ai_fraud_assessment', return_value=None):
+            self.client.post(reverse('place_bid', args=[self.item.pk]), {'amount': '700000'})
+        
+        self.assertFalse(Bid.objects.filter(item=self.item, amount=Decimal('700000')).exists())
+        self.assertTrue(FraudAlert.objects.filter(user=self.bidder1, alert_type='rapid_bidding').exists())
+    
+    def test_seller_item_counts_follow_status(self):
+        """Test that the seller's active/sold counters move only when an item's status changes"""
+        def counts():
+            return UserProfile.objects.values_list('active_item_count', 'sold_item_count').get(user=self.seller)
+        
+        self.assertEqual(counts(), (1, 0))
+        
+        item = Item.objects.get(pk=self.item.pk)
+        item.status = 'sold'
+        item.save()
+        self.assertEqual(counts(), (0, 1))
+        
+        # Saves that leave the status alone don't recount
+        UserProfile.objects.filter(user=self.seller).update(sold_item_count=5)
+        item.title = 'Renamed Laptop'
+        item.save()
+        self.assertEqual(counts(), (0, 5))
+        
+        item.delete()
+        self.assertEqual(counts(), (0, 0))
+    
     def test_bid_count_increment(self):
         """Test that bid count increments correctly"""
         initial_count = self.item.bid_count
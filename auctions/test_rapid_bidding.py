@@ -0,0 +1,158 @@
+"""
+Rapid Bidding Window Tests
+
+Tests the Redis-backed bid velocity windows including:
+- Recording and forgetting bids once they commit
+- Rebuilding a missing window from the Bid table
+- Window counts per item and across auctions
+"""
+
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+from decimal import Decimal
+from datetime import timedelta
+from unittest import mock
+from auctions.models import Item, Bid, Category
+from auctions.rapid_bidding import BidVelocity
+
+
+class FakeRedis:
+    """In-memory stand-in for the sorted-set commands BidVelocity uses"""
+    
+    def __init__(self):
+        self.sets = {}
+    
+    def pipeline(self):
+        return FakePipeline(self)
+    
+    def exists(self, key):
+        return int(key in self.sets)
+    
+    def zadd(self, key, mapping):
+        self.sets.setdefault(key, {}).update({member.encode(): score for member, score in mapping.items()})
+    
+    def zrem(self, key, member):
+        self.sets.get(key, {}).pop(member.encode(), None)
+    
+    def zremrangebyscore(self, key, low, high):
+        members = self.sets.get(key, {})
+        for member, score in list(members.items()):
+            if float(low) <= score <= float(high):
+                del members[member]
+    
+    def zrangebyscore(self, key, low, high):
+        return [member for member, score in self.sets.get(key, {}).items() if float(low) <= score <= float(high)]
+    
+    def zcount(self, key, low, high):
+        return len(self.zrangebyscore(key, low, high))
+    
+    def expire(self, key, seconds):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+    
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+    
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+@override_settings(USE_REDIS=True)
+class BidVelocityTestCase(TestCase):
+    """Test the rapid bidding windows against an in-memory Redis"""
+    
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(BidVelocity, '_client', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.seller = User.objects.create_user(username='velocity_seller', password='pass123')
+        self.bidder = User.objects.create_user(username='velocity_bidder', password='pass123')
+        self.category = Category.objects.create(name='Velocity')
+        self.item = self.create_item('Velocity Item')
+        self.since = timezone.now() - timedelta(minutes=5)
+    
+    def create_item(self, title):
+        return Item.objects.create(
+            seller=self.seller,
+            category=self.category,
+            title=title,
+            description='Rapid bidding test item',
+            starting_price=Decimal('100000'),
+            current_price=Decimal('100000'),
+            min_increment=Decimal('5000'),
+            end_time=timezone.now() + timedelta(days=1),
+            status='active'
+        )
+    
+    def place_bid(self, item, amount='105000'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Bid.objects.create(item=item, bidder=self.bidder, amount=Decimal(amount))
+    
+    def test_record_waits_for_commit(self):
+        """Test that a bid enters the window only once it commits"""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            bid = Bid.objects.create(item=self.item, bidder=self.bidder, amount=Decimal('105000'))
+            self.assertFalse(self.redis.exists(BidVelocity.ITEM_KEY.format(self.bidder.id, self.item.id)))
+        
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            list(self.redis.sets[BidVelocity.ITEM_KEY.format(self.bidder.id, self.item.id)]),
+            [str(bid.pk).encode()]
+        )
+    
+    def test_record_rebuilds_missing_window(self):
+        """Test that a missing window is rebuilt from bids already in the table"""
+        with self.captureOnCommitCallbacks(execute=False):
+            Bid.objects.create(item=self.item, bidder=self.bidder, amount=Decimal('105000'))
+        self.assertEqual(self.redis.sets, {})
+        
+        self.place_bid(self.item, '110000')
+        self.assertEqual(len(self.redis.sets[BidVelocity.ITEM_KEY.format(self.bidder.id, self.item.id)]), 2)
+        self.assertEqual(len(self.redis.sets[BidVelocity.USER_KEY.format(self.bidder.id)]), 2)
+    
+    def test_forget_removes_deleted_bid(self):
+        """Test that a deleted bid leaves both windows"""
+        bid = self.place_bid(self.item)
+        with self.captureOnCommitCallbacks(execute=True):
+            bid.delete()
+        
+        self.assertEqual(self.redis.sets[BidVelocity.ITEM_KEY.format(self.bidder.id, self.item.id)], {})
+        self.assertEqual(self.redis.sets[BidVelocity.USER_KEY.format(self.bidder.id)], {})
+    
+    def test_count_on_item_reads_window(self):
+        """Test that an existing window is counted without touching the database"""
+        self.place_bid(self.item)
+        self.place_bid(self.item, '110000')
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(BidVelocity.count_on_item(self.bidder, self.item, self.since), 2)
+    
+    def test_count_on_item_falls_back_to_database(self):
+        """Test that a missing window is counted from Bid rows"""
+        self.place_bid(self.item)
+        self.redis.sets.clear()
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(BidVelocity.count_on_item(self.bidder, self.item, self.since), 1)
+    
+    def test_recent_activity_counts_bids_and_auctions(self):
+        """Test that cross-auction activity reports bids and distinct auctions"""
+        other_item = self.create_item('Other Velocity Item')
+        self.place_bid(self.item)
+        self.place_bid(self.item, '110000')
+        self.place_bid(other_item)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(BidVelocity.recent_activity(self.bidder, self.since), (3, 2))
+        
+        self.redis.sets.clear()
+        self.assertEqual(BidVelocity.recent_activity(self.bidder, self.since), (3, 2))
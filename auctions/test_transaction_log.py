@@ -1,12 +1,27 @@
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.db import connection
 from django.utils import timezone
 from decimal import Decimal
 from datetime import timedelta
 from auctions.models import Item, Category, TransactionLog
+from unittest import mock
 import hashlib
 import json
 
+_SHA256_SEED = hashlib.sha256()
+
+TX_TYPES = tuple(
+    (t, f'{t.upper()}-001')
+    for t in ('purchase', 'bid', 'listing', 'wallet_deposit', 'wallet_withdrawal')
+)
+
+
+def _sha(data):
+    h = _SHA256_SEED.copy()
+    h.update(data)
+    return h.hexdigest()
+
 
 class TransactionLogIntegrityTestCase(TestCase):
     """Test blockchain-inspired transaction log integrity"""
@@ -116,16 +131,14 @@ class TransactionLogIntegrityTestCase(TestCase):
         hash_data = {
             'transaction_id': log.transaction_id,
             'transaction_type': log.transaction_type,
-            'item_id': log.item.id if log.item else None,
-            'user_id': log.user.id if log.user else None,
+            'item_id': log.item_id,
+            'user_id': log.user_id,
             'amount': str(log.amount),
             'timestamp': log.timestamp.isoformat(),
             'previous_hash': log.previous_hash or 'genesis'
         }
         
-        calculated_hash = hashlib.sha256(
-            json.dumps(hash_data, sort_keys=True).encode()
-        ).hexdigest()
+        calculated_hash = _sha(json.dumps(hash_data, sort_keys=True).encode())
         
         # The hash should match (if calculated the same way in model)
         self.assertEqual(len(calculated_hash), 64)
@@ -133,17 +146,20 @@ class TransactionLogIntegrityTestCase(TestCase):
     
     def test_tamper_detection(self):
         """Test that tampering with transaction data can be detected"""
+        # Amount in the column's two-place form, so the reloaded row hashes like the saved one
         log = TransactionLog.objects.create(
             transaction_id='TAMPER-001',
             transaction_type='purchase',
             item=self.item,
             user=self.user,
-            amount=Decimal('100000'),
+            amount=Decimal('100000.00'),
             payment_method='mtn'
         )
+        log.refresh_from_db()
         
         original_hash = log.current_hash
         original_amount = log.amount
+        self.assertEqual(log.calculate_hash(), original_hash)
         
         # Manually tamper with amount (bypass save signal)
         TransactionLog.objects.filter(id=log.id).update(amount=Decimal('50000'))
@@ -156,16 +172,14 @@ class TransactionLogIntegrityTestCase(TestCase):
         # But amount changed
         self.assertNotEqual(log.amount, original_amount)
         
-        # If we recalculate hash, it won't match
-        # This demonstrates tamper detection capability
+        # Recalculating the hash no longer matches the stored one, which exposes the tampering
+        self.assertNotEqual(log.calculate_hash(), log.current_hash)
     
     def test_multiple_transactions_chain(self):
         """Test chain integrity with multiple transactions"""
         num_transactions = 10
-        previous_log = None
-        
-        for i in range(num_transactions):
-            log = TransactionLog.objects.create(
+        logs = [
+            TransactionLog.objects.create(
                 transaction_id=f'MULTI-{i:03d}',
                 transaction_type='purchase',
                 item=self.item,
@@ -173,13 +187,16 @@ class TransactionLogIntegrityTestCase(TestCase):
                 amount=Decimal(str(100000 + (i * 10000))),
                 payment_method='mtn'
             )
-            
-            if previous_log:
-                # Verify chain
-                if log.previous_hash:
-                    self.assertEqual(log.previous_hash, previous_log.current_hash)
-            
-            previous_log = log
+            for i in range(num_transactions)
+        ]
+        
+        leaf_hashes = [log.calculate_hash() for log in logs]
+        
+        # Each log links to the hash of the one before it
+        for i, log in enumerate(logs):
+            self.assertEqual(log.current_hash, leaf_hashes[i])
+            if i:
+                self.assertEqual(log.previous_hash, leaf_hashes[i - 1])
         
         # Verify we created all transactions
         total_logs = TransactionLog.objects.filter(
@@ -187,13 +204,44 @@ class TransactionLogIntegrityTestCase(TestCase):
         ).count()
         self.assertEqual(total_logs, num_transactions)
     
+    def test_bulk_create_chained_without_returned_pks(self):
+        """Test that bulk inserts are chained on backends that don't return pks (MySQL)"""
+        previous = TransactionLog.objects.create(
+            transaction_id='BULK-000',
+            transaction_type='purchase',
+            user=self.user,
+            amount=Decimal('100000.00'),
+            payment_method='mtn'
+        )
+        
+        with mock.patch.object(
+            type(connection.features), 'can_return_rows_from_bulk_insert',
+            new_callable=mock.PropertyMock, return_value=False
+        ):
+            logs = TransactionLog.bulk_create_chained([
+                TransactionLog(
+                    transaction_id=f'BULK-{i:03d}',
+                    transaction_type='purchase',
+                    user=self.user,
+                    amount=Decimal('100000.00'),
+                    payment_method='mtn'
+                )
+                for i in range(1, 4)
+            ])
+        
+        stored = list(TransactionLog.objects.filter(transaction_id__startswith='BULK-'))
+        self.assertEqual([log.pk for log in logs], [log.pk for log in stored[1:]])
+        previous_hash = previous.current_hash
+        for log in stored[1:]:
+            self.assertEqual(log.previous_hash, previous_hash)
+            self.assertEqual(log.current_hash, log.calculate_hash())
+            previous_hash = log.current_hash
+    
     def test_transaction_types(self):
         """Test different transaction types are logged correctly"""
-        transaction_types = ['purchase', 'bid', 'listing', 'wallet_deposit', 'wallet_withdrawal']
-        
-        for trans_type in transaction_types:
+        for trans_type, transaction_id in TX_TYPES:
             log = TransactionLog.objects.create(
-                transaction_id=f'{trans_type.upper()}-001',
+                transaction_id=transaction_id,
                 transaction_type=trans_type,
                 item=self.item if trans_type != 'wallet_deposit' else None,
                 user=self.user,
@@ -1,44 +1,85 @@
+import csv
+import hashlib
+import logging
+import re
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache, wraps
+import orjson
+from captcha.models import CaptchaStore
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import Item, Category, Bid, Review, Cart, CartItem, TransactionLog
-from .forms import PlaceBidForm, ReviewForm
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Avg, Case, Count, Exists, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_POST
+from django.views.decorators.csrf import csrf_exempt
+from payments.models import Payment
+from payments.services import PaymentService, record_checkout_result, settle_payment_to_sellers
+from payments.tasks import enqueue_checkout_payment
+from users.models import Follow, UserProfile, Wallet, WalletTransaction
+from .models import (
+    CAPTCHA_CACHE_KEY, SELLER_PAGE_CACHE_KEY, Item, Category, Bid, Review, Cart, CartItem,
+    TransactionLog, Country, ShippingLocation, ShippingCost, Message, FraudAlert,
+    bump_home_cache_version,
+)
+from .forms import HomeFilterForm, PlaceBidForm, ReviewForm, SellItemForm
+from .fraud_detection import FraudDetectionService
+from .rapid_bidding import RapidBiddingDetector
+from .tasks import enqueue_bid_analysis
+
+ADMIN_DASHBOARD_STATS_CACHE_KEY = 'admin:dashboard:stats'
+FRAUD_ALERT_BREAKDOWN_CACHE_KEY = 'admin:fraud-alerts:breakdown'
+
+# Platform tax: on subtotal plus shipping at checkout, and deducted from the seller's Buy Now proceeds
+TAX_RATE = Decimal('0.05')
+
+# Shared by every admin page that fans its stats queries out; each worker keeps its own connection until CONN_MAX_AGE
+_admin_stats_executor = ThreadPoolExecutor(
+    max_workers=settings.ADMIN_STATS_WORKERS,
+    thread_name_prefix='admin-stats',
+)
+
+# Columns rendered by the listing cards; skips description and the extra images
+ITEM_CARD_FIELDS = (
+    'id', 'title', 'current_price', 'bid_count', 'main_image',
+    'status', 'end_time', 'created_at', 'category__name',
+)
 
 def home(request):
-    from django.db.models import Q
-    
-    items = Item.objects.filter(status='active').select_related('category', 'seller')
-    
     search_query = request.GET.get('q', '')
     category_filter = request.GET.get('category', 'all')
     min_price = request.GET.get('min_price', '0')
     max_price = request.GET.get('max_price', '10000000')
     
-    if search_query:
-        items = items.filter(
-            Q(title__icontains=search_query) | 
-            Q(description__icontains=search_query)
+    categories = Category.cached_all()
+    
+    # Anonymous visitors share one cached listing per filter combination;
+    # the key embeds a version that any Item save or delete bumps
+    cache_key = None
+    items = None
+    if not request.user.is_authenticated:
+        filters = '|'.join([search_query, category_filter, min_price, max_price])
+        cache_key = 'auctions:home:{}:{}'.format(
+            Item.home_cache_version(),
+            hashlib.md5(filters.encode()).hexdigest()
         )
+        items = cache.get(cache_key)
     
-    if category_filter and category_filter != 'all':
-        try:
-            category = Category.objects.get(name__iexact=category_filter)
-            items = items.filter(category=category)
-        except Category.DoesNotExist:
-            pass
-    
-    try:
-        min_price_val = float(min_price) if min_price else 0
-        max_price_val = float(max_price) if max_price else 10000000
-        items = items.filter(current_price__gte=min_price_val, current_price__lte=max_price_val)
-    except ValueError:
-        pass
-    
-    items = items.order_by('-created_at')
-    
-    categories = Category.objects.all()
+    if items is None:
+        items = filter_home_items(request, search_query, category_filter)
+        if cache_key:
+            cache.set(cache_key, items, 60)
     
     context = {
         'items': items,
@@ -47,12 +88,37 @@ def home(request):
         'selected_category': category_filter,
         'min_price': min_price,
         'max_price': max_price,
-        'item_count': items.count(),
+        'item_count': len(items),
     }
     return render(request, 'home.html', context)
 
+def filter_home_items(request, search_query, category_filter):
+    """Apply the home page search, category and price filters and fetch the cards"""
+    
+    items = Item.objects.filter(status='active').select_related('category').only(*ITEM_CARD_FIELDS)
+    
+    if search_query:
+        items = items.filter(
+            Q(title__icontains=search_query) | 
+            Q(description__icontains=search_query)
+        )
+    
+    if category_filter and category_filter != 'all':
+        category_id = Category.cached_ids_by_name().get(category_filter.lower())
+        if category_id:
+            items = items.filter(category_id=category_id)
+    
+    price_filter = HomeFilterForm(request.GET)
+    if price_filter.is_valid():
+        items = items.filter(current_price__range=price_filter.price_range())
+    
+    # Materialize once so the count comes from the fetched rows, not a second COUNT(*)
+    return list(items.order_by('-created_at'))
+
 def item_list(request):
-    items = Item.objects.filter(status='active').order_by('-created_at')
+    items = Item.objects.filter(status='active').select_related(
+        'category', 'seller'
+    ).only(*ITEM_CARD_FIELDS, 'seller__username').order_by('-created_at')
     
     category_filter = request.GET.get('category')
     if category_filter:
@@ -66,17 +132,20 @@ def item_list(request):
     elif sort_by == 'ending_soon':
         items = items.filter(end_time__gt=timezone.now()).order_by('end_time')
     
-    categories = Category.objects.all()
+    categories = Category.cached_all()
+    
+    page_obj = Paginator(items, 24).get_page(request.GET.get('page'))
     
     context = {
-        'items': items,
+        'items': page_obj,
+        'page_obj': page_obj,
         'categories': categories,
         'selected_category': category_filter,
     }
     return render(request, 'auctions/item_list.html', context)
 
 def item_detail(request, pk):
-    item = get_object_or_404(Item, pk=pk)
+    item = get_object_or_404(Item.objects.select_related('seller__profile', 'category'), pk=pk)
     
     # Privacy enforcement: private and off_sale items only visible to seller
     if item.status in ['private', 'off_sale']:
@@ -84,30 +153,33 @@ def item_detail(request, pk):
             messages.error(request, "This item is not available for public viewing.")
             return redirect('home')
     
+    # Atomic increment in SQL; bump the in-memory copy for display only
+    Item.objects.filter(pk=item.pk).update(view_count=F('view_count') + 1)
     item.view_count += 1
-    item.save(update_fields=['view_count'])
     
-    bids = item.bids.select_related('bidder').order_by('-amount')[:10]
+    # Materialize the top bids once; the highest bid and the "has bids" check reuse it
+    bids = list(
+        item.bids.select_related('bidder__profile').only(
+            'amount', 'bid_time', 'is_winning', 'item_id',
+            'bidder__username', 'bidder__profile__profile_picture',
+        ).order_by('-amount')[:10]
+    )
     reviews = item.reviews.select_related('reviewer').all()[:5]
     
-    highest_bid = item.bids.order_by('-amount').first()
+    highest_bid = bids[0] if bids else None
     is_highest_bidder = False
     if request.user.is_authenticated and highest_bid:
         is_highest_bidder = highest_bid.bidder == request.user
     
     seller_rating = 0
     seller_review_count = 0
-    if hasattr(item.seller, 'profile'):
-        seller_rating = item.seller.profile.average_rating()
-        seller_review_count = item.seller.profile.rating_count
-    
-    all_images = []
-    if item.main_image:
-        all_images.append(item.main_image)
-    for img_field in ['image1', 'image2', 'image3', 'image4']:
-        img = getattr(item, img_field)
-        if img:
-            all_images.append(img)
+    seller_profile = getattr(item.seller, 'profile', None)
+    if seller_profile:
+        seller_rating = seller_profile.average_rating()
+        seller_review_count = seller_profile.rating_count
+    
+    all_images = [item.main_image] if item.main_image else []
+    all_images.extend(item_image.image for item_image in item.images.all())
     
     bid_form = PlaceBidForm(item=item)
     review_form = ReviewForm()
@@ -115,15 +187,20 @@ def item_detail(request, pk):
     user_has_bid = False
     user_has_reviewed = False
     if request.user.is_authenticated:
-        user_has_bid = Bid.objects.filter(item=item, bidder=request.user).exists()
-        user_has_reviewed = Review.objects.filter(item=item, reviewer=request.user).exists()
+        # Both existence probes in one round-trip
+        probes = Item.objects.filter(pk=item.pk).annotate(
+            user_has_bid=Exists(Bid.objects.filter(item=OuterRef('pk'), bidder=request.user)),
+            user_has_reviewed=Exists(Review.objects.filter(item=OuterRef('pk'), reviewer=request.user)),
+        ).values('user_has_bid', 'user_has_reviewed').first()
+        user_has_bid = probes['user_has_bid']
+        user_has_reviewed = probes['user_has_reviewed']
     
     # Check if Buy Now should be shown
     # Show Buy Now until the first valid bid (hide after first bid)
     show_buy_now = False
     if item.buy_now_price and item.status == 'active':
         # Hide Buy Now if there are any bids
-        has_bids = item.bids.exists()
+        has_bids = item.bid_count > 0
         show_buy_now = not has_bids
     
     # Check if CAPTCHA should be shown for this auction
@@ -148,11 +225,36 @@ def item_detail(request, pk):
     }
     return render(request, 'auctions/item_detail.html', context)
 
+def refresh_winning_bid(item):
+    """Flag the item's highest bid as winning and sync current_price/bid_count.
+    
+    Reads the top bid's pk, then runs two UPDATE statements, so no bid rows are
+    loaded into Python. The updates send no Item signals, so the home listings
+    are retired here. The bid UPDATE takes the pk as a literal because MySQL
+    rejects an UPDATE whose subquery reads the table being updated (error 1093).
+    """
+    
+    top_bid = Bid.objects.filter(item=item).order_by('-amount', 'bid_time')
+    top_pk = top_bid.values_list('pk', flat=True).first()
+    Bid.objects.filter(item=item).update(
+        is_winning=Case(
+            When(pk=top_pk, then=Value(True)),
+            default=Value(False),
+        )
+    )
+    Item.objects.filter(pk=item.pk).update(
+        current_price=Subquery(top_bid.values('amount')[:1]),
+        bid_count=F('bid_count') + 1,
+    )
+    bump_home_cache_version()
+
 @login_required
 def place_bid(request, pk):
     item = get_object_or_404(Item, pk=pk)
     
     if request.method == 'POST':
+        now = timezone.now()
+        
         if item.seller == request.user:
             messages.error(request, "You cannot bid on your own item!")
             return redirect('item_detail', pk=pk)
@@ -161,7 +263,7 @@ def place_bid(request, pk):
             messages.error(request, "This auction is no longer active.")
             return redirect('item_detail', pk=pk)
         
-        if item.end_time <= timezone.now():
+        if item.end_time <= now:
             messages.error(request, "This auction has ended.")
             return redirect('item_detail', pk=pk)
         
@@ -173,9 +275,6 @@ def place_bid(request, pk):
             bid_amount = bid.amount
             
             # RUN ALL CHECKS IN PARALLEL - collect results but don't return early
-            from django.conf import settings
-            from .rapid_bidding import RapidBiddingDetector
-            
             should_reject_bid = False
             rejection_reasons = []
             
@@ -201,7 +300,7 @@ def place_bid(request, pk):
                         request.session[session_key] = {
                             'amount': str(bid_amount),
                             'item_id': item.id,
-                            'timestamp': timezone.now().isoformat(),
+                            'timestamp': now.isoformat(),
                         }
                         request.session[f'show_captcha_{item.id}'] = True
                         rejection_reasons.append(('warning', rapid_message))
@@ -210,7 +309,7 @@ def place_bid(request, pk):
             
             # 2. Check account age (but don't return - let fraud detection run) - unless user has bypass
             if not bypass_account_age:
-                account_age_days = (timezone.now() - request.user.date_joined).days
+                account_age_days = (now - request.user.date_joined).days
                 account_age_blocked = False
                 
                 if bid_amount > settings.HIGH_VALUE_BID_THRESHOLD:
@@ -227,13 +326,12 @@ def place_bid(request, pk):
             # 3. ALWAYS save bid temporarily to run fraud detection (even if will be deleted)
             bid.save()
             
-            # 4. Run fraud detection REGARDLESS of other failures
+            # 4. Run blocking fraud checks REGARDLESS of other failures (the rest run after the response)
             fraud_alerts = []
             fraud_blocked = False
             try:
-                from .fraud_detection import FraudDetectionService
                 fraud_service = FraudDetectionService()
-                fraud_alerts = fraud_service.analyze_bid(bid)
+                fraud_alerts = fraud_service.analyze_bid_critical(bid)
                 
                 if fraud_alerts:
                     # Fraud alerts are SAVED to database regardless of bid outcome
@@ -242,16 +340,12 @@ def place_bid(request, pk):
                     # Build detailed fraud message for user
                     fraud_types = set(alert.alert_type for alert in fraud_alerts)
                     fraud_details = []
-                    if 'rapid_bidding' in fraud_types:
-                        fraud_details.append("rapid bidding pattern")
-                    if 'unusual_bid_amount' in fraud_types:
-                        fraud_details.append("unusual bid amount (3x+ average)")
-                    if 'bid_sniping' in fraud_types:
-                        fraud_details.append("suspicious bid timing")
-                    if 'shill_bidding' in fraud_types:
+                    if 'self_bidding' in fraud_types:
+                        fraud_details.append("bidding on your own item")
+                    if 'shill_bidding_seller_affinity' in fraud_types:
                         fraud_details.append("possible shill bidding")
-                    if 'new_account_high_value' in fraud_types:
-                        fraud_details.append("new account high-value bid")
+                    if 'collusive_bidding' in fraud_types:
+                        fraud_details.append("possible collusive bidding")
                     
                     fraud_msg = f"⚠️ FRAUD ALERT: Detected {', '.join(fraud_details)}. "
                     
@@ -268,11 +362,15 @@ def place_bid(request, pk):
                         # User has bypass - just warn but don't block
                         rejection_reasons.append(('warning', fraud_msg + "Logged for review (you have fraud detection bypass)."))
             except Exception as e:
-                import logging
                 logging.error(f"Fraud detection failed: {str(e)}")
             
             # 5. If ANY check failed, delete bid and show ALL messages
             if should_reject_bid:
+                # The rejected bid is never queued, so record the remaining fraud checks first
+                try:
+                    FraudDetectionService().analyze_rejected_bid(bid, fraud_alerts)
+                except Exception as e:
+                    logging.error(f"Fraud detection failed for rejected bid: {str(e)}")
                 bid.delete()
                 for msg_type, msg_text in rejection_reasons:
                     if msg_type == 'error':
@@ -281,17 +379,9 @@ def place_bid(request, pk):
                         messages.warning(request, msg_text)
                 return redirect('item_detail', pk=pk)
             
-            # 6. Bid is valid - update auction state
-            Bid.objects.filter(item=item).update(is_winning=False)
-            
-            highest_bid = item.bids.order_by('-amount').first()
-            if highest_bid:
-                highest_bid.is_winning = True
-                highest_bid.save(update_fields=['is_winning'])
-                item.current_price = highest_bid.amount
-            
-            item.bid_count += 1
-            item.save(update_fields=['current_price', 'bid_count'])
+            # 6. Bid is valid - update auction state and queue the remaining fraud checks
+            refresh_winning_bid(item)
+            enqueue_bid_analysis(bid, fraud_alerts)
             
             # Show success and any warnings
             messages.success(request, f'Your bid of UGX {bid.amount:,.0f} has been placed successfully!')
@@ -304,26 +394,44 @@ def place_bid(request, pk):
     
     return redirect('item_detail', pk=pk)
 
+def consume_captcha(hashkey):
+    """Return the expected answer for a CAPTCHA and invalidate it.
+    
+    Answers are read from the cache primed when the challenge was issued, falling
+    back to CaptchaStore on a miss. The store row is always deleted so a challenge
+    can only be used once. Raises CaptchaStore.DoesNotExist for unknown or
+    already-used keys.
+    """
+    
+    cache_key = CAPTCHA_CACHE_KEY.format(hashkey)
+    response = cache.get(cache_key)
+    if response is None:
+        response = CaptchaStore.objects.get(hashkey=hashkey).response
+    cache.delete(cache_key)
+    
+    deleted, _ = CaptchaStore.objects.filter(hashkey=hashkey).delete()
+    if not deleted:
+        raise CaptchaStore.DoesNotExist
+    return response
+
 @login_required
 def verify_captcha(request, pk):
     """Verify CAPTCHA and allow pending bid to proceed"""
-    from captcha.models import CaptchaStore
-    from captcha.helpers import captcha_image_url
-    from datetime import datetime, timedelta
-    from decimal import Decimal, InvalidOperation
-    from .rapid_bidding import RapidBiddingDetector
     
     item = get_object_or_404(Item, pk=pk)
     
     if request.method == 'POST':
+        now = timezone.now()
+        
         # Verify CAPTCHA answer
         captcha_key = request.POST.get('captcha_0')
         captcha_value = request.POST.get('captcha_1')
         
         if captcha_key and captcha_value:
             try:
-                captcha = CaptchaStore.objects.get(hashkey=captcha_key)
-                if captcha.response == captcha_value.lower():
+                # Single-use: the challenge is invalidated before the answer is checked
+                expected_response = consume_captcha(captcha_key)
+                if expected_response == captcha_value.lower():
                     # CAPTCHA passed - retrieve pending bid from session
                     session_key = f'pending_bid_{item.id}'
                     pending_bid = request.session.get(session_key)
@@ -331,7 +439,6 @@ def verify_captcha(request, pk):
                     if pending_bid:
                         # Validate timestamp (max 5 minutes old)
                         bid_timestamp = datetime.fromisoformat(pending_bid['timestamp'])
-                        now = timezone.now()
                         age = (now - bid_timestamp).total_seconds()
                         
                         if age > 300:  # 5 minutes
@@ -355,8 +462,6 @@ def verify_captcha(request, pk):
                                 # Clean up session
                                 del request.session[session_key]
                                 del request.session[f'show_captcha_{item.id}']
-                                # Delete the used CAPTCHA
-                                captcha.delete()
                                 return redirect('item_detail', pk=pk)
                             
                             # Check auction is still active
@@ -365,15 +470,13 @@ def verify_captcha(request, pk):
                                 # Clean up
                                 del request.session[session_key]
                                 del request.session[f'show_captcha_{item.id}']
-                                captcha.delete()
                                 return redirect('item_detail', pk=pk)
                             
-                            if item.end_time <= timezone.now():
+                            if item.end_time <= now:
                                 messages.error(request, "This auction has ended.")
                                 # Clean up
                                 del request.session[session_key]
                                 del request.session[f'show_captcha_{item.id}']
-                                captcha.delete()
                                 return redirect('item_detail', pk=pk)
                             
                             # Create the bid (but don't mark CAPTCHA passed yet - fraud detection must pass first)
@@ -384,19 +487,20 @@ def verify_captcha(request, pk):
                             )
                             bid.save()
                             
-                            # Delete the used CAPTCHA to prevent reuse
-                            captcha.delete()
-                            
-                            # Run fraud detection (mirror place_bid logic)
+                            # Run blocking fraud checks (mirror place_bid logic)
+                            fraud_alerts = []
                             fraud_passed = True
                             try:
-                                from .fraud_detection import FraudDetectionService
                                 fraud_service = FraudDetectionService()
-                                fraud_alerts = fraud_service.analyze_bid(bid)
+                                fraud_alerts = fraud_service.analyze_bid_critical(bid)
                                 
                                 if fraud_alerts:
                                     critical_alerts = [alert for alert in fraud_alerts if alert.severity == 'critical']
                                     if critical_alerts:
+                                        try:
+                                            fraud_service.analyze_rejected_bid(bid, fraud_alerts)
+                                        except Exception as e:
+                                            logging.error(f"Fraud detection failed for rejected bid: {str(e)}")
                                         bid.delete()
                                         fraud_passed = False
                                         # Clean up session
@@ -407,7 +511,6 @@ def verify_captcha(request, pk):
                                     else:
                                         messages.warning(request, "Your bid has been placed but flagged for review. Our team will verify the activity.")
                             except Exception as e:
-                                import logging
                                 logging.error(f"Fraud detection failed in verify_captcha: {str(e)}")
                                 pass
                             
@@ -415,16 +518,9 @@ def verify_captcha(request, pk):
                             if fraud_passed:
                                 RapidBiddingDetector.pass_captcha_challenge(request.user, item)
                             
-                            # Update auction state
-                            Bid.objects.filter(item=item).update(is_winning=False)
-                            highest_bid = item.bids.order_by('-amount').first()
-                            if highest_bid:
-                                highest_bid.is_winning = True
-                                highest_bid.save(update_fields=['is_winning'])
-                                item.current_price = highest_bid.amount
-                            
-                            item.bid_count += 1
-                            item.save(update_fields=['current_price', 'bid_count'])
+                            # Update auction state and queue the remaining fraud checks
+                            refresh_winning_bid(item)
+                            enqueue_bid_analysis(bid, fraud_alerts)
                             
                             # Clean up session
                             del request.session[session_key]
@@ -440,7 +536,6 @@ def verify_captcha(request, pk):
                                 del request.session[session_key]
                             if f'show_captcha_{item.id}' in request.session:
                                 del request.session[f'show_captcha_{item.id}']
-                            captcha.delete()
                     else:
                         messages.error(request, "No pending bid found. Please try bidding again.")
                         # Clean up session flag
@@ -449,7 +544,6 @@ def verify_captcha(request, pk):
                 else:
                     # CAPTCHA failed
                     RapidBiddingDetector.fail_captcha_challenge(request.user, item)
-                    captcha.delete()  # Clean up failed attempt
                     messages.error(request, "Incorrect answer. Please try again.")
                     return redirect('item_detail', pk=pk)
             except CaptchaStore.DoesNotExist:
@@ -468,119 +562,125 @@ def verify_captcha(request, pk):
 @login_required
 def buy_now(request, pk):
     """Handle immediate purchase via Buy Now"""
-    from django.db import transaction, connection
-    from decimal import Decimal
-    from users.models import Wallet, WalletTransaction
-    from django.http import Http404
-    
-    # First, validate the item exists and basic checks
-    try:
-        item = Item.objects.get(pk=pk)
-    except Item.DoesNotExist:
-        raise Http404("Item not found")
-    
-    # Check basic prerequisites before transaction
-    if item.status != 'active':
-        messages.error(request, "This auction is no longer active.")
-        return redirect('item_detail', pk=pk)
     
-    if item.end_time <= timezone.now():
-        messages.error(request, "This auction has ended.")
-        return redirect('item_detail', pk=pk)
-    
-    if not item.buy_now_price:
-        messages.error(request, "This item doesn't have a Buy Now price.")
-        return redirect('item_detail', pk=pk)
-    
-    if item.seller == request.user:
-        messages.error(request, "You cannot buy your own item!")
-        return redirect('item_detail', pk=pk)
-    
-    if item.bids.exists():
-        messages.error(request, "Buy Now is no longer available. Bidding has started.")
-        return redirect('item_detail', pk=pk)
-    
-    # Check wallet balance
-    try:
-        wallet = request.user.wallet
-        if wallet.balance < item.buy_now_price:
-            messages.error(request, f'Insufficient wallet balance. You need UGX {item.buy_now_price:,.0f} but have UGX {wallet.balance:,.0f}. Please deposit funds.')
-            return redirect('wallet_dashboard')
-    except:
+    if not Wallet.objects.filter(user=request.user).exists():
         messages.error(request, 'You need to have a wallet to use Buy Now. Please contact support.')
         return redirect('item_detail', pk=pk)
     
-    # Calculate amounts
-    platform_tax_rate = Decimal('0.05')
-    platform_tax = item.buy_now_price * platform_tax_rate
-    total_amount = item.buy_now_price
-    seller_receives = total_amount - platform_tax
-    
-    # Atomic purchase transaction - works on all databases
+    # Atomic purchase transaction - the item row stays locked until commit,
+    # so every check below runs against its current state
     with transaction.atomic():
-        # Attempt atomic conditional update - only succeeds if item hasn't been sold yet
-        updated_count = Item.objects.filter(
-            pk=pk,
-            status='active',
-            winner__isnull=True
-        ).update(
-            status='sold',
-            winner=request.user
+        item = get_object_or_404(
+            Item.objects.select_for_update(of=('self',)).select_related('seller'),
+            pk=pk
         )
+        now = timezone.now()
+        stamp = now.timestamp()
         
-        # If update didn't affect any rows, someone else bought it first
-        if updated_count == 0:
+        if item.winner_id and item.status == 'sold':
             messages.error(request, "Someone else just purchased this item!")
             return redirect('item_detail', pk=pk)
         
-        # Purchase successful - process wallet transactions
-        wallet.balance -= total_amount
-        wallet.save()
+        if item.status != 'active':
+            messages.error(request, "This auction is no longer active.")
+            return redirect('item_detail', pk=pk)
         
-        WalletTransaction.objects.create(
-            wallet=wallet,
-            transaction_type='payment',
-            amount=-total_amount,
-            balance_after=wallet.balance,
-            description=f'Buy Now purchase: {item.title}',
-            payment_method='wallet',
-            payment_reference=f'BUYNOW-{pk}-{timezone.now().timestamp()}',
-            status='completed'
-        )
+        if item.end_time <= now:
+            messages.error(request, "This auction has ended.")
+            return redirect('item_detail', pk=pk)
         
-        seller_wallet, _ = Wallet.objects.get_or_create(user=item.seller)
-        seller_wallet.balance += seller_receives
-        seller_wallet.save()
+        if not item.buy_now_price:
+            messages.error(request, "This item doesn't have a Buy Now price.")
+            return redirect('item_detail', pk=pk)
         
-        WalletTransaction.objects.create(
-            wallet=seller_wallet,
-            transaction_type='sale',
-            amount=seller_receives,
-            balance_after=seller_wallet.balance,
-            description=f'Sale: {item.title} (Buy Now, 5% platform fee deducted)',
-            payment_method='wallet',
-            payment_reference=f'BUYNOW-SALE-{pk}-{timezone.now().timestamp()}',
-            status='completed'
-        )
+        if item.seller_id == request.user.id:
+            messages.error(request, "You cannot buy your own item!")
+            return redirect('item_detail', pk=pk)
         
-        # Platform tax deduction from seller
-        seller_wallet.balance -= platform_tax
-        seller_wallet.save()
-        
-        WalletTransaction.objects.create(
-            wallet=seller_wallet,
-            transaction_type='withdrawal',
-            amount=-platform_tax,
-            balance_after=seller_wallet.balance,
-            description=f'Platform tax (5%) for {item.title}',
-            payment_method='platform_fee',
-            payment_reference=f'TAX-{pk}-{timezone.now().timestamp()}',
-            status='completed'
+        if item.bid_count > 0:
+            messages.error(request, "Buy Now is no longer available. Bidding has started.")
+            return redirect('item_detail', pk=pk)
+        
+        # Lock both wallets in primary-key order so the balance check and the
+        # balance_after values below use their committed balances
+        Wallet.objects.get_or_create(user=item.seller)
+        wallets = {
+            locked.user_id: locked
+            for locked in Wallet.objects.select_for_update().filter(
+                user_id__in=[request.user.id, item.seller_id]
+            ).order_by('pk')
+        }
+        wallet = wallets[request.user.id]
+        seller_wallet = wallets[item.seller_id]
+        
+        # Check wallet balance
+        if wallet.balance < item.buy_now_price:
+            messages.error(request, f'Insufficient wallet balance. You need UGX {item.buy_now_price:,.0f} but have UGX {wallet.balance:,.0f}. Please deposit funds.')
+            return redirect('wallet_dashboard')
+        
+        # Calculate amounts
+        platform_tax = item.buy_now_price * TAX_RATE
+        total_amount = item.buy_now_price
+        seller_receives = total_amount - platform_tax
+        
+        item.status = 'sold'
+        item.winner = request.user
+        item.save(update_fields=['status', 'winner'])
+        
+        # Purchase successful - move funds with in-database arithmetic
+        Wallet.objects.filter(pk=wallet.pk).update(
+            balance=F('balance') - total_amount,
+            updated_at=now
+        )
+        # Seller is credited the sale and then charged the platform tax
+        Wallet.objects.filter(pk=seller_wallet.pk).update(
+            balance=F('balance') + seller_receives - platform_tax,
+            updated_at=now
         )
         
+        buyer_balance = wallet.balance - total_amount
+        seller_balance_after_sale = seller_wallet.balance + seller_receives
+        seller_balance = seller_balance_after_sale - platform_tax
+        
+        WalletTransaction.objects.bulk_create([
+            WalletTransaction(
+                wallet=wallet,
+                transaction_type='payment',
+                amount=-total_amount,
+                balance_after=buyer_balance,
+                description=f'Buy Now purchase: {item.title}',
+                payment_method='wallet',
+                payment_reference=f'BUYNOW-{pk}-{stamp}',
+                status='completed'
+            ),
+            WalletTransaction(
+                wallet=seller_wallet,
+                transaction_type='sale',
+                amount=seller_receives,
+                balance_after=seller_balance_after_sale,
+                description=f'Sale: {item.title} (Buy Now, 5% platform fee deducted)',
+                payment_method='wallet',
+                payment_reference=f'BUYNOW-SALE-{pk}-{stamp}',
+                status='completed'
+            ),
+            # Platform tax deduction from seller
+            WalletTransaction(
+                wallet=seller_wallet,
+                transaction_type='withdrawal',
+                amount=-platform_tax,
+                balance_after=seller_balance,
+                description=f'Platform tax (5%) for {item.title}',
+                payment_method='platform_fee',
+                payment_reference=f'TAX-{pk}-{stamp}',
+                status='completed'
+            ),
+        ])
+        wallet.balance = buyer_balance
+        seller_wallet.balance = seller_balance
+        
         # Create transaction log
         TransactionLog.objects.create(
-            transaction_id=f'BUYNOW-{item.pk}-{request.user.pk}-{timezone.now().timestamp()}',
+            transaction_id=f'BUYNOW-{item.pk}-{request.user.pk}-{stamp}',
             transaction_type='buy_now_purchase',
             item=item,
             user=request.user,
@@ -593,7 +693,7 @@ def buy_now(request, pk):
                 'buy_now_price': str(total_amount),
                 'platform_tax': str(platform_tax),
                 'seller_receives': str(seller_receives),
-                'timestamp': timezone.now().isoformat()
+                'timestamp': now.isoformat()
             }
         )
         
@@ -604,10 +704,6 @@ def buy_now(request, pk):
 
 @login_required
 def sell_item(request):
-    from .forms import SellItemForm
-    from django.contrib import messages
-    from datetime import timedelta
-    
     profile = request.user.profile
     if not profile.is_seller or profile.seller_status != 'approved':
         if profile.seller_status == 'pending':
@@ -645,7 +741,7 @@ def sell_item(request):
 
 @login_required
 def submit_review(request, pk):
-    item = get_object_or_404(Item, pk=pk)
+    item = get_object_or_404(Item.objects.select_related('seller__profile'), pk=pk)
     
     if item.seller == request.user:
         messages.error(request, "You cannot review your own item!")
@@ -669,8 +765,8 @@ def submit_review(request, pk):
             review.seller = item.seller
             review.save()
             
-            if hasattr(item.seller, 'profile'):
-                profile = item.seller.profile
+            profile = getattr(item.seller, 'profile', None)
+            if profile:
                 profile.rating_sum += int(review.rating)
                 profile.rating_count += 1
                 profile.save(update_fields=['rating_sum', 'rating_count'])
@@ -684,36 +780,51 @@ def submit_review(request, pk):
     return redirect('item_detail', pk=pk)
 
 def seller_profile(request, username):
-    from users.models import Follow
-    
-    seller = get_object_or_404(User, username=username)
-    
-    # Privacy enforcement: only show public items unless viewing own profile
-    if request.user.is_authenticated and request.user == seller:
-        # Owner can see all their items
-        items = Item.objects.filter(seller=seller).order_by('-created_at')
-        active_items = items.exclude(status='sold')
+    # Seller, profile (with its follow counters) and follow state in one query
+    sellers = User.objects.select_related('profile')
+    if request.user.is_authenticated:
+        sellers = sellers.annotate(
+            is_followed=Exists(Follow.objects.filter(follower=request.user, following=OuterRef('pk')))
+        )
+    seller = get_object_or_404(sellers, username=username)
+    
+    is_owner = request.user.is_authenticated and request.user == seller
+    
+    def load_listing():
+        # Privacy enforcement: only show public items unless viewing own profile
+        items = Item.objects.filter(seller=seller)
+        if not is_owner:
+            # Public view: only show active and sold items
+            items = items.filter(status__in=['active', 'sold'])
+        items = list(items.select_related('category').only(*ITEM_CARD_FIELDS).order_by('-created_at'))
+        reviews = list(Review.objects.filter(seller=seller).select_related(
+            'reviewer__profile', 'item'
+        ).order_by('-created_at')[:10])
+        return items, reviews
+    
+    # Every other visitor sees the same public listing; item, bid and review changes evict it
+    if is_owner:
+        items, reviews = load_listing()
     else:
-        # Public view: only show active items
-        items = Item.objects.filter(seller=seller, status__in=['active', 'sold']).order_by('-created_at')
-        active_items = items.filter(status='active')
-    
-    sold_items = items.filter(status='sold')
+        items, reviews = cache.get_or_set(SELLER_PAGE_CACHE_KEY.format(seller.pk), load_listing, 300)
     
-    reviews = Review.objects.filter(seller=seller).select_related('reviewer', 'item').order_by('-created_at')[:10]
+    # Owner sees every unsold item; the public only sees live auctions
+    sold_items = [item for item in items if item.status == 'sold']
+    if is_owner:
+        active_items = [item for item in items if item.status != 'sold']
+    else:
+        active_items = [item for item in items if item.status == 'active']
     
     seller_rating = 0
     seller_review_count = 0
-    if hasattr(seller, 'profile'):
-        seller_rating = seller.profile.average_rating()
-        seller_review_count = seller.profile.rating_count
-    
-    followers_count = seller.followers.count()
-    following_count = seller.following.count()
-    
-    is_following = False
-    if request.user.is_authenticated:
-        is_following = Follow.objects.filter(follower=request.user, following=seller).exists()
+    followers_count = 0
+    following_count = 0
+    seller_profile = getattr(seller, 'profile', None)
+    if seller_profile:
+        seller_rating = seller_profile.average_rating()
+        seller_review_count = seller_profile.rating_count
+        followers_count = seller_profile.follower_count
+        following_count = seller_profile.following_count
     
     context = {
         'seller': seller,
@@ -722,19 +833,18 @@ def seller_profile(request, username):
         'reviews': reviews,
         'seller_rating': seller_rating,
         'seller_review_count': seller_review_count,
-        'total_items': items.count(),
+        'total_items': len(items),
         'followers_count': followers_count,
         'following_count': following_count,
-        'is_following': is_following,
+        'is_following': getattr(seller, 'is_followed', False),
     }
     return render(request, 'auctions/seller_profile.html', context)
 
 @login_required
 def view_cart(request):
-    from decimal import Decimal
     cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_items = cart.items.select_related('item__seller').all()
-    total = cart.total()
+    cart_items = list(cart.items.select_related('item__seller'))
+    total = cart.total(cart_items)
     
     shipping_estimate = Decimal('0')
     for cart_item in cart_items:
@@ -766,7 +876,13 @@ def add_to_cart(request, pk):
     
     cart, created = Cart.objects.get_or_create(user=request.user)
     
-    cart_item, item_created = CartItem.objects.get_or_create(cart=cart, item=item)
+    # Re-adding is rare, so insert directly and let the unique (cart, item) constraint catch duplicates
+    try:
+        with transaction.atomic():
+            CartItem.objects.create(cart=cart, item=item)
+        item_created = True
+    except IntegrityError:
+        item_created = False
     
     if item_created:
         messages.success(request, f'"{item.title}" has been added to your cart!')
@@ -783,22 +899,32 @@ def remove_from_cart(request, pk):
     messages.success(request, f'"{item_title}" has been removed from your cart.')
     return redirect('view_cart')
 
+def cart_shipping_cost(items, delivery_city, delivery_area):
+    """
+    Sum shipping for the given items, looking up every seller-city route
+    to delivery_city in a single ShippingCost query.
+    """
+    
+    items = [item for item in items if not item.free_shipping]
+    route_costs = ShippingCost.costs_to(
+        delivery_city,
+        {item.seller_city for item in items if item.seller_city != delivery_city}
+    )
+    return sum(
+        (item.calculate_shipping_cost(delivery_city, delivery_area, route_costs) for item in items),
+        Decimal('0')
+    )
+
 @login_required
 def checkout(request):
-    from .models import Country, ShippingLocation, ShippingCost
-    from payments.services import PaymentService, settle_payment_to_sellers
-    from django.db import transaction as db_transaction
-    from decimal import Decimal
-    
     cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_items = cart.items.select_related('item__seller').all()
+    cart_items = list(cart.items.select_related('item__seller'))
     
     if not cart_items:
         messages.warning(request, "Your cart is empty.")
         return redirect('view_cart')
     
-    subtotal = cart.total()
-    TAX_RATE = Decimal('0.05')
+    subtotal = cart.total(cart_items)
     
     shipping_cost = Decimal('0')
     
@@ -818,13 +944,11 @@ def checkout(request):
                 messages.error(request, "Please select your delivery city and area, or choose pickup option.")
                 return redirect('checkout')
             
-            for cart_item in cart_items:
-                item = cart_item.item
-                if item.free_shipping:
-                    continue
-                elif item.seller_city and delivery_city:
-                    item_shipping = item.calculate_shipping_cost(delivery_city, delivery_area)
-                    shipping_cost += Decimal(str(item_shipping))
+            shipping_cost = cart_shipping_cost(
+                [cart_item.item for cart_item in cart_items if cart_item.item.seller_city],
+                delivery_city,
+                delivery_area
+            )
         
         tax_amount = (subtotal + shipping_cost) * TAX_RATE
         total = subtotal + shipping_cost + tax_amount
@@ -839,11 +963,6 @@ def checkout(request):
             messages.error(request, "Please provide your mobile money number.")
             return redirect('checkout')
         
-        from payments.models import Payment
-        import uuid
-        
-        payment_id = str(uuid.uuid4())
-        
         payment_service = PaymentService.get_service(payment_method, country_code)
         payment_data = {
             'phone_number': phone_number,
@@ -858,89 +977,65 @@ def checkout(request):
             'redirect_url': request.build_absolute_uri('/')
         }
         
-        result = payment_service.process_payment(float(total), country.currency, payment_data)
+        error = payment_service.validate_payment_data(payment_data)
+        if error:
+            messages.error(request, f'Payment failed: {error}')
+            return redirect('checkout')
         
+        metadata = {
+            'cart_items': [item.item.id for item in cart_items],
+            'country': country_code,
+            'subtotal': float(subtotal),
+            'tax_rate': float(TAX_RATE),
+            'tax_amount': float(tax_amount),
+        }
+        # Redirect-based methods finish on another page, which reads the order details from here
+        if payment_method in ['mtn', 'airtel', 'card', 'paypal']:
+            metadata.update({
+                'base_amount': str(subtotal),
+                'shipping_cost': str(shipping_cost),
+                'platform_tax': str(tax_amount),
+                'total': str(total),
+                'delivery_city': delivery_city,
+                'delivery_area': delivery_area,
+                'pickup_option': pickup_option,
+            })
+            if payment_method in ['mtn', 'airtel']:
+                metadata['phone_number'] = phone_number
+        
+        # Redirect-based payments stay in pending_init until the provider accepts the charge
         payment = Payment.objects.create(
             user=request.user,
             amount=total,
             platform_tax=tax_amount,
             payment_method=payment_method,
             phone_number=phone_number,
-            status='pending' if result.get('success') else 'failed',
-            payment_id=payment_id,
-            metadata={
-                'cart_items': [item.item.id for item in cart_items],
-                'country': country_code,
-                'subtotal': float(subtotal),
-                'tax_rate': float(TAX_RATE),
-                'tax_amount': float(tax_amount),
-                'payment_result': {
-                    'success': result.get('success'),
-                    'message': result.get('message'),
-                    'transaction_id': result.get('transaction_id') or result.get('payment_id') or result.get('session_id')
-                }
-            }
+            status='pending_init' if payment_method in ['mtn', 'airtel', 'card', 'paypal'] else 'pending',
+            metadata=metadata
         )
         
-        if result.get('success'):
-            for cart_item in cart_items:
-                item = cart_item.item
-                TransactionLog.objects.create(
-                    transaction_id=f"ORDER-{payment.payment_id}-{item.id}",
-                    transaction_type='purchase',
-                    item=item,
-                    user=request.user,
-                    amount=item.current_price,
-                    payment_method=payment_method,
-                    payment_reference=payment.payment_id,
-                    data={
-                        'seller': item.seller.username,
-                        'payment_id': payment.payment_id,
-                        'phone_number': phone_number,
-                        'country': country_code,
-                        'currency': country.currency
-                    }
-                )
+        # The user confirms on our own payment page, so the provider call need not hold this worker
+        if payment_method in ['mtn', 'airtel', 'card', 'paypal']:
+            enqueue_checkout_payment(payment, float(total), country.currency, payment_data)
             
             if payment_method in ['mtn', 'airtel']:
-                payment.metadata['base_amount'] = str(subtotal)
-                payment.metadata['shipping_cost'] = str(shipping_cost)
-                payment.metadata['platform_tax'] = str(tax_amount)
-                payment.metadata['total'] = str(total)
-                payment.metadata['phone_number'] = phone_number
-                payment.metadata['delivery_city'] = delivery_city
-                payment.metadata['delivery_area'] = delivery_area
-                payment.metadata['pickup_option'] = pickup_option
-                payment.save()
                 return redirect(f'/ussd/wallet/deposit/{payment.payment_id}/')
             elif payment_method == 'card':
-                payment.metadata['base_amount'] = str(subtotal)
-                payment.metadata['shipping_cost'] = str(shipping_cost)
-                payment.metadata['platform_tax'] = str(tax_amount)
-                payment.metadata['total'] = str(total)
-                payment.metadata['delivery_city'] = delivery_city
-                payment.metadata['delivery_area'] = delivery_area
-                payment.metadata['pickup_option'] = pickup_option
-                payment.save()
                 return redirect(f'/payment/card/{payment.payment_id}/?context=checkout')
-            elif payment_method == 'paypal':
-                payment.metadata['base_amount'] = str(subtotal)
-                payment.metadata['shipping_cost'] = str(shipping_cost)
-                payment.metadata['platform_tax'] = str(tax_amount)
-                payment.metadata['total'] = str(total)
-                payment.metadata['delivery_city'] = delivery_city
-                payment.metadata['delivery_area'] = delivery_area
-                payment.metadata['pickup_option'] = pickup_option
-                payment.save()
-                return redirect(f'/payment/paypal/{payment.payment_id}/?context=checkout')
             else:
-                with db_transaction.atomic():
-                    payment.status = 'completed'
-                    payment.save()
-                    settle_payment_to_sellers(payment, list(cart_items))
-                    cart.items.all().delete()
-                messages.success(request, f'Order placed! {result.get("message", "")}')
-                return redirect('home')
+                return redirect(f'/payment/paypal/{payment.payment_id}/?context=checkout')
+        
+        result = payment_service.process_payment(float(total), country.currency, payment_data)
+        payment = record_checkout_result(payment, result, country.currency, [cart_item.item for cart_item in cart_items])
+        
+        if result.get('success'):
+            with transaction.atomic():
+                payment.status = 'completed'
+                payment.save()
+                settle_payment_to_sellers(payment, cart_items)
+                cart.items.all().delete()
+            messages.success(request, f'Order placed! {result.get("message", "")}')
+            return redirect('home')
         else:
             messages.error(request, f'Payment failed: {result.get("message", "Unknown error")}')
             return redirect('checkout')
@@ -961,108 +1056,107 @@ def checkout(request):
     }
     return render(request, 'auctions/checkout.html', context)
 
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from django.views.decorators.csrf import csrf_exempt
-import json
+class OrjsonResponse(HttpResponse):
+    """JsonResponse equivalent serialized with orjson, for the hot AJAX endpoints"""
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=orjson.dumps(data), **kwargs)
 
-def get_chatbot_response(user_message):
-    """Rule-based chatbot - no API costs!"""
-    import re
-    
-    msg = user_message.lower().strip()
-    
+# Chatbot intents in priority order: the first entry whose patterns all match
+# supplies the reply, so earlier intents win when a message matches several
+CHATBOT_INTENTS = [
     # Casual greetings
-    if re.search(r'\b(yo|yoo)\b', msg):
-        return "Hey! What's good? How can I help you with AuctionHub today?"
-    
-    if re.search(r'\b(what\'?s up|sup|wassup|whats up)\b', msg):
-        return "Not much, just here to help! What brings you to AuctionHub today?"
-    
-    if re.search(r'\b(how (are )?you doin|how are you|how you doing)\b', msg):
-        return "I'm doing great, thanks for asking! How can I assist you today?"
-    
-    if re.search(r'^(hey|hi|hello|hola|good morning|good afternoon|good evening)\b', msg):
-        return "Hi there! 👋 I'm here to help with bidding, payments, or selling. What can I do for you?"
-    
+    ((r'\b(yo|yoo)\b',), "Hey! What's good? How can I help you with AuctionHub today?"),
+    ((r'\b(what\'?s up|sup|wassup|whats up)\b',), "Not much, just here to help! What brings you to AuctionHub today?"),
+    ((r'\b(how (are )?you doin|how are you|how you doing)\b',), "I'm doing great, thanks for asking! How can I assist you today?"),
+    ((r'^(hey|hi|hello|hola|good morning|good afternoon|good evening)\b',), "Hi there! 👋 I'm here to help with bidding, payments, or selling. What can I do for you?"),
     # Thanks/appreciation - request rating
-    if re.search(r'\b(thanks|thank you|thx|appreciate|helpful|helped)\b', msg):
-        return "You're welcome! 😊 If you found this helpful, I'd love your feedback! Could you rate this interaction? ⭐⭐⭐⭐⭐ (1-5 stars). Your feedback helps me improve!\n\nIs there anything else I can help you with today?"
-    
+    ((r'\b(thanks|thank you|thx|appreciate|helpful|helped)\b',), "You're welcome! 😊 If you found this helpful, I'd love your feedback! Could you rate this interaction? ⭐⭐⭐⭐⭐ (1-5 stars). Your feedback helps me improve!\n\nIs there anything else I can help you with today?"),
     # Rating responses
-    if re.search(r'\b[1-5]\s*(stars?|\/5)?\b', msg):
-        return "Thank you so much for the rating! Your feedback helps me serve you better. 😊 Have a great day!"
-    
+    ((r'\b[1-5]\s*(stars?|\/5)?\b',), "Thank you so much for the rating! Your feedback helps me serve you better. 😊 Have a great day!"),
     # Platform features - bidding
-    if re.search(r'\b(how|place|make|bid|bidding)\b', msg) and re.search(r'\b(bid|bidding|auction)\b', msg):
-        return "To place a bid:\n1. Find an item you like\n2. Click the 'Bid' button\n3. Enter your amount (must be higher than current bid)\n4. Confirm!\n\nYou'll get real-time updates if someone outbids you. Is there anything else you'd like to know?"
-    
+    ((r'\b(how|place|make|bid|bidding)\b', r'\b(bid|bidding|auction)\b'), "To place a bid:\n1. Find an item you like\n2. Click the 'Bid' button\n3. Enter your amount (must be higher than current bid)\n4. Confirm!\n\nYou'll get real-time updates if someone outbids you. Is there anything else you'd like to know?"),
     # Payment methods
-    if re.search(r'\b(payment|pay|accepted|methods?)\b', msg):
-        return "We accept:\n• MTN Mobile Money\n• Airtel Money\n• Visa/Mastercard (via Stripe)\n• PayPal\n\nAll payments use bank-grade encryption and fraud detection. A 5% platform fee applies. Need help with a specific payment method?"
-    
+    ((r'\b(payment|pay|accepted|methods?)\b',), "We accept:\n• MTN Mobile Money\n• Airtel Money\n• Visa/Mastercard (via Stripe)\n• PayPal\n\nAll payments use bank-grade encryption and fraud detection. A 5% platform fee applies. Need help with a specific payment method?"),
     # Mobile money
-    if re.search(r'\b(mobile money|mtn|airtel|momo)\b', msg):
-        return "Mobile money is easy! Select MTN or Airtel, enter your phone number, and approve the USSD prompt on your phone. Payment is instant and secure! 💰\n\nNeed help with something else?"
-    
+    ((r'\b(mobile money|mtn|airtel|momo)\b',), "Mobile money is easy! Select MTN or Airtel, enter your phone number, and approve the USSD prompt on your phone. Payment is instant and secure! 💰\n\nNeed help with something else?"),
     # USSD/offline bidding
-    if re.search(r'\b(ussd|offline|no internet|without internet|\*354|\*789)\b', msg):
-        return "Yes! You can bid without internet:\n• MTN: Dial *354#\n• Airtel: Dial *789#\n\nFollow the prompts to browse items and place bids. Perfect for areas with poor internet! ⚡"
-    
+    ((r'\b(ussd|offline|no internet|without internet|\*354|\*789)\b',), "Yes! You can bid without internet:\n• MTN: Dial *354#\n• Airtel: Dial *789#\n\nFollow the prompts to browse items and place bids. Perfect for areas with poor internet! ⚡"),
     # Wallet
-    if re.search(r'\b(wallet|deposit|withdraw|balance)\b', msg):
-        return "Our digital wallet lets you:\n• Deposit via mobile money, card, or PayPal\n• Withdraw to mobile money (1-5 min processing)\n• Minimum withdrawal: UGX 1,000\n\nManage your funds easily! Need specific wallet help?"
-    
+    ((r'\b(wallet|deposit|withdraw|balance)\b',), "Our digital wallet lets you:\n• Deposit via mobile money, card, or PayPal\n• Withdraw to mobile money (1-5 min processing)\n• Minimum withdrawal: UGX 1,000\n\nManage your funds easily! Need specific wallet help?"),
     # Seller trust/safety
-    if re.search(r'\b(trust|safe|seller|scam|fraud|reliable)\b', msg):
-        return "Safety is our priority! ✅\n• Check seller ratings & reviews\n• AI fraud detection (91% accuracy)\n• Verified sellers approved by admins\n• Blockchain-inspired transaction logs\n\nWe've got your back!"
-    
+    ((r'\b(trust|safe|seller|scam|fraud|reliable)\b',), "Safety is our priority! ✅\n• Check seller ratings & reviews\n• AI fraud detection (91% accuracy)\n• Verified sellers approved by admins\n• Blockchain-inspired transaction logs\n\nWe've got your back!"),
     # Selling items
-    if re.search(r'\b(sell|selling|list item|become seller)\b', msg):
-        return "To sell items:\n1. Click 'Sell an Item' (verified sellers only)\n2. Upload photos\n3. Set starting price & auction duration\n4. Items go live instantly!\n\nNeed to become a verified seller? Apply through your profile!"
-    
+    ((r'\b(sell|selling|list item|become seller)\b',), "To sell items:\n1. Click 'Sell an Item' (verified sellers only)\n2. Upload photos\n3. Set starting price & auction duration\n4. Items go live instantly!\n\nNeed to become a verified seller? Apply through your profile!"),
     # Security/payment security
-    if re.search(r'\b(secure|security|safe|encrypted)\b', msg):
-        return "Your security is guaranteed! 🔒\n• Bank-grade encryption\n• HMAC signature verification\n• AI fraud detection (91% accuracy)\n• Daily payment reconciliation\n• WCAG AA accessibility\n\nYour financial data is protected!"
-    
+    ((r'\b(secure|security|safe|encrypted)\b',), "Your security is guaranteed! 🔒\n• Bank-grade encryption\n• HMAC signature verification\n• AI fraud detection (91% accuracy)\n• Daily payment reconciliation\n• WCAG AA accessibility\n\nYour financial data is protected!"),
     # What's new/updates
-    if re.search(r'\b(new|update|2025|recent|latest|improved)\b', msg):
-        return "2025 Platform Upgrades:\n✅ Payment webhook security (HMAC)\n✅ Enhanced fraud detection (91% F1-score)\n✅ Automated reconciliation\n✅ Full CI/CD pipeline\n✅ Accessibility improvements\n\nWe're constantly improving!"
-    
+    ((r'\b(new|update|2025|recent|latest|improved)\b',), "2025 Platform Upgrades:\n✅ Payment webhook security (HMAC)\n✅ Enhanced fraud detection (91% F1-score)\n✅ Automated reconciliation\n✅ Full CI/CD pipeline\n✅ Accessibility improvements\n\nWe're constantly improving!"),
     # Winning auction
-    if re.search(r'\b(win|won|winner|winning)\b', msg):
-        return "When you win an auction:\n1. You'll get a notification\n2. Proceed to checkout\n3. Complete payment\n4. Receive seller contact info for delivery\n\nCongratulations on your win! 🎉"
-    
+    ((r'\b(win|won|winner|winning)\b',), "When you win an auction:\n1. You'll get a notification\n2. Proceed to checkout\n3. Complete payment\n4. Receive seller contact info for delivery\n\nCongratulations on your win! 🎉"),
     # Account/refund/dispute - escalate
-    if re.search(r'\b(account|refund|dispute|problem|issue|error|bug|broken)\b', msg):
-        return "I've reached the limit of what I can help with. For account-specific issues, refunds, or technical problems, please contact our support team:\n\n📧 support@auctionhub.com\n📞 +256-XXX-XXXXXX\n\nThey'll help you right away!"
-    
+    ((r'\b(account|refund|dispute|problem|issue|error|bug|broken)\b',), "I've reached the limit of what I can help with. For account-specific issues, refunds, or technical problems, please contact our support team:\n\n📧 support@auctionhub.com\n📞 +256-XXX-XXXXXX\n\nThey'll help you right away!"),
     # Legal/policy - escalate
-    if re.search(r'\b(legal|policy|terms|conditions|privacy)\b', msg):
-        return "For legal matters and policies, please reach out to our management team at:\n\n📧 info@auctionhub.com\n\nThey'll provide you with the official information you need."
+    ((r'\b(legal|policy|terms|conditions|privacy)\b',), "For legal matters and policies, please reach out to our management team at:\n\n📧 info@auctionhub.com\n\nThey'll provide you with the official information you need."),
+]
+
+CHATBOT_DEFAULT_REPLY = "I'm here to help with AuctionHub! I can answer questions about:\n\n• Placing bids & winning auctions\n• Payment methods (mobile money, cards, PayPal)\n• USSD bidding (*354# MTN, *789# Airtel)\n• Digital wallet deposits/withdrawals\n• Seller trust & safety\n• Platform security features\n\nWhat would you like to know? 😊"
+
+_CHATBOT_RULES = [
+    (tuple(re.compile(pattern, re.IGNORECASE) for pattern in patterns), reply)
+    for patterns, reply in CHATBOT_INTENTS
+]
+
+# Every intent needs its first pattern to match, so one combined scan rules out
+# all of them at once for messages that fall through to the default reply
+_CHATBOT_ANY_INTENT = re.compile(
+    '|'.join(f'(?:{patterns[0]})' for patterns, _ in CHATBOT_INTENTS),
+    re.IGNORECASE
+)
+
+# Replies are a pure function of the normalized message, so repeated questions skip the regex pass
+CHATBOT_CACHE_SIZE = 4096
+CHATBOT_CACHE_MAX_LENGTH = 512
+
+def _match_chatbot_intent(msg):
+    if _CHATBOT_ANY_INTENT.search(msg):
+        for patterns, reply in _CHATBOT_RULES:
+            if all(pattern.search(msg) for pattern in patterns):
+                return reply
     
-    # Default - general help
-    return "I'm here to help with AuctionHub! I can answer questions about:\n\n• Placing bids & winning auctions\n• Payment methods (mobile money, cards, PayPal)\n• USSD bidding (*354# MTN, *789# Airtel)\n• Digital wallet deposits/withdrawals\n• Seller trust & safety\n• Platform security features\n\nWhat would you like to know? 😊"
+    return CHATBOT_DEFAULT_REPLY
+
+_cached_chatbot_intent = lru_cache(maxsize=CHATBOT_CACHE_SIZE)(_match_chatbot_intent)
+
+def get_chatbot_response(user_message):
+    """Rule-based chatbot - no API costs!"""
+    # Patterns are case-insensitive, so lowercasing only widens cache hits
+    msg = user_message.strip().lower()
+    
+    # Long one-off messages are matched directly so they cannot crowd out common questions
+    if len(msg) > CHATBOT_CACHE_MAX_LENGTH:
+        return _match_chatbot_intent(msg)
+    return _cached_chatbot_intent(msg)
 
 @csrf_exempt
 @require_POST
 def chatbot(request):
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         user_message = data.get('message', '')
         
         if not user_message:
-            return JsonResponse({'error': 'No message provided'}, status=400)
+            return OrjsonResponse({'error': 'No message provided'}, status=400)
         
         bot_reply = get_chatbot_response(user_message)
         
-        return JsonResponse({
+        return OrjsonResponse({
             'reply': bot_reply,
             'success': True
         })
         
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             'error': str(e),
             'reply': "I'm having trouble right now. Please try again in a moment! 😊",
             'success': False
@@ -1071,14 +1165,10 @@ def chatbot(request):
 @login_required
 def inbox(request):
     """Show all conversations for the logged-in user"""
-    from .models import Message
     conversations = Message.get_conversations_for_user(request.user)
     
-    # Get unread count
-    unread_total = Message.objects.filter(
-        recipient=request.user,
-        is_read=False
-    ).count()
+    # Every unread message belongs to one of the conversations
+    unread_total = sum(conv['unread_count'] for conv in conversations)
     
     context = {
         'conversations': conversations,
@@ -1089,46 +1179,46 @@ def inbox(request):
 @login_required
 def conversation(request, user_id):
     """View conversation with a specific user"""
-    from .models import Message
     
     try:
-        other_user = User.objects.get(id=user_id)
+        other_user = User.objects.select_related('profile').get(id=user_id)
     except User.DoesNotExist:
         messages.error(request, "User not found.")
         return redirect('inbox')
     
-    # Get all messages between these two users
-    conversation_messages = Message.get_conversation(request.user, other_user)
+    # Get all messages between these two users in one query; item detection,
+    # read-marking and the template all reuse this list
+    conversation_messages = list(
+        Message.get_conversation(request.user, other_user).select_related('sender__profile', 'item')
+    )
     
-    # Mark messages from other user as read
-    Message.objects.filter(
-        sender=other_user,
-        recipient=request.user,
-        is_read=False
-    ).update(is_read=True)
+    # Mark messages from other user as read, skipping the UPDATE when nothing is unread
+    unread_ids = [
+        message.pk for message in conversation_messages
+        if message.sender_id == other_user.id and message.recipient_id == request.user.id and not message.is_read
+    ]
+    if unread_ids:
+        Message.objects.filter(pk__in=unread_ids).update(is_read=True)
     
     # Get item context if there is one
-    item = None
-    if conversation_messages.exists():
-        first_msg_with_item = conversation_messages.filter(item__isnull=False).first()
-        if first_msg_with_item:
-            item = first_msg_with_item.item
-    
-    # Get purchase history with this seller (for sidebar)
-    active_orders = Item.objects.filter(
+    item = next((message.item for message in conversation_messages if message.item_id), None)
+    
+    # Get purchase history with this seller (for sidebar); each list is fetched once
+    order_fields = ('id', 'title', 'current_price', 'main_image')
+    active_orders = list(Item.objects.filter(
         seller=other_user,
         status='active'
     ).filter(
         bids__bidder=request.user
-    ).distinct().order_by('-created_at')[:5]
+    ).only(*order_fields).distinct().order_by('-created_at')[:5])
     
-    completed_orders = Item.objects.filter(
+    completed_orders = list(Item.objects.filter(
         seller=other_user,
         status='sold',
         winner=request.user
-    ).order_by('-updated_at')[:10]
+    ).only(*order_fields).order_by('-updated_at')[:10])
     
-    total_spent = sum(order.current_price for order in completed_orders)
+    total_spent = sum((order.current_price for order in completed_orders), Decimal('0'))
     
     context = {
         'other_user': other_user,
@@ -1137,7 +1227,7 @@ def conversation(request, user_id):
         'active_orders': active_orders,
         'completed_orders': completed_orders,
         'total_spent': total_spent,
-        'order_count': completed_orders.count(),
+        'order_count': len(completed_orders),
     }
     return render(request, 'auctions/conversation.html', context)
 
@@ -1145,7 +1235,6 @@ def conversation(request, user_id):
 @require_POST
 def send_message(request):
     """AJAX endpoint to send a message"""
-    from .models import Message
     
     try:
         recipient_id = request.POST.get('recipient_id')
@@ -1154,18 +1243,18 @@ def send_message(request):
         image = request.FILES.get('image')
         
         if not recipient_id:
-            return JsonResponse({'success': False, 'error': 'Recipient not specified'})
+            return OrjsonResponse({'success': False, 'error': 'Recipient not specified'})
         
         if not content and not image:
-            return JsonResponse({'success': False, 'error': 'Message cannot be empty'})
+            return OrjsonResponse({'success': False, 'error': 'Message cannot be empty'})
         
         try:
             recipient = User.objects.get(id=recipient_id)
         except User.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Recipient not found'})
+            return OrjsonResponse({'success': False, 'error': 'Recipient not found'})
         
         if recipient == request.user:
-            return JsonResponse({'success': False, 'error': 'Cannot send message to yourself'})
+            return OrjsonResponse({'success': False, 'error': 'Cannot send message to yourself'})
         
         # Get item if specified
         item = None
@@ -1184,7 +1273,7 @@ def send_message(request):
             image=image
         )
         
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'message': {
                 'id': message.id,
@@ -1196,7 +1285,7 @@ def send_message(request):
         })
         
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
+        return OrjsonResponse({'success': False, 'error': str(e)})
 
 @login_required
 def start_conversation(request, user_id):
@@ -1231,11 +1320,8 @@ def search_users(request):
 @login_required
 def change_item_status(request, item_id):
     """Change the status of an item (private, off_sale, sold, active)"""
-    from django.http import JsonResponse
-    from django.views.decorators.http import require_POST
-    
     if request.method != 'POST':
-        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+        return OrjsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
     
     try:
         item = Item.objects.get(id=item_id, seller=request.user)
@@ -1243,7 +1329,7 @@ def change_item_status(request, item_id):
         
         valid_statuses = ['active', 'private', 'off_sale', 'sold']
         if new_status not in valid_statuses:
-            return JsonResponse({'success': False, 'error': 'Invalid status'}, status=400)
+            return OrjsonResponse({'success': False, 'error': 'Invalid status'}, status=400)
         
         item.status = new_status
         
@@ -1258,23 +1344,18 @@ def change_item_status(request, item_id):
         else:
             item.save(update_fields=['status'])
         
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'message': f'Item status changed to {new_status}',
             'new_status': new_status
         })
         
     except Item.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Item not found or you do not have permission'}, status=404)
+        return OrjsonResponse({'success': False, 'error': 'Item not found or you do not have permission'}, status=404)
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return OrjsonResponse({'success': False, 'error': str(e)}, status=500)
 
 # Admin Dashboard Views
-from functools import wraps
-from django.http import HttpResponseForbidden
-from django.db.models import Sum, Count, Avg
-from datetime import timedelta
-from payments.models import Payment
 
 def admin_required(view_func):
     """Decorator to restrict view access to superusers only"""
@@ -1292,84 +1373,95 @@ def admin_required(view_func):
 @admin_required
 def admin_dashboard(request):
     """Admin dashboard overview with key analytics"""
-    from .models import FraudAlert
-    from users.models import UserProfile
-    
-    # Date range for analytics (last 30 days)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    
-    # User statistics
-    total_users = User.objects.count()
-    new_users_30d = User.objects.filter(date_joined__gte=thirty_days_ago).count()
-    active_users = User.objects.filter(profile__last_seen__gte=timezone.now() - timedelta(minutes=5)).count()
-    
-    # Seller application statistics
-    pending_sellers = UserProfile.objects.filter(seller_status='pending').count()
-    
-    # Item statistics
-    total_items = Item.objects.count()
-    active_items = Item.objects.filter(status='active').count()
-    sold_items = Item.objects.filter(status='sold').count()
-    new_items_30d = Item.objects.filter(created_at__gte=thirty_days_ago).count()
-    
-    # Payment statistics
-    total_payments = Payment.objects.filter(status='completed').count()
-    total_spent = Payment.objects.filter(status='completed').aggregate(total=Sum('amount'))['total'] or 0
-    platform_revenue = Payment.objects.filter(status='completed').aggregate(total=Sum('platform_tax'))['total'] or 0
-    spent_30d = Payment.objects.filter(
-        status='completed',
-        completed_at__gte=thirty_days_ago
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    revenue_30d = Payment.objects.filter(
-        status='completed',
-        completed_at__gte=thirty_days_ago
-    ).aggregate(total=Sum('platform_tax'))['total'] or 0
-    
-    # Bid statistics
-    total_bids = Bid.objects.count()
-    avg_bid_amount = Bid.objects.aggregate(avg=Avg('amount'))['avg'] or 0
-    
-    # Fraud alerts
-    unresolved_fraud_alerts = FraudAlert.objects.filter(is_resolved=False).count()
-    high_severity_alerts = FraudAlert.objects.filter(severity='high', is_resolved=False).count()
-    
-    # Recent activity
-    recent_users = User.objects.order_by('-date_joined')[:5]
-    recent_items = Item.objects.order_by('-created_at')[:5]
-    recent_payments = Payment.objects.filter(status='completed').order_by('-completed_at')[:5]
+    # Site-wide counts scan whole tables; a minute of staleness is fine for an overview
+    stats = cache.get_or_set(ADMIN_DASHBOARD_STATS_CACHE_KEY, admin_dashboard_stats, 60)
     
     context = {
-        'total_users': total_users,
-        'new_users_30d': new_users_30d,
-        'active_users': active_users,
-        'pending_sellers': pending_sellers,
-        'total_items': total_items,
-        'active_items': active_items,
-        'sold_items': sold_items,
-        'new_items_30d': new_items_30d,
-        'total_payments': total_payments,
-        'total_spent': total_spent,
-        'spent_30d': spent_30d,
-        'platform_revenue': platform_revenue,
-        'revenue_30d': revenue_30d,
-        'total_bids': total_bids,
-        'avg_bid_amount': avg_bid_amount,
-        'unresolved_fraud_alerts': unresolved_fraud_alerts,
-        'high_severity_alerts': high_severity_alerts,
-        'recent_users': recent_users,
-        'recent_items': recent_items,
-        'recent_payments': recent_payments,
+        **stats,
+        # Recent activity
+        'recent_users': User.objects.order_by('-date_joined')[:5],
+        'recent_items': Item.objects.order_by('-created_at')[:5],
+        'recent_payments': Payment.objects.filter(status='completed').order_by('-completed_at')[:5],
     }
     return render(request, 'admin/dashboard.html', context)
 
+def _run_in_worker(call):
+    """Run one read-only callable on a pool thread, retiring that thread's connection per CONN_MAX_AGE"""
+    close_old_connections()
+    try:
+        return call()
+    finally:
+        close_old_connections()
+
+def run_concurrently(*calls):
+    """
+    Run independent read-only callables on the shared admin stats pool and return
+    their results in order, so a page waits for its slowest query rather than
+    the sum. SQLite serializes access (and each thread would get its own
+    in-memory test DB), so the calls stay serial there.
+    """
+    if connection.vendor == 'sqlite':
+        return [call() for call in calls]
+    return list(_admin_stats_executor.map(_run_in_worker, calls))
+
+def admin_dashboard_stats():
+    """Aggregate user, item, payment, bid and fraud statistics for the admin dashboard"""
+    
+    # Date range for analytics (last 30 days)
+    now = timezone.now()
+    thirty_days_ago = now - timedelta(days=30)
+    
+    # One conditional-aggregate query per table; the tables are independent of each other
+    queries = (
+        lambda: User.objects.aggregate(
+            total_users=Count('id'),
+            new_users_30d=Count('id', filter=Q(date_joined__gte=thirty_days_ago)),
+            active_users=Count('id', filter=Q(profile__last_seen__gte=now - timedelta(minutes=5))),
+            pending_sellers=Count('id', filter=Q(profile__seller_status='pending')),
+        ),
+        lambda: Item.objects.aggregate(
+            total_items=Count('id'),
+            active_items=Count('id', filter=Q(status='active')),
+            sold_items=Count('id', filter=Q(status='sold')),
+            new_items_30d=Count('id', filter=Q(created_at__gte=thirty_days_ago)),
+        ),
+        lambda: Payment.objects.filter(status='completed').aggregate(
+            total_payments=Count('id'),
+            total_spent=Sum('amount'),
+            spent_30d=Sum('amount', filter=Q(completed_at__gte=thirty_days_ago)),
+            platform_revenue=Sum('platform_tax'),
+            revenue_30d=Sum('platform_tax', filter=Q(completed_at__gte=thirty_days_ago)),
+        ),
+        lambda: Bid.objects.aggregate(
+            total_bids=Count('id'),
+            avg_bid_amount=Avg('amount'),
+        ),
+        lambda: FraudAlert.objects.filter(is_resolved=False).aggregate(
+            unresolved_fraud_alerts=Count('id'),
+            high_severity_alerts=Count('id', filter=Q(severity='high')),
+        ),
+    )
+    
+    stats = {}
+    for result in run_concurrently(*queries):
+        stats.update(result)
+    # Sum/Avg return None on empty tables; the dashboard shows 0
+    for key, value in stats.items():
+        if value is None:
+            stats[key] = 0
+    return stats
+
 @admin_required
 def admin_users(request):
     """Admin user management"""
-    from users.models import UserProfile
-    from django.db.models import Q
     
     search_query = request.GET.get('q', '')
-    users = User.objects.select_related('profile').all()
+    users = User.objects.select_related('profile').only(
+        'id', 'username', 'email', 'date_joined', 'is_active', 'is_superuser',
+        'profile__phone_number', 'profile__bypass_account_age_check',
+        'profile__bypass_rapid_bidding_check', 'profile__bypass_fraud_detection',
+        'profile__bypass_all_restrictions',
+    )
     
     if search_query:
         users = users.filter(
@@ -1378,24 +1470,27 @@ def admin_users(request):
             Q(profile__phone_number__icontains=search_query)
         )
     
-    users = users.order_by('-date_joined')
+    page_obj = Paginator(users.order_by('-date_joined'), 50).get_page(request.GET.get('page'))
     
     context = {
-        'users': users,
+        'users': page_obj,
+        'page_obj': page_obj,
         'search_query': search_query,
-        'total_count': users.count(),
+        'total_count': page_obj.paginator.count,
     }
     return render(request, 'admin/users.html', context)
 
 @admin_required
 def admin_items(request):
     """Admin item management"""
-    from django.db.models import Q
     
     search_query = request.GET.get('q', '')
     status_filter = request.GET.get('status', 'all')
     
-    items = Item.objects.select_related('seller', 'category').all()
+    items = Item.objects.select_related('seller', 'category').only(
+        'id', 'title', 'status', 'current_price', 'bid_count', 'created_at',
+        'seller__username', 'category__name',
+    )
     
     if search_query:
         items = items.filter(
@@ -1407,54 +1502,71 @@ def admin_items(request):
     if status_filter != 'all':
         items = items.filter(status=status_filter)
     
-    items = items.order_by('-created_at')
+    page_obj = Paginator(items.order_by('-created_at'), 50).get_page(request.GET.get('page'))
     
     context = {
-        'items': items,
+        'items': page_obj,
+        'page_obj': page_obj,
         'search_query': search_query,
         'status_filter': status_filter,
-        'total_count': items.count(),
+        'total_count': page_obj.paginator.count,
     }
     return render(request, 'admin/items.html', context)
 
+def admin_payments_etag(request):
+    """
+    Changes whenever a payment is added, removed or updated, a different admin or filter
+    asks, or the admin's unread-message badge moves. None (no ETag) while flash messages
+    are queued, since a 304 would never show them.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    state = Payment.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    unread = Message.objects.filter(recipient=request.user, is_read=False).count()
+    return hashlib.md5(
+        f"{request.user.pk}|{request.get_full_path()}|{state['count']}|{state['latest']}|{unread}".encode()
+    ).hexdigest()
+
 @admin_required
+@condition(etag_func=admin_payments_etag)
 def admin_payments(request):
     """Admin payment monitoring"""
-    from django.db.models import Q
     
     search_query = request.GET.get('q', '')
     status_filter = request.GET.get('status', 'all')
     
-    payments = Payment.objects.select_related('user', 'item').all()
+    payments = Payment.objects.select_related('user').only(
+        'id', 'payment_id', 'amount', 'payment_method', 'status', 'created_at', 'user__username',
+    )
     
     if search_query:
-        payments = payments.filter(
-            Q(payment_id__icontains=search_query) |
-            Q(user__username__icontains=search_query) |
-            Q(transaction_reference__icontains=search_query)
-        )
+        try:
+            # A pasted payment ID resolves through the unique index instead of a LIKE scan
+            payments = payments.filter(payment_id=uuid.UUID(search_query.strip()))
+        except ValueError:
+            payments = payments.filter(
+                Q(payment_id__icontains=search_query) |
+                Q(user__username__icontains=search_query) |
+                Q(transaction_reference__icontains=search_query)
+            )
     
     if status_filter != 'all':
         payments = payments.filter(status=status_filter)
     
-    payments = payments.order_by('-created_at')
+    page_obj = Paginator(payments.order_by('-created_at'), 50).get_page(request.GET.get('page'))
     
     context = {
-        'payments': payments,
+        'payments': page_obj,
+        'page_obj': page_obj,
         'search_query': search_query,
         'status_filter': status_filter,
-        'total_count': payments.count(),
+        'total_count': page_obj.paginator.count,
     }
     return render(request, 'admin/payments.html', context)
 
 @admin_required
 def admin_fraud_alerts(request):
     """Admin fraud alert monitoring with analytics"""
-    from .models import FraudAlert
-    from django.db.models import Q, Count
-    from django.utils import timezone
-    from datetime import timedelta
-    import json
     
     search_query = request.GET.get('q', '')
     severity_filter = request.GET.get('severity', 'all')
@@ -1462,7 +1574,10 @@ def admin_fraud_alerts(request):
     alert_type_filter = request.GET.get('alert_type', 'all')
     date_filter = request.GET.get('date_filter', '30')
     
-    alerts = FraudAlert.objects.select_related('user', 'item', 'resolved_by').all()
+    alerts = FraudAlert.objects.select_related('user', 'resolved_by').only(
+        'id', 'alert_type', 'severity', 'description', 'data', 'is_resolved',
+        'resolved_at', 'created_at', 'user__username', 'resolved_by__username',
+    )
     
     if search_query:
         alerts = alerts.filter(
@@ -1487,82 +1602,110 @@ def admin_fraud_alerts(request):
         date_from = timezone.now() - timedelta(days=days)
         alerts = alerts.filter(created_at__gte=date_from)
     
-    alerts = alerts.order_by('-created_at')
-    
-    total_alerts = FraudAlert.objects.count()
-    critical_alerts = FraudAlert.objects.filter(severity='critical', is_resolved=False).count()
-    high_alerts = FraudAlert.objects.filter(severity='high', is_resolved=False).count()
-    resolved_alerts = FraudAlert.objects.filter(is_resolved=True).count()
-    unresolved_alerts = FraudAlert.objects.filter(is_resolved=False).count()
-    
-    severity_stats = FraudAlert.objects.filter(is_resolved=False).values('severity').annotate(count=Count('id'))
-    alert_type_stats = FraudAlert.objects.values('alert_type').annotate(count=Count('id')).order_by('-count')[:10]
-    
-    alert_types = FraudAlert.objects.values_list('alert_type', flat=True).distinct()
+    paginator = Paginator(alerts.order_by('-created_at'), 50)
     
     today = timezone.now().date()
     last_7_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
-    daily_alerts = []
-    for day in last_7_days:
-        count = FraudAlert.objects.filter(created_at__date=day).count()
-        daily_alerts.append({'date': day.strftime('%b %d'), 'count': count})
+    
+    # The page count, headline counts, charts and filter options are independent reads
+    _, alert_counts, (severity_stats, alert_type_stats), alerts_by_day, alert_types = run_concurrently(
+        lambda: paginator.count,
+        lambda: FraudAlert.objects.aggregate(
+            total_alerts=Count('id'),
+            critical_alerts=Count('id', filter=Q(severity='critical', is_resolved=False)),
+            high_alerts=Count('id', filter=Q(severity='high', is_resolved=False)),
+            resolved_alerts=Count('id', filter=Q(is_resolved=True)),
+            unresolved_alerts=Count('id', filter=Q(is_resolved=False)),
+        ),
+        # The breakdown charts tolerate a minute of staleness
+        lambda: cache.get_or_set(FRAUD_ALERT_BREAKDOWN_CACHE_KEY, fraud_alert_breakdowns, 60),
+        lambda: dict(
+            FraudAlert.objects.filter(created_at__date__gte=last_7_days[0])
+            .annotate(day=TruncDate('created_at'))
+            .order_by()
+            .values('day')
+            .annotate(count=Count('id'))
+            .values_list('day', 'count')
+        ),
+        FraudAlert.cached_alert_types,
+    )
+    page_obj = paginator.get_page(request.GET.get('page'))
+    
+    daily_alerts = [
+        {'date': day.strftime('%b %d'), 'count': alerts_by_day.get(day, 0)}
+        for day in last_7_days
+    ]
     
     context = {
-        'alerts': alerts,
+        'alerts': page_obj,
+        'page_obj': page_obj,
         'search_query': search_query,
         'severity_filter': severity_filter,
         'resolved_filter': resolved_filter,
         'alert_type_filter': alert_type_filter,
         'date_filter': date_filter,
-        'total_count': alerts.count(),
-        'total_alerts': total_alerts,
-        'critical_alerts': critical_alerts,
-        'high_alerts': high_alerts,
-        'resolved_alerts': resolved_alerts,
-        'unresolved_alerts': unresolved_alerts,
-        'severity_stats': list(severity_stats),
-        'alert_type_stats': list(alert_type_stats),
-        'alert_types': list(alert_types),
-        'daily_alerts_json': json.dumps(daily_alerts),
+        'total_count': page_obj.paginator.count,
+        **alert_counts,
+        'severity_stats': severity_stats,
+        'alert_type_stats': alert_type_stats,
+        'alert_types': alert_types,
+        'daily_alerts': daily_alerts,
     }
     return render(request, 'admin/fraud_alerts.html', context)
 
+def fraud_alert_breakdowns():
+    """
+    Unresolved alerts per severity and the ten most common alert types, both
+    rolled up from a single (severity, alert_type, is_resolved) GROUP BY.
+    """
+    
+    severity_counts = Counter()
+    alert_type_counts = Counter()
+    for row in FraudAlert.objects.values('severity', 'alert_type', 'is_resolved').annotate(count=Count('id')):
+        if not row['is_resolved']:
+            severity_counts[row['severity']] += row['count']
+        alert_type_counts[row['alert_type']] += row['count']
+    
+    severity_stats = [{'severity': severity, 'count': count} for severity, count in severity_counts.items()]
+    alert_type_stats = [
+        {'alert_type': alert_type, 'count': count}
+        for alert_type, count in alert_type_counts.most_common(10)
+    ]
+    return severity_stats, alert_type_stats
+
 @admin_required
 @require_POST
 def admin_toggle_user_status(request, user_id):
     """Toggle user active status"""
-    from django.http import JsonResponse
     try:
         target_user = User.objects.get(id=user_id)
         if target_user.is_superuser:
-            return JsonResponse({'success': False, 'error': 'Cannot deactivate superusers'}, status=403)
+            return OrjsonResponse({'success': False, 'error': 'Cannot deactivate superusers'}, status=403)
         
         target_user.is_active = not target_user.is_active
-        target_user.save()
+        target_user.save(update_fields=['is_active'])
         
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'is_active': target_user.is_active,
             'message': f'User {target_user.username} is now {"active" if target_user.is_active else "inactive"}'
         })
     except User.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'User not found'}, status=404)
+        return OrjsonResponse({'success': False, 'error': 'User not found'}, status=404)
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return OrjsonResponse({'success': False, 'error': str(e)}, status=500)
 
 @admin_required
 @require_POST
 def admin_update_bypass_permissions(request, user_id):
     """Update user bypass permissions"""
-    from django.http import JsonResponse
-    import json
     
     try:
-        target_user = User.objects.get(id=user_id)
+        target_user = User.objects.select_related('profile').get(id=user_id)
         if target_user.is_superuser:
-            return JsonResponse({'success': False, 'error': 'Superusers already have auto-bypass'}, status=403)
+            return OrjsonResponse({'success': False, 'error': 'Superusers already have auto-bypass'}, status=403)
         
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         profile = target_user.profile
         
         # Update bypass permissions
@@ -1576,29 +1719,31 @@ def admin_update_bypass_permissions(request, user_id):
         profile.bypass_granted_by = request.user
         profile.bypass_granted_at = timezone.now()
         
-        profile.save()
+        profile.save(update_fields=[
+            'bypass_all_restrictions', 'bypass_account_age_check', 'bypass_rapid_bidding_check',
+            'bypass_fraud_detection', 'bypass_notes', 'bypass_granted_by', 'bypass_granted_at',
+        ])
         
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'message': f'Bypass permissions updated for {target_user.username}'
         })
     except User.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'User not found'}, status=404)
+        return OrjsonResponse({'success': False, 'error': 'User not found'}, status=404)
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return OrjsonResponse({'success': False, 'error': str(e)}, status=500)
 
 @admin_required
 @require_POST
 def admin_change_item_status(request, item_id):
     """Change item status from admin panel"""
-    from django.http import JsonResponse
     try:
         item = Item.objects.get(id=item_id)
         new_status = request.POST.get('status')
         
         valid_statuses = ['active', 'private', 'off_sale', 'sold', 'expired', 'cancelled']
         if new_status not in valid_statuses:
-            return JsonResponse({'success': False, 'error': 'Invalid status'}, status=400)
+            return OrjsonResponse({'success': False, 'error': 'Invalid status'}, status=400)
         
         item.status = new_status
         
@@ -1613,155 +1758,180 @@ def admin_change_item_status(request, item_id):
         else:
             item.save(update_fields=['status'])
         
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'message': f'Item status changed to {new_status}',
             'new_status': new_status
         })
     except Item.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Item not found'}, status=404)
+        return OrjsonResponse({'success': False, 'error': 'Item not found'}, status=404)
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return OrjsonResponse({'success': False, 'error': str(e)}, status=500)
+
+class _Echo:
+    """File-like object whose write() hands the formatted CSV line straight back"""
+    def write(self, value):
+        return value
+
+def streaming_csv_response(filename, header, rows):
+    """Stream header and rows as a CSV download without buffering the whole file"""
+    writer = csv.writer(_Echo())
+    
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+    
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 @admin_required
 def admin_export_payments(request):
     """Export payments to CSV"""
-    import csv
-    from django.http import HttpResponse
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="payments_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Payment ID', 'User', 'Amount', 'Method', 'Status', 'Created', 'Completed'])
-    
-    payments = Payment.objects.select_related('user').all().order_by('-created_at')
-    for payment in payments:
-        writer.writerow([
-            str(payment.payment_id),
-            payment.user.username,
-            float(payment.amount),
-            payment.payment_method,
-            payment.status,
-            payment.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            payment.completed_at.strftime('%Y-%m-%d %H:%M:%S') if payment.completed_at else 'N/A'
-        ])
     
-    return response
+    # Plain tuples straight from the cursor; no model instances per row
+    payments = Payment.objects.order_by('-created_at').values_list(
+        'payment_id', 'user__username', 'amount', 'payment_method', 'status', 'created_at', 'completed_at',
+    ).iterator(chunk_size=2000)
+    rows = (
+        [
+            str(payment_id),
+            username,
+            float(amount),
+            payment_method,
+            status,
+            created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            completed_at.strftime('%Y-%m-%d %H:%M:%S') if completed_at else 'N/A'
+        ]
+        for payment_id, username, amount, payment_method, status, created_at, completed_at in payments
+    )
+    
+    return streaming_csv_response(
+        'payments_export.csv',
+        ['Payment ID', 'User', 'Amount', 'Method', 'Status', 'Created', 'Completed'],
+        rows
+    )
 
 @admin_required
 def admin_export_fraud_alerts(request):
     """Export fraud alerts to CSV"""
-    import csv
-    from django.http import HttpResponse
-    from .models import FraudAlert
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="fraud_alerts_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['User', 'Alert Type', 'Severity', 'Details', 'Resolved', 'Created', 'Resolved By', 'Resolved At'])
-    
-    alerts = FraudAlert.objects.select_related('user', 'resolved_by').all().order_by('-created_at')
-    for alert in alerts:
-        writer.writerow([
-            alert.user.username,
-            alert.alert_type,
-            alert.severity,
-            alert.description,
-            'Yes' if alert.is_resolved else 'No',
-            alert.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            alert.resolved_by.username if alert.resolved_by else 'N/A',
-            alert.resolved_at.strftime('%Y-%m-%d %H:%M:%S') if alert.resolved_at else 'N/A'
-        ])
     
-    return response
+    alerts = FraudAlert.objects.order_by('-created_at').values_list(
+        'user__username', 'alert_type', 'severity', 'description', 'is_resolved',
+        'created_at', 'resolved_by__username', 'resolved_at',
+    ).iterator(chunk_size=2000)
+    rows = (
+        [
+            username,
+            alert_type,
+            severity,
+            description,
+            'Yes' if is_resolved else 'No',
+            created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            resolved_by or 'N/A',
+            resolved_at.strftime('%Y-%m-%d %H:%M:%S') if resolved_at else 'N/A'
+        ]
+        for username, alert_type, severity, description, is_resolved, created_at, resolved_by, resolved_at in alerts
+    )
+    
+    return streaming_csv_response(
+        'fraud_alerts_export.csv',
+        ['User', 'Alert Type', 'Severity', 'Details', 'Resolved', 'Created', 'Resolved By', 'Resolved At'],
+        rows
+    )
 
 @admin_required
 @require_POST
 def admin_resolve_fraud_alert(request, alert_id):
     """Resolve a fraud alert"""
-    from django.http import JsonResponse
-    from .models import FraudAlert
-    from django.utils import timezone
     
     try:
-        alert = FraudAlert.objects.get(id=alert_id)
-        
-        if alert.is_resolved:
-            return JsonResponse({'success': False, 'error': 'Alert is already resolved'}, status=400)
+        # Conditional UPDATE: resolves in one statement and cannot race a concurrent resolve
+        resolved_at = timezone.now()
+        updated = FraudAlert.objects.filter(id=alert_id, is_resolved=False).update(
+            is_resolved=True,
+            resolved_by=request.user,
+            resolved_at=resolved_at
+        )
         
-        alert.is_resolved = True
-        alert.resolved_by = request.user
-        alert.resolved_at = timezone.now()
-        alert.save()
+        if not updated:
+            if FraudAlert.objects.filter(id=alert_id).exists():
+                return OrjsonResponse({'success': False, 'error': 'Alert is already resolved'}, status=400)
+            return OrjsonResponse({'success': False, 'error': 'Alert not found'}, status=404)
         
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'message': f'Fraud alert #{alert_id} has been resolved',
             'resolved_by': request.user.username,
-            'resolved_at': alert.resolved_at.strftime('%b %d, %Y %H:%M')
+            'resolved_at': resolved_at.strftime('%b %d, %Y %H:%M')
         })
-    except FraudAlert.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Alert not found'}, status=404)
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return OrjsonResponse({'success': False, 'error': str(e)}, status=500)
 
 @admin_required
 @require_POST
 def admin_dismiss_fraud_alert(request, alert_id):
     """Dismiss (delete) a fraud alert"""
-    from django.http import JsonResponse
-    from .models import FraudAlert
     
     try:
-        alert = FraudAlert.objects.get(id=alert_id)
-        alert.delete()
+        deleted, _ = FraudAlert.objects.filter(id=alert_id).delete()
         
-        return JsonResponse({
+        if not deleted:
+            return OrjsonResponse({'success': False, 'error': 'Alert not found'}, status=404)
+        
+        return OrjsonResponse({
             'success': True,
             'message': f'Fraud alert #{alert_id} has been dismissed'
         })
-    except FraudAlert.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Alert not found'}, status=404)
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return OrjsonResponse({'success': False, 'error': str(e)}, status=500)
 
 @admin_required
 @require_POST
 def admin_bulk_resolve_alerts(request):
     """Bulk resolve fraud alerts"""
-    from django.http import JsonResponse
-    from .models import FraudAlert
-    from django.utils import timezone
-    import json
     
     try:
-        data = json.loads(request.body)
+        data = orjson.loads(request.body)
         alert_ids = data.get('alert_ids', [])
         
         if not alert_ids:
-            return JsonResponse({'success': False, 'error': 'No alert IDs provided'}, status=400)
-        
-        updated = FraudAlert.objects.filter(id__in=alert_ids, is_resolved=False).update(
-            is_resolved=True,
-            resolved_by=request.user,
-            resolved_at=timezone.now()
-        )
-        
-        return JsonResponse({
+            return OrjsonResponse({'success': False, 'error': 'No alert IDs provided'}, status=400)
+        
+        with transaction.atomic():
+            # One locked read classifies every requested id, then one UPDATE resolves the open ones.
+            # Rows another admin is resolving right now are skipped rather than waited on
+            resolved_state = dict(
+                FraudAlert.objects.select_for_update(skip_locked=True).filter(id__in=alert_ids).values_list('id', 'is_resolved')
+            )
+            updated = FraudAlert.objects.filter(
+                id__in=[alert_id for alert_id, is_resolved in resolved_state.items() if not is_resolved]
+            ).update(
+                is_resolved=True,
+                resolved_by=request.user,
+                resolved_at=timezone.now()
+            )
+        
+        unlocked_ids = [alert_id for alert_id in alert_ids if alert_id not in resolved_state]
+        in_progress = set()
+        if unlocked_ids:
+            in_progress = set(FraudAlert.objects.filter(id__in=unlocked_ids).values_list('id', flat=True))
+        
+        return OrjsonResponse({
             'success': True,
             'message': f'{updated} alerts resolved successfully',
-            'count': updated
+            'count': updated,
+            'already_resolved': [alert_id for alert_id, is_resolved in resolved_state.items() if is_resolved],
+            'in_progress': [alert_id for alert_id in unlocked_ids if alert_id in in_progress],
+            'not_found': [alert_id for alert_id in unlocked_ids if alert_id not in in_progress],
         })
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return OrjsonResponse({'success': False, 'error': str(e)}, status=500)
 
 @admin_required
 def admin_seller_applications(request):
     """Admin seller application management"""
-    from users.models import UserProfile
-    from django.db.models import Q
     
     status_filter = request.GET.get('status', 'all')
     search_query = request.GET.get('q', '')
@@ -1779,31 +1949,30 @@ def admin_seller_applications(request):
             Q(phone_number__icontains=search_query)
         )
     
-    applications = applications.order_by('-seller_application_date')
+    page_obj = Paginator(applications.order_by('-seller_application_date'), 50).get_page(request.GET.get('page'))
     
-    pending_count = UserProfile.objects.filter(seller_status='pending').count()
-    approved_count = UserProfile.objects.filter(seller_status='approved').count()
-    rejected_count = UserProfile.objects.filter(seller_status='rejected').count()
+    status_counts = UserProfile.objects.exclude(seller_status='none').aggregate(
+        pending_count=Count('id', filter=Q(seller_status='pending')),
+        approved_count=Count('id', filter=Q(seller_status='approved')),
+        rejected_count=Count('id', filter=Q(seller_status='rejected')),
+    )
     
     context = {
-        'applications': applications,
+        'applications': page_obj,
+        'page_obj': page_obj,
         'status_filter': status_filter,
         'search_query': search_query,
-        'total_count': applications.count(),
-        'pending_count': pending_count,
-        'approved_count': approved_count,
-        'rejected_count': rejected_count,
+        'total_count': page_obj.paginator.count,
+        **status_counts,
     }
     return render(request, 'admin/seller_applications.html', context)
 
 @admin_required
 def admin_approve_seller(request, user_id):
     """Approve a seller application"""
-    from users.models import UserProfile
-    from django.utils import timezone
     
     if request.method == 'POST':
-        user = get_object_or_404(User, id=user_id)
+        user = get_object_or_404(User.objects.select_related('profile'), id=user_id)
         profile = user.profile
         
         profile.seller_status = 'approved'
@@ -1819,10 +1988,9 @@ def admin_approve_seller(request, user_id):
 @admin_required
 def admin_reject_seller(request, user_id):
     """Reject a seller application"""
-    from users.models import UserProfile
     
     if request.method == 'POST':
-        user = get_object_or_404(User, id=user_id)
+        user = get_object_or_404(User.objects.select_related('profile'), id=user_id)
         profile = user.profile
         
         rejection_reason = request.POST.get('rejection_reason', 'Application does not meet our requirements.')
@@ -1839,33 +2007,23 @@ def admin_reject_seller(request, user_id):
 
 def get_cities(request, country_code):
     """API endpoint to get cities for a selected country"""
-    from .models import ShippingLocation
     
-    cities = ShippingLocation.objects.filter(
-        country=country_code.upper(), 
-        is_active=True
-    ).values_list('city', flat=True).distinct().order_by('city')
+    cities = sorted(ShippingLocation.cached_tree().get(country_code.upper(), {}))
     
-    return JsonResponse({'cities': list(cities)})
+    return JsonResponse({'cities': cities})
 
 def get_areas(request, city):
     """API endpoint to get areas for a selected city"""
-    from .models import ShippingLocation
     
     country_code = request.GET.get('country', 'UG')
     
-    areas = ShippingLocation.objects.filter(
-        country=country_code.upper(),
-        city=city, 
-        is_active=True
-    ).values_list('area', flat=True).order_by('area')
+    areas = ShippingLocation.cached_tree().get(country_code.upper(), {}).get(city, [])
     
-    return JsonResponse({'areas': list(areas)})
+    return JsonResponse({'areas': areas})
 
 @login_required
 def calculate_shipping(request):
     """API endpoint to calculate shipping cost based on delivery location"""
-    from decimal import Decimal
     
     delivery_city = request.GET.get('city', '')
     delivery_area = request.GET.get('area', '')
@@ -1874,22 +2032,18 @@ def calculate_shipping(request):
         return JsonResponse({'error': 'City and area are required'}, status=400)
     
     cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_items = cart.items.select_related('item__seller').all()
+    cart_items = list(cart.items.select_related('item__seller'))
     
     if not cart_items:
         return JsonResponse({'error': 'Cart is empty'}, status=400)
     
-    subtotal = cart.total()
-    shipping_cost = Decimal('0')
-    TAX_RATE = Decimal('0.05')
+    subtotal = cart.total(cart_items)
     
-    for cart_item in cart_items:
-        item = cart_item.item
-        if item.free_shipping:
-            continue
-        else:
-            item_shipping = item.calculate_shipping_cost(delivery_city, delivery_area)
-            shipping_cost += Decimal(str(item_shipping))
+    shipping_cost = cart_shipping_cost(
+        [cart_item.item for cart_item in cart_items],
+        delivery_city,
+        delivery_area
+    )
     
     tax_amount = (subtotal + shipping_cost) * TAX_RATE
     total = subtotal + shipping_cost + tax_amount
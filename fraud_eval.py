@@ -5,19 +5,22 @@ Evaluates the AuctionHub fraud detection system using a synthetic labeled datase
 Computes precision, recall, F1-score, and confusion matrix.
 
 Usage:
-    python fraud_eval.py
+    python fraud_eval.py [--verbose] [--json]
+
+    --verbose keeps a per-sample detection record in results['detections']
+    --json also writes the metrics to RESULTS.json for scripts
 
 Output:
     - Console output with metrics
     - Updates RESULTS.md with latest evaluation
+    - RESULTS.json with the same metrics when --json is given
 """
 
-import json
 import os
 import sys
 import django
-from datetime import timedelta
-from decimal import Decimal
+import orjson
+from collections import Counter
 
 # Setup Django environment
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -25,16 +28,144 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auction_system.settings')
 django.setup()
 
 from django.utils import timezone
-from django.contrib.auth.models import User
-from auctions.models import Item, Bid, Category
 from auctions.fraud_detection import FraudDetectionService
 
+# Features the rules read, in rule-argument order, with the value assumed when a sample omits one
+FEATURE_DEFAULTS = (
+    ('bids_in_5_minutes', 0),
+    ('time_before_end_seconds', 9999),
+    ('recent_snipes', 0),
+    ('bid_amount', 0),
+    ('item_value', 1),
+    ('account_age_days', 999),
+    ('seller_affinity_score', 0),
+    ('collusion_pattern_score', 0),
+)
+FEATURE_KEYS = frozenset(key for key, _ in FEATURE_DEFAULTS)
+
+# (is_fraud, detected) -> confusion matrix cell
+OUTCOMES = {
+    (True, True): 'TP',
+    (True, False): 'FN',
+    (False, True): 'FP',
+    (False, False): 'TN',
+}
+
+# (lowest score, interpretation) bands, best first; the last band catches everything else
+PRECISION_NOTES = (
+    (0.90, "Excellent - Very few false alarms"),
+    (0.75, "Good - Acceptable false alarm rate"),
+    (0, "Needs improvement - Too many false alarms"),
+)
+RECALL_NOTES = (
+    (0.90, "Excellent - Catches almost all fraud"),
+    (0.75, "Good - Catches most fraud"),
+    (0, "Needs improvement - Missing too many fraud cases"),
+)
+F1_NOTES = (
+    (0.85, "Excellent balance between precision and recall",
+     "✅ The fraud detection system demonstrates **excellent performance** with high precision "
+     "and recall, effectively balancing fraud detection with minimal false positives."),
+    (0.70, "Good balance between precision and recall",
+     "✅ The fraud detection system demonstrates **good performance** with balanced precision "
+     "and recall, providing effective fraud protection for the auction platform."),
+    (0, "Needs tuning to improve balance",
+     "⚠️ The fraud detection system shows acceptable performance but would benefit from "
+     "threshold tuning and additional features to improve precision-recall balance."),
+)
+
+# RESULTS.md layout; save_results fills in the run's metrics and verdicts
+RESULTS_TEMPLATE = """# Fraud Detection System - Evaluation Results
+
+**Evaluation Date**: {eval_date}
+
+## Overview
+
+This evaluation measures the performance of AuctionHub's fraud detection system using a synthetic labeled dataset of 100 auction scenarios (40 fraud, 60 legitimate).
+
+## Dataset
+
+- **Total Samples**: 100
+- **Fraud Cases**: 40
+- **Legitimate Cases**: 60
+
+**Fraud Types Tested**:
+- Rapid bidding (bot activity)
+- Bid sniping patterns
+- Unusual bid amounts
+- New account high-value bids
+- Shill bidding (seller affinity)
+- Collusive bidding
+
+## Performance Metrics
+
+| Metric | Value |
+|--------|-------|
+| **Precision** | **{precision:.4f}** ({precision_pct:.2f}%) |
+| **Recall** | **{recall:.4f}** ({recall_pct:.2f}%) |
+| **F1-Score** | **{f1_score:.4f}** ({f1_pct:.2f}%) |
+| **Accuracy** | **{accuracy:.4f}** ({accuracy_pct:.2f}%) |
+
+## Confusion Matrix
+
+```
+                 Predicted
+                 Fraud   Legitimate
+Actual Fraud       {true_positives:3d}       {false_negatives:3d}
+Actual Legit       {false_positives:3d}       {true_negatives:3d}
+```
+
+## Interpretation
+
+**Precision ({precision_pct:.1f}%)**: {precision_note}
+
+**Recall ({recall_pct:.1f}%)**: {recall_note}
+
+**F1-Score ({f1_pct:.1f}%)**: {f1_note}
+
+## Detection Methods
+
+The fraud detection system employs 15+ detection methods:
+
+1. **Rapid Bidding** - Detects automated bot activity
+2. **Bid Sniping Patterns** - Identifies systematic last-second bidding
+3. **Unusual Bid Amounts** - Flags unrealistic bid values
+4. **New Account Risk** - High-value bids from new accounts
+5. **Self-Bidding** - Seller bidding on own items
+6. **Shill Bidding** - Coordinated fake bidding
+7. **Collusive Bidding** - Multiple accounts working together
+8. **Payment Fraud** - Failed payment patterns
+9. **AI-Powered Analysis** - GPT-4o-mini assessment of suspicious patterns
+
+## Methodology
+
+The evaluation uses a **synthetic labeled dataset** where each sample includes:
+
+- Ground truth label (fraud/legitimate)
+- Fraud type classification
+- Feature vectors (bid timing, amounts, user history)
+- Expected detection results
+
+Metrics are calculated using standard information retrieval formulas:
+
+- **Precision** = TP / (TP + FP)
+- **Recall** = TP / (TP + FN)
+- **F1-Score** = 2 × (Precision × Recall) / (Precision + Recall)
+
+## Conclusion
+
+{conclusion}
+"""
+
 
 class FraudDetectionEvaluator:
     """Evaluates fraud detection system using synthetic dataset"""
     
-    def __init__(self, dataset_path='fraud_detection_dataset.json'):
+    def __init__(self, dataset_path='fraud_detection_dataset.json', verbose=False, json_output=False):
         self.dataset_path = dataset_path
+        self.verbose = verbose
+        self.json_output = json_output
+        self._dataset_cache = None
         self.fraud_service = FraudDetectionService()
         self.results = {
             'true_positives': 0,
@@ -45,132 +176,88 @@ class FraudDetectionEvaluator:
         }
     
     def load_dataset(self):
-        """Load synthetic fraud dataset"""
-        with open(self.dataset_path, 'r') as f:
-            return json.load(f)
-    
-    def create_test_users_and_items(self):
-        """Create test users and items for evaluation"""
-        # Create test seller
-        seller, _ = User.objects.get_or_create(
-            username='test_seller_fraud_eval',
-            defaults={'email': 'seller@test.com'}
-        )
-        
-        # Create test bidder
-        bidder, _ = User.objects.get_or_create(
-            username='test_bidder_fraud_eval',
-            defaults={'email': 'bidder@test.com'}
-        )
-        
-        # Create test category
-        category, _ = Category.objects.get_or_create(
-            name='Test Category',
-            defaults={'slug': 'test-category'}
-        )
-        
-        # Create test item
-        item, _ = Item.objects.get_or_create(
-            title='Test Item for Fraud Evaluation',
-            defaults={
-                'seller': seller,
-                'category': category,
-                'description': 'Test item',
-                'starting_price': Decimal('50000'),
-                'current_price': Decimal('50000'),
-                'min_increment': Decimal('5000'),
-                'end_time': timezone.now() + timedelta(hours=24),
-                'status': 'active'
-            }
-        )
-        
-        return seller, bidder, item
+        """Load synthetic fraud dataset, reparsing only when the file has changed"""
+        mtime = os.path.getmtime(self.dataset_path)
+        if self._dataset_cache is None or self._dataset_cache[0] != mtime:
+            with open(self.dataset_path, 'rb') as f:
+                self._dataset_cache = (mtime, orjson.loads(f.read()))
+        return self._dataset_cache[1]
     
-    def simulate_bid_features(self, bidder, item, features):
+    def feature_rows(self, samples):
         """
-        Simulate a bid with specific features
+        Each sample's features in FEATURE_DEFAULTS order, built in one pass over the samples
         
-        Note: In a real system, features like account_age, bids_in_5_minutes
-        would be derived from database queries. Here we simulate them.
+        Samples carrying none of the rule features get None instead of a row of defaults
         """
-        # Create a bid
-        bid = Bid(
-            item=item,
-            bidder=bidder,
-            amount=Decimal(str(features.get('bid_amount', 100000))),
-            bid_time=timezone.now()
-        )
-        
-        # Don't save to avoid polluting DB during evaluation
-        # Instead, we'll analyze the detection logic directly
-        return bid
+        rows = []
+        append = rows.append
+        for sample in samples:
+            features = sample['features']
+            if features.keys().isdisjoint(FEATURE_KEYS):
+                append(None)
+                continue
+            get = features.get
+            append([get(key, default) for key, default in FEATURE_DEFAULTS])
+        return rows
     
-    def evaluate_sample(self, sample, bidder, item):
-        """Evaluate a single fraud detection sample"""
-        features = sample['features']
-        is_fraud = sample['is_fraud']
-        fraud_type = sample['fraud_type']
-        
-        # Create test bid
-        bid = self.simulate_bid_features(bidder, item, features)
-        
-        # Detect fraud (mock version - checks individual conditions)
-        detected_fraud = self.check_fraud_conditions(bid, features)
-        
-        # Update confusion matrix
-        if is_fraud and detected_fraud:
-            self.results['true_positives'] += 1
-            outcome = 'TP'
-        elif is_fraud and not detected_fraud:
-            self.results['false_negatives'] += 1
-            outcome = 'FN'
-        elif not is_fraud and detected_fraud:
-            self.results['false_positives'] += 1
-            outcome = 'FP'
-        else:  # not is_fraud and not detected_fraud
-            self.results['true_negatives'] += 1
-            outcome = 'TN'
-        
-        self.results['detections'].append({
-            'sample_id': sample['id'],
-            'is_fraud': is_fraud,
-            'fraud_type': fraud_type,
-            'detected': detected_fraud,
-            'outcome': outcome
-        })
-        
-        return detected_fraud
+    def detect_fraud_batch(self, samples):
+        """Apply the detection rules to every sample's feature row"""
+        match = self.fraud_rules_match
+        # With none of the rule features present every rule would see its default and stay quiet
+        return [row is not None and match(*row) for row in self.feature_rows(samples)]
     
-    def check_fraud_conditions(self, bid, features):
-        """
-        Check if any fraud condition is met based on features
+    def tally_outcomes(self, samples, detected):
+        """Fill the confusion matrix from paired labels and detections in one count"""
+        outcomes = Counter(
+            OUTCOMES[bool(sample['is_fraud']), detected_fraud]
+            for sample, detected_fraud in zip(samples, detected)
+        )
+        self.results['true_positives'] = outcomes['TP']
+        self.results['false_negatives'] = outcomes['FN']
+        self.results['false_positives'] = outcomes['FP']
+        self.results['true_negatives'] = outcomes['TN']
+        
+        if self.verbose:
+            self.results['detections'] = [
+                {
+                    'sample_id': sample['id'],
+                    'is_fraud': sample['is_fraud'],
+                    'fraud_type': sample['fraud_type'],
+                    'detected': detected_fraud,
+                    'outcome': OUTCOMES[bool(sample['is_fraud']), detected_fraud]
+                }
+                for sample, detected_fraud in zip(samples, detected)
+            ]
+    
+    @staticmethod
+    def fraud_rules_match(bids_in_5_minutes, time_before_end_seconds, recent_snipes, bid_amount,
+                          item_value, account_age_days, seller_affinity_score, collusion_pattern_score):
+        """The detection rules over one sample's features, in FEATURE_DEFAULTS order"""
+        # Cheapest single-comparison rules first; on the shipped dataset every rule
+        # catches exactly one fraud sample, so cost rather than hit rate sets the order
         
-        Simulates fraud detection logic without database queries
-        """
         # Rapid bidding
-        if features.get('bids_in_5_minutes', 0) > 10:
+        if bids_in_5_minutes > 10:
             return True
         
-        # Bid sniping pattern
-        if features.get('time_before_end_seconds', 9999) < 60 and features.get('recent_snipes', 0) > 5:
+        # Seller affinity (shill bidding)
+        if seller_affinity_score > 0.8:
             return True
         
-        # Unusual bid amount (>5x item value)
-        bid_amount = features.get('bid_amount', 0)
-        item_value = features.get('item_value', 1)
-        if bid_amount > item_value * 5:
+        # Collusive bidding
+        if collusion_pattern_score > 0.8:
             return True
         
-        # New account high value (account < 7 days, bid > 1M)
-        if features.get('account_age_days', 999) < 7 and bid_amount > 1000000:
+        # Bid sniping pattern
+        if time_before_end_seconds < 60 and recent_snipes > 5:
             return True
         
-        # Seller affinity (shill bidding)
-        if features.get('seller_affinity_score', 0) > 0.8:
+        # New account high value (account < 7 days, bid > 1M)
+        if account_age_days < 7 and bid_amount > 1000000:
             return True
         
-        # Collusive bidding
-        if features.get('collusion_pattern_score', 0) > 0.8:
+        # Unusual bid amount (>5x item value)
+        if bid_amount > item_value * 5:
             return True
         
         return False
@@ -219,13 +306,10 @@ class FraudDetectionEvaluator:
         print(f"  - Fraud samples: {dataset['fraud_samples']}")
         print(f"  - Legitimate samples: {dataset['legitimate_samples']}")
         
-        # Create test data
-        seller, bidder, item = self.create_test_users_and_items()
-        
-        # Evaluate each sample
+        # Evaluate every sample in one batch; the rules need no database rows
         print("\nEvaluating samples...")
-        for sample in dataset['samples']:
-            self.evaluate_sample(sample, bidder, item)
+        samples = dataset['samples']
+        self.tally_outcomes(samples, self.detect_fraud_batch(samples))
         
         # Calculate metrics
         metrics = self.calculate_metrics()
@@ -250,115 +334,54 @@ class FraudDetectionEvaluator:
         
         # Save results to file
         self.save_results(metrics)
+        if self.json_output:
+            self.save_json_results(metrics)
         
         return metrics
     
     def save_results(self, metrics):
         """Save evaluation results to RESULTS.md"""
+        precision, recall = metrics['precision'], metrics['recall']
+        f1_score = metrics['f1_score']
+        
+        precision_note = next(note for floor, note in PRECISION_NOTES if precision >= floor)
+        recall_note = next(note for floor, note in RECALL_NOTES if recall >= floor)
+        f1_note, conclusion = next(
+            (note, verdict) for floor, note, verdict in F1_NOTES if f1_score >= floor
+        )
+        
+        report = RESULTS_TEMPLATE.format_map({
+            **metrics['confusion_matrix'],
+            'eval_date': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'precision': precision,
+            'recall': recall,
+            'f1_score': f1_score,
+            'accuracy': metrics['accuracy'],
+            'precision_pct': precision * 100,
+            'recall_pct': recall * 100,
+            'f1_pct': f1_score * 100,
+            'accuracy_pct': metrics['accuracy'] * 100,
+            'precision_note': precision_note,
+            'recall_note': recall_note,
+            'f1_note': f1_note,
+            'conclusion': conclusion,
+        })
         with open('RESULTS.md', 'w') as f:
-            f.write("# Fraud Detection System - Evaluation Results\n\n")
-            f.write(f"**Evaluation Date**: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            f.write("## Overview\n\n")
-            f.write("This evaluation measures the performance of AuctionHub's fraud detection system ")
-            f.write("using a synthetic labeled dataset of 100 auction scenarios (40 fraud, 60 legitimate).\n\n")
-            
-            f.write("## Dataset\n\n")
-            f.write("- **Total Samples**: 100\n")
-            f.write("- **Fraud Cases**: 40\n")
-            f.write("- **Legitimate Cases**: 60\n\n")
-            
-            f.write("**Fraud Types Tested**:\n")
-            f.write("- Rapid bidding (bot activity)\n")
-            f.write("- Bid sniping patterns\n")
-            f.write("- Unusual bid amounts\n")
-            f.write("- New account high-value bids\n")
-            f.write("- Shill bidding (seller affinity)\n")
-            f.write("- Collusive bidding\n\n")
-            
-            f.write("## Performance Metrics\n\n")
-            f.write("| Metric | Value |\n")
-            f.write("|--------|-------|\n")
-            f.write(f"| **Precision** | **{metrics['precision']:.4f}** ({metrics['precision']*100:.2f}%) |\n")
-            f.write(f"| **Recall** | **{metrics['recall']:.4f}** ({metrics['recall']*100:.2f}%) |\n")
-            f.write(f"| **F1-Score** | **{metrics['f1_score']:.4f}** ({metrics['f1_score']*100:.2f}%) |\n")
-            f.write(f"| **Accuracy** | **{metrics['accuracy']:.4f}** ({metrics['accuracy']*100:.2f}%) |\n\n")
-            
-            f.write("## Confusion Matrix\n\n")
-            f.write("```\n")
-            f.write("                 Predicted\n")
-            f.write("                 Fraud   Legitimate\n")
-            f.write(f"Actual Fraud       {metrics['confusion_matrix']['true_positives']:3d}       {metrics['confusion_matrix']['false_negatives']:3d}\n")
-            f.write(f"Actual Legit       {metrics['confusion_matrix']['false_positives']:3d}       {metrics['confusion_matrix']['true_negatives']:3d}\n")
-            f.write("```\n\n")
-            
-            f.write("## Interpretation\n\n")
-            
-            # Precision interpretation
-            if metrics['precision'] >= 0.90:
-                precision_note = "Excellent - Very few false alarms"
-            elif metrics['precision'] >= 0.75:
-                precision_note = "Good - Acceptable false alarm rate"
-            else:
-                precision_note = "Needs improvement - Too many false alarms"
-            f.write(f"**Precision ({metrics['precision']*100:.1f}%)**: {precision_note}\n\n")
-            
-            # Recall interpretation
-            if metrics['recall'] >= 0.90:
-                recall_note = "Excellent - Catches almost all fraud"
-            elif metrics['recall'] >= 0.75:
-                recall_note = "Good - Catches most fraud"
-            else:
-                recall_note = "Needs improvement - Missing too many fraud cases"
-            f.write(f"**Recall ({metrics['recall']*100:.1f}%)**: {recall_note}\n\n")
-            
-            # F1-score interpretation
-            if metrics['f1_score'] >= 0.85:
-                f1_note = "Excellent balance between precision and recall"
-            elif metrics['f1_score'] >= 0.70:
-                f1_note = "Good balance between precision and recall"
-            else:
-                f1_note = "Needs tuning to improve balance"
-            f.write(f"**F1-Score ({metrics['f1_score']*100:.1f}%)**: {f1_note}\n\n")
-            
-            f.write("## Detection Methods\n\n")
-            f.write("The fraud detection system employs 15+ detection methods:\n\n")
-            f.write("1. **Rapid Bidding** - Detects automated bot activity\n")
-            f.write("2. **Bid Sniping Patterns** - Identifies systematic last-second bidding\n")
-            f.write("3. **Unusual Bid Amounts** - Flags unrealistic bid values\n")
-            f.write("4. **New Account Risk** - High-value bids from new accounts\n")
-            f.write("5. **Self-Bidding** - Seller bidding on own items\n")
-            f.write("6. **Shill Bidding** - Coordinated fake bidding\n")
-            f.write("7. **Collusive Bidding** - Multiple accounts working together\n")
-            f.write("8. **Payment Fraud** - Failed payment patterns\n")
-            f.write("9. **AI-Powered Analysis** - GPT-4o-mini assessment of suspicious patterns\n\n")
-            
-            f.write("## Methodology\n\n")
-            f.write("The evaluation uses a **synthetic labeled dataset** where each sample includes:\n\n")
-            f.write("- Ground truth label (fraud/legitimate)\n")
-            f.write("- Fraud type classification\n")
-            f.write("- Feature vectors (bid timing, amounts, user history)\n")
-            f.write("- Expected detection results\n\n")
-            
-            f.write("Metrics are calculated using standard information retrieval formulas:\n\n")
-            f.write("- **Precision** = TP / (TP + FP)\n")
-            f.write("- **Recall** = TP / (TP + FN)\n")
-            f.write("- **F1-Score** = 2 × (Precision × Recall) / (Precision + Recall)\n\n")
-            
-            f.write("## Conclusion\n\n")
-            if metrics['f1_score'] >= 0.85:
-                f.write("✅ The fraud detection system demonstrates **excellent performance** with high precision ")
-                f.write("and recall, effectively balancing fraud detection with minimal false positives.\n")
-            elif metrics['f1_score'] >= 0.70:
-                f.write("✅ The fraud detection system demonstrates **good performance** with balanced precision ")
-                f.write("and recall, providing effective fraud protection for the auction platform.\n")
-            else:
-                f.write("⚠️ The fraud detection system shows acceptable performance but would benefit from ")
-                f.write("threshold tuning and additional features to improve precision-recall balance.\n")
+            f.write(report)
         
         print(f"\n✓ Results saved to RESULTS.md")
+    
+    def save_json_results(self, metrics):
+        """Save the metrics to RESULTS.json for programmatic consumers"""
+        with open('RESULTS.json', 'wb') as f:
+            f.write(orjson.dumps(metrics, option=orjson.OPT_INDENT_2))
+        
+        print("✓ Results saved to RESULTS.json")
 
 
 if __name__ == '__main__':
-    evaluator = FraudDetectionEvaluator()
+    evaluator = FraudDetectionEvaluator(
+        verbose='--verbose' in sys.argv[1:],
+        json_output='--json' in sys.argv[1:]
+    )
     evaluator.run_evaluation()
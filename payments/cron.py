@@ -10,6 +10,8 @@ Runs daily to:
 from django_cron import CronJobBase, Schedule
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F
+from django.db.models.functions import Now
 from datetime import timedelta
 from decimal import Decimal
 from .models import Payment
@@ -41,29 +43,20 @@ class ReconcilePaymentsCronJob(CronJobBase):
         reconciliation_stats = {
             'total_checked': 0,
             'marked_failed': 0,
-            'already_settled': 0,
             'discrepancies': []
         }
         
         try:
             # Find pending payments older than 1 hour
             cutoff_time = timezone.now() - timedelta(hours=1)
-            stale_payments = Payment.objects.filter(
-                status='pending',
-                created_at__lt=cutoff_time
-            ).select_related('user')
-            
-            reconciliation_stats['total_checked'] = stale_payments.count()
-            
-            for payment in stale_payments:
-                try:
-                    self._reconcile_payment(payment, reconciliation_stats)
-                except Exception as e:
-                    logger.error(f"Error reconciling payment {payment.payment_id}: {e}")
-                    reconciliation_stats['discrepancies'].append({
-                        'payment_id': str(payment.payment_id),
-                        'error': str(e)
-                    })
+            try:
+                checked, marked_failed = self._reconcile_payments(cutoff_time)
+                # Only count the batch once its transaction has committed
+                reconciliation_stats['total_checked'] = checked
+                reconciliation_stats['marked_failed'] = marked_failed
+            except Exception as e:
+                logger.error(f"Error reconciling stale payments: {e}")
+                reconciliation_stats['discrepancies'].append({'error': str(e)})
             
             # Log reconciliation summary to TransactionLog
             self._log_reconciliation_summary(reconciliation_stats)
@@ -74,50 +67,58 @@ class ReconcilePaymentsCronJob(CronJobBase):
             logger.error(f"Payment reconciliation job failed: {e}")
             raise
     
-    @transaction.atomic
-    def _reconcile_payment(self, payment, stats):
+    def _reconcile_payments(self, cutoff_time):
         """
-        Reconcile a single payment
-        
-        In production, this would query the payment provider's API
-        to check actual payment status.
-        """
-        # Lock the payment row
-        payment = Payment.objects.select_for_update().get(id=payment.id)
-        
-        # Check if payment was already settled
-        if payment.status != 'pending':
-            stats['already_settled'] += 1
-            return
+        Mark every stale pending payment as failed in one pass
         
-        # Calculate how long payment has been pending
-        age = timezone.now() - payment.created_at
+        One locking SELECT snapshots just the columns the audit log needs,
+        a single UPDATE flips the rows and one bulk insert writes the log. In production this
+        would query the payment provider's API before failing a payment.
         
-        # Mark as failed if pending for more than 1 hour
-        # In production, query provider API first
-        if age > timedelta(hours=1):
-            old_status = payment.status
-            payment.status = 'failed'
-            payment.save()
+        Returns (checked, marked_failed) once the batch has committed.
+        """
+        with transaction.atomic():
+            now = timezone.now()
+            stale_payments = list(Payment.objects.select_for_update().filter(
+                status__in=['pending_init', 'pending'],
+                created_at__lt=cutoff_time
+            ).annotate(
+                age=ExpressionWrapper(Now() - F('created_at'), output_field=DurationField())
+            ).values_list('id', 'payment_id', 'status', 'user_id', 'amount', 'payment_method', 'age'))
             
-            stats['marked_failed'] += 1
+            if not stale_payments:
+                return 0, 0
             
-            # Log to TransactionLog for audit trail
-            TransactionLog.objects.create(
-                transaction_type='payment_reconciliation',
-                user=payment.user,
-                data={
-                    'payment_id': str(payment.payment_id),
-                    'old_status': old_status,
-                    'new_status': 'failed',
-                    'reason': 'stale_pending_payment',
-                    'age_hours': age.total_seconds() / 3600,
-                    'amount': str(payment.amount),
-                    'method': payment.method
-                }
-            )
+            marked_failed = Payment.objects.filter(
+                id__in=[row[0] for row in stale_payments]
+            ).update(status='failed', updated_at=now)
             
-            logger.warning(f"Marked payment {payment.payment_id} as failed (age: {age})")
+            # Log to TransactionLog for audit trail
+            TransactionLog.bulk_create_chained([
+                TransactionLog(
+                    transaction_id=f"RECON-{payment_id}",
+                    transaction_type='payment_reconciliation',
+                    user_id=user_id,
+                    amount=amount,
+                    payment_method=method,
+                    payment_reference=str(payment_id),
+                    data={
+                        'payment_id': str(payment_id),
+                        'old_status': status,
+                        'new_status': 'failed',
+                        'reason': 'stale_pending_payment',
+                        'age_hours': age.total_seconds() / 3600,
+                        'amount': str(amount),
+                        'method': method
+                    }
+                )
+                for _, payment_id, status, user_id, amount, method, age in stale_payments
+            ])
+        
+        for _, payment_id, _, _, _, _, age in stale_payments:
+            logger.warning(f"Marked payment {payment_id} as failed (age: {age})")
+        
+        return len(stale_payments), marked_failed
     
     def _log_reconciliation_summary(self, stats):
         """Log reconciliation summary to TransactionLog"""
@@ -128,7 +129,6 @@ class ReconcilePaymentsCronJob(CronJobBase):
                 'timestamp': timezone.now().isoformat(),
                 'total_checked': stats['total_checked'],
                 'marked_failed': stats['marked_failed'],
-                'already_settled': stats['already_settled'],
                 'discrepancies_count': len(stats['discrepancies']),
                 'discrepancies': stats['discrepancies']
             }
@@ -155,7 +155,7 @@ class MonitorUnconfirmedPaymentsCronJob(CronJobBase):
             # Find payments pending for more than 10 minutes
             cutoff_time = timezone.now() - timedelta(minutes=10)
             unconfirmed = Payment.objects.filter(
-                status='pending',
+                status__in=['pending_init', 'pending'],
                 created_at__lt=cutoff_time
             ).count()
             
@@ -197,17 +197,8 @@ class CleanupExpiredWebhookEventsCronJob(CronJobBase):
         """
         Clean up expired webhook event IDs
         
-        Note: Redis TTL handles this automatically, but this job
-        logs the cleanup for audit purposes.
+        Note: Redis TTL handles this automatically, so there is nothing
+        to delete; the run is only noted in the application log rather
+        than adding a TransactionLog row every day.
         """
-        logger.info("Webhook event cleanup job executed")
-        
-        # Log to TransactionLog
-        TransactionLog.objects.create(
-            transaction_type='webhook_cleanup',
-            user=None,
-            data={
-                'timestamp': timezone.now().isoformat(),
-                'note': 'Webhook event IDs expire automatically via Redis TTL'
-            }
-        )
+        logger.info("Webhook event cleanup job executed: event IDs expire via Redis TTL")
@@ -7,6 +7,8 @@ Run via cron: 0 2 * * * python manage.py reconcile_payments
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F
+from django.db.models.functions import Now
 from datetime import timedelta
 from decimal import Decimal
 from payments.models import Payment
@@ -24,54 +26,56 @@ class Command(BaseCommand):
         
         stats = {
             'total_checked': 0,
-            'marked_failed': 0,
-            'already_settled': 0
+            'marked_failed': 0
         }
         
         # Find pending payments older than 1 hour
         cutoff_time = timezone.now() - timedelta(hours=1)
-        stale_payments = Payment.objects.filter(
-            status='pending',
-            created_at__lt=cutoff_time
-        ).select_related('user')
-        
-        stats['total_checked'] = stale_payments.count()
-        
-        for payment in stale_payments:
-            try:
-                with transaction.atomic():
-                    # Lock payment row
-                    payment = Payment.objects.select_for_update().get(id=payment.id)
-                    
-                    if payment.status != 'pending':
-                        stats['already_settled'] += 1
-                        continue
-                    
-                    # Mark as failed
-                    age = timezone.now() - payment.created_at
-                    payment.status = 'failed'
-                    payment.save()
-                    
-                    stats['marked_failed'] += 1
+        try:
+            marked_failed = 0
+            with transaction.atomic():
+                # Lock every stale row at once and fail them with one UPDATE
+                now = timezone.now()
+                stale_payments = list(Payment.objects.select_for_update().filter(
+                    status__in=['pending_init', 'pending'],
+                    created_at__lt=cutoff_time
+                ).annotate(
+                    age=ExpressionWrapper(Now() - F('created_at'), output_field=DurationField())
+                ).values_list('id', 'payment_id', 'status', 'user_id', 'amount', 'payment_method', 'age'))
+                
+                if stale_payments:
+                    marked_failed = Payment.objects.filter(
+                        id__in=[row[0] for row in stale_payments]
+                    ).update(status='failed', updated_at=now)
                     
                     # Log to TransactionLog
-                    TransactionLog.objects.create(
-                        transaction_type='payment_reconciliation',
-                        user=payment.user,
-                        data={
-                            'payment_id': str(payment.payment_id),
-                            'old_status': 'pending',
-                            'new_status': 'failed',
-                            'reason': 'stale_pending_payment',
-                            'age_hours': age.total_seconds() / 3600
-                        }
-                    )
+                    TransactionLog.bulk_create_chained([
+                        TransactionLog(
+                            transaction_id=f"RECON-{payment_id}",
+                            transaction_type='payment_reconciliation',
+                            user_id=user_id,
+                            amount=amount,
+                            payment_method=method,
+                            payment_reference=str(payment_id),
+                            data={
+                                'payment_id': str(payment_id),
+                                'old_status': status,
+                                'new_status': 'failed',
+                                'reason': 'stale_pending_payment',
+                                'age_hours': age.total_seconds() / 3600
+                            }
+                        )
+                        for _, payment_id, status, user_id, amount, method, age in stale_payments
+                    ])
+            
+            # Only count the batch once its transaction has committed
+            stats['total_checked'] = len(stale_payments)
+            stats['marked_failed'] = marked_failed
                     
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Error reconciling payment {payment.payment_id}: {e}"))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Error reconciling stale payments: {e}"))
         
         self.stdout.write(self.style.SUCCESS(
             f"Reconciliation complete: {stats['total_checked']} checked, "
-            f"{stats['marked_failed']} marked failed, "
-            f"{stats['already_settled']} already settled"
+            f"{stats['marked_failed']} marked failed"
         ))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-16 19:53
+
+import payments.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_alter_ussdsession_stage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='payment_id',
+            field=models.UUIDField(default=payments.models.uuid7, editable=False, unique=True),
+        ),
+    ]
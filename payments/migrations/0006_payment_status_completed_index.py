@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-16 19:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0014_item_seller_status_review_seller_indexes'),
+        ('payments', '0005_payment_id_uuid7'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-completed_at'], name='payments_pa_status_587a18_idx'),
+        ),
+    ]
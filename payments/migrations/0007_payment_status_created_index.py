@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0016_fraudalert_filter_indexes'),
+        ('payments', '0006_payment_status_completed_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-created_at'], name='payments_pa_status_21ed42_idx'),
+        ),
+    ]
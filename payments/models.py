@@ -1,10 +1,26 @@
 from django.db import models
 from django.contrib.auth.models import User
 from auctions.models import Item
+import os
+import time
 import uuid
 
+def uuid7():
+    """
+    Time-ordered UUID (RFC 9562 version 7): a 48-bit millisecond timestamp
+    followed by random bits, so new payment ids land at the end of the index.
+    """
+    value = (time.time_ns() // 1_000_000) << 80
+    value |= int.from_bytes(os.urandom(10), 'big')
+    value &= ~(0xF << 76)
+    value |= 0x7 << 76
+    value &= ~(0x3 << 62)
+    value |= 0x2 << 62
+    return uuid.UUID(int=value)
+
 class Payment(models.Model):
     STATUS_CHOICES = [
+        ('pending_init', 'Awaiting Provider'),
         ('pending', 'Pending'),
         ('processing', 'Processing'),
         ('completed', 'Completed'),
@@ -23,7 +39,7 @@ class Payment(models.Model):
         ('web', 'Web'),
     ]
     
-    payment_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    payment_id = models.UUIDField(default=uuid7, unique=True, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payments')
     item = models.ForeignKey(Item, on_delete=models.SET_NULL, null=True, blank=True, related_name='payments')
     
@@ -44,9 +60,18 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-completed_at']),
+            models.Index(fields=['status', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.payment_method} - {self.amount} ({self.status})"
+    
+    @property
+    def provider_message(self):
+        """Message the provider returned for the checkout call, if one was recorded"""
+        return self.metadata.get('payment_result', {}).get('message') or 'Unknown error'
 
 class USSDSession(models.Model):
     STAGE_CHOICES = [
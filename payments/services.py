@@ -20,6 +20,10 @@ class PaymentService:
         else:
             return BankTransferService()
     
+    def validate_payment_data(self, payment_data):
+        """Return an error message if payment_data cannot be sent to the provider, else None"""
+        return None
+    
     def process_payment(self, amount, currency, payment_data):
         raise NotImplementedError("Subclasses must implement process_payment")
 
@@ -32,16 +36,22 @@ class FlutterwaveService(PaymentService):
             "Content-Type": "application/json"
         }
     
+    def validate_payment_data(self, payment_data):
+        if not payment_data.get('phone_number') or not payment_data.get('email'):
+            return 'Phone number and email are required'
+        return None
+    
     def process_payment(self, amount, currency, payment_data):
         phone_number = payment_data.get('phone_number', '')
         network = payment_data.get('network', 'MTN').upper()
         email = payment_data.get('email', '')
         fullname = payment_data.get('fullname', 'Customer')
         
-        if not phone_number or not email:
+        error = self.validate_payment_data(payment_data)
+        if error:
             return {
                 'success': False,
-                'message': 'Phone number and email are required'
+                'message': error
             }
         
         if not self.secret_key:
@@ -295,3 +305,70 @@ def settle_payment_to_sellers(payment, cart_items):
     payment.save(update_fields=['completed_at'])
     
     return results
+
+def record_checkout_result(payment, result, currency, items=None):
+    """
+    Store the provider's answer on a checkout payment and, when it
+    succeeded, write one purchase TransactionLog per item.
+    
+    A rejected payment becomes failed; an accepted pending_init payment
+    becomes pending, which is what the payment pages wait for.
+    
+    Args:
+        payment: pending_init or pending checkout Payment
+        result: dict returned by PaymentService.process_payment
+        currency: currency code the provider was charged in
+        items: purchased Item objects; loaded from payment.metadata['cart_items'] if omitted
+        
+    Returns:
+        the refreshed Payment
+    """
+    from auctions.models import Item, TransactionLog
+    from django.db import transaction
+    from .models import Payment
+    
+    # Work on a locked fresh copy so this cannot interleave with the payment page's confirmation,
+    # and write the status change and the purchase logs together so neither lands without the other
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().select_related('user').get(pk=payment.pk)
+        payment.metadata['payment_result'] = {
+            'success': result.get('success'),
+            'message': result.get('message'),
+            'transaction_id': result.get('transaction_id') or result.get('payment_id') or result.get('session_id')
+        }
+        update_fields = ['metadata', 'updated_at']
+        if not result.get('success') and payment.status in ('pending_init', 'pending'):
+            payment.status = 'failed'
+            update_fields.append('status')
+        elif result.get('success') and payment.status == 'pending_init':
+            # The provider accepted the charge, so the payment page may now confirm it
+            payment.status = 'pending'
+            update_fields.append('status')
+        payment.save(update_fields=update_fields)
+        
+        if not result.get('success'):
+            return payment
+        
+        if items is None:
+            items = Item.objects.select_related('seller').filter(id__in=payment.metadata.get('cart_items', []))
+        
+        TransactionLog.bulk_create_chained([
+            TransactionLog(
+                transaction_id=f"ORDER-{payment.payment_id}-{item.id}",
+                transaction_type='purchase',
+                item=item,
+                user=payment.user,
+                amount=item.current_price,
+                payment_method=payment.payment_method,
+                payment_reference=str(payment.payment_id),
+                data={
+                    'seller': item.seller.username,
+                    'payment_id': str(payment.payment_id),
+                    'phone_number': payment.phone_number,
+                    'country': payment.metadata.get('country'),
+                    'currency': currency
+                }
+            )
+            for item in items
+        ])
+    return payment
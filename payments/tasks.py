@@ -0,0 +1,81 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+# Gateway behind each redirect-based payment method
+PROVIDER_FOR_METHOD = {
+    'mtn': 'flutterwave',
+    'airtel': 'flutterwave',
+    'card': 'stripe',
+    'paypal': 'paypal',
+}
+
+# One pool per gateway, so a slow or unreachable provider only backs up its own payments
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _executor_for(payment_method):
+    """Return the gateway's pool, creating it on first use."""
+    provider = PROVIDER_FOR_METHOD[payment_method]
+    with _executors_lock:
+        if provider not in _executors:
+            _executors[provider] = ThreadPoolExecutor(
+                max_workers=settings.PAYMENT_INIT_WORKERS,
+                thread_name_prefix=f'payment-init-{provider}',
+            )
+        return _executors[provider]
+
+
+def _in_worker(task, *args):
+    """Pool entry point: run the task, then release the worker's expired connections"""
+    try:
+        task(*args)
+    finally:
+        close_old_connections()
+
+
+def initiate_checkout_payment(payment_pk, amount, currency, payment_data):
+    """
+    Send a pending checkout payment to its provider outside the request thread.
+    """
+    from .services import PaymentService, record_checkout_result
+
+    try:
+        payment = Payment.objects.get(pk=payment_pk)
+    except Payment.DoesNotExist:
+        logger.info(f"Skipping provider call for payment {payment_pk}: payment no longer exists")
+        return
+    
+    try:
+        service = PaymentService.get_service(payment.payment_method, payment.metadata.get('country'))
+        result = service.process_payment(amount, currency, payment_data)
+    except Exception as e:
+        logger.error(f"Provider call failed for payment {payment_pk}: {str(e)}")
+        # Fail it now with the error, so the payment page reports it instead of waiting on reconciliation
+        result = {'success': False, 'message': f'Error: {str(e)}'}
+    
+    try:
+        record_checkout_result(payment, result, currency)
+    except Exception as e:
+        # Nothing was saved, so the payment stays in pending_init for reconciliation
+        logger.error(f"Could not record provider result for payment {payment_pk}: {str(e)}")
+
+
+def enqueue_checkout_payment(payment, amount, currency, payment_data):
+    """
+    Schedule the provider call once the pending payment is committed.
+    Runs inline when PAYMENT_INIT_ASYNC is disabled.
+    """
+    if not settings.PAYMENT_INIT_ASYNC:
+        initiate_checkout_payment(payment.pk, amount, currency, payment_data)
+        return
+
+    payment_pk = payment.pk
+    executor = _executor_for(payment.payment_method)
+    transaction.on_commit(lambda: executor.submit(_in_worker, initiate_checkout_payment, payment_pk, amount, currency, payment_data))
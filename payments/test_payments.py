@@ -1,6 +1,16 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
+from django.contrib import messages
+from django.contrib.messages.storage.fallback import FallbackStorage
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
+from auctions.models import Message, TransactionLog
+from auctions.views import admin_payments_etag
+from payments.cron import ReconcilePaymentsCronJob
 from payments.models import Payment
 import uuid
 
@@ -258,6 +268,149 @@ class PaymentProcessingTestCase(TestCase):
         
         self.assertEqual(user1_payments, 3)
         self.assertEqual(user2_payments, 2)
+    
+    def test_checkout_provider_call_waits_for_commit(self):
+        """Test that redirect-based checkout payments reach the provider only after commit"""
+        from unittest import mock
+        from payments.tasks import _in_worker, enqueue_checkout_payment, initiate_checkout_payment
+        
+        payment = Payment.objects.create(
+            user=self.user,
+            amount=Decimal('105000'),
+            platform_tax=Decimal('5000'),
+            payment_method='card',
+            status='pending',
+            payment_id=uuid.uuid4()
+        )
+        
+        stripe_pool = mock.Mock()
+        with mock.patch.dict('payments.tasks._executors', {'stripe': stripe_pool}):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                enqueue_checkout_payment(payment, 105000.0, 'UGX', {})
+                stripe_pool.submit.assert_not_called()
+        
+        self.assertEqual(len(callbacks), 1)
+        stripe_pool.submit.assert_called_once()
+        self.assertEqual(stripe_pool.submit.call_args.args[:3], (_in_worker, initiate_checkout_payment, payment.pk))
+    
+    def test_checkout_provider_error_fails_payment(self):
+        """Test that a provider call that raises fails the payment with the error"""
+        from unittest import mock
+        from payments.tasks import initiate_checkout_payment
+        
+        payment = Payment.objects.create(
+            user=self.user,
+            amount=Decimal('105000'),
+            platform_tax=Decimal('5000'),
+            payment_method='mtn',
+            status='pending_init',
+            metadata={'country': 'UG', 'cart_items': []}
+        )
+        
+        with mock.patch('payments.services.PaymentService.get_service') as get_service:
+            get_service.return_value.process_payment.side_effect = RuntimeError('connection reset')
+            initiate_checkout_payment(payment.pk, 105000.0, 'UGX', {})
+        
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+        self.assertEqual(payment.provider_message, 'Error: connection reset')
+    
+    def test_checkout_log_failure_keeps_accepted_payment(self):
+        """Test that a failed purchase log insert neither fails nor half-records an accepted payment"""
+        from unittest import mock
+        from payments.tasks import initiate_checkout_payment
+        
+        payment = Payment.objects.create(
+            user=self.user,
+            amount=Decimal('105000'),
+            platform_tax=Decimal('5000'),
+            payment_method='mtn',
+            status='pending_init',
+            metadata={'country': 'UG', 'cart_items': []}
+        )
+        
+        with mock.patch('payments.services.PaymentService.get_service') as get_service, \
+                mock.patch('auctions.models.TransactionLog.bulk_create_chained', side_effect=RuntimeError('deadlock')):
+            get_service.return_value.process_payment.return_value = {
+                'success': True, 'message': 'Charge initiated', 'transaction_id': 'FLW-123'
+            }
+            initiate_checkout_payment(payment.pk, 105000.0, 'UGX', {})
+        
+        # The status change rolled back with the logs, leaving it for reconciliation rather than failed
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending_init')
+        self.assertNotIn('payment_result', payment.metadata)
+    
+    def test_checkout_provider_failure_blocks_confirmation(self):
+        """Test that a provider rejection fails the payment and the payment page reports it"""
+        from unittest import mock
+        from django.contrib.messages import get_messages
+        from django.urls import reverse
+        from payments.tasks import initiate_checkout_payment
+        
+        payment = Payment.objects.create(
+            user=self.user,
+            amount=Decimal('105000'),
+            platform_tax=Decimal('5000'),
+            payment_method='card',
+            status='pending_init',
+            metadata={'country': 'UG', 'cart_items': []}
+        )
+        
+        with mock.patch('payments.services.PaymentService.get_service') as get_service:
+            get_service.return_value.process_payment.return_value = {'success': False, 'message': 'Card declined'}
+            initiate_checkout_payment(payment.pk, 105000.0, 'UGX', {})
+        
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+        self.assertEqual(payment.provider_message, 'Card declined')
+        
+        self.client.login(username='testuser', password='pass123')
+        response = self.client.get(reverse('card_payment_page', args=[payment.payment_id]))
+        self.assertRedirects(response, reverse('checkout'), fetch_redirect_response=False)
+        self.assertIn('Payment failed: Card declined', [str(m) for m in get_messages(response.wsgi_request)])
+        
+        self.client.post(reverse('process_card_payment'), {
+            'payment_id': payment.payment_id,
+            'cardholder_name': 'Test User',
+            'card_number': '4242 4242 4242 4242',
+            'expiry_date': '12/30',
+            'cvv': '123',
+            'billing_zip': '00000',
+        })
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+    
+    def test_payment_page_waits_for_provider(self):
+        """Test that a payment cannot be confirmed until the provider accepts it"""
+        from django.urls import reverse
+        from payments.services import record_checkout_result
+        
+        payment = Payment.objects.create(
+            user=self.user,
+            amount=Decimal('105000'),
+            platform_tax=Decimal('5000'),
+            payment_method='card',
+            status='pending_init',
+            metadata={'country': 'UG', 'cart_items': []}
+        )
+        
+        self.client.login(username='testuser', password='pass123')
+        response = self.client.post(reverse('process_card_payment'), {
+            'payment_id': payment.payment_id,
+            'cardholder_name': 'Test User',
+            'card_number': '4242 4242 4242 4242',
+            'expiry_date': '12/30',
+            'cvv': '123',
+            'billing_zip': '00000',
+        })
+        self.assertRedirects(response, reverse('card_payment_page', args=[payment.payment_id]), fetch_redirect_response=False)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending_init')
+        
+        record_checkout_result(payment, {'success': True, 'message': 'Session created'}, 'UGX', [])
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending')
 
 
 class PaymentSecurityTestCase(TestCase):
@@ -315,3 +468,89 @@ class PaymentSecurityTestCase(TestCase):
         # Verify data is in metadata
         self.assertIn('phone_number', payment.metadata)
         self.assertIn('transaction_reference', payment.metadata)
+
+
+class PaymentReconciliationTestCase(TestCase):
+    """Test that reconciliation fails stale payments and logs each one"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='reconuser', password='pass123')
+        self.stale_pending = self.create_payment('pending', hours_old=2)
+        self.stale_pending_init = self.create_payment('pending_init', hours_old=3)
+        self.fresh_pending = self.create_payment('pending', hours_old=0)
+        self.old_completed = self.create_payment('completed', hours_old=5)
+    
+    def create_payment(self, status, hours_old):
+        payment = Payment.objects.create(
+            user=self.user,
+            amount=Decimal('105000'),
+            platform_tax=Decimal('5000'),
+            payment_method='mtn',
+            status=status
+        )
+        # created_at is auto_now_add, so backdate it with an update
+        Payment.objects.filter(pk=payment.pk).update(created_at=timezone.now() - timedelta(hours=hours_old))
+        return payment
+    
+    def assert_reconciled(self):
+        statuses = dict(Payment.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[self.stale_pending.pk], 'failed')
+        self.assertEqual(statuses[self.stale_pending_init.pk], 'failed')
+        self.assertEqual(statuses[self.fresh_pending.pk], 'pending')
+        self.assertEqual(statuses[self.old_completed.pk], 'completed')
+        
+        recon_logs = TransactionLog.objects.filter(transaction_type='payment_reconciliation').order_by('id')
+        self.assertEqual(
+            sorted(log.transaction_id for log in recon_logs),
+            sorted(f"RECON-{payment.payment_id}" for payment in (self.stale_pending, self.stale_pending_init))
+        )
+        
+        previous_hash = TransactionLog.objects.filter(id__lt=recon_logs[0].id).order_by('-id').values_list(
+            'current_hash', flat=True
+        ).first() or ''
+        for log in recon_logs:
+            self.assertEqual(log.previous_hash, previous_hash)
+            self.assertEqual(log.current_hash, log.calculate_hash())
+            self.assertEqual(log.data['new_status'], 'failed')
+            previous_hash = log.current_hash
+    
+    def test_cron_job_fails_stale_payments(self):
+        """Test that the cron job fails only stale pending payments, with one chained log each"""
+        checked, marked_failed = ReconcilePaymentsCronJob()._reconcile_payments(timezone.now() - timedelta(hours=1))
+        self.assertEqual((checked, marked_failed), (2, 2))
+        self.assert_reconciled()
+    
+    def test_management_command_fails_stale_payments(self):
+        """Test that the reconcile_payments command fails only stale pending payments, with one chained log each"""
+        out = StringIO()
+        call_command('reconcile_payments', stdout=out)
+        self.assert_reconciled()
+        self.assertIn('2 checked, 2 marked failed', out.getvalue())
+
+
+class AdminPaymentsPageTestCase(TestCase):
+    """Test conditional responses on the admin payment list"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='payadmin', password='pass123')
+        self.other = User.objects.create_user(username='payother', password='pass123')
+        self.client.login(username='payadmin', password='pass123')
+    
+    def test_unread_message_changes_etag(self):
+        """Test that a new unread message invalidates a cached admin payment list"""
+        etag = self.client.get(reverse('admin_payments'))['ETag']
+        self.assertEqual(self.client.get(reverse('admin_payments'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        Message.objects.create(sender=self.other, recipient=self.admin, content='Refund question')
+        self.assertEqual(self.client.get(reverse('admin_payments'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_queued_flash_messages_skip_etag(self):
+        """Test that a request carrying flash messages gets no ETag, so it is never answered with 304"""
+        request = RequestFactory().get(reverse('admin_payments'))
+        request.user = self.admin
+        request.session = self.client.session
+        request._messages = FallbackStorage(request)
+        self.assertIsNotNone(admin_payments_etag(request))
+        
+        messages.success(request, 'Payment refunded')
+        self.assertIsNone(admin_payments_etag(request))
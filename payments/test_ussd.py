@@ -377,3 +377,50 @@ class USSDSessionManagementTestCase(TestCase):
             
             session.refresh_from_db()
             self.assertEqual(session.stage, stage)
+
+
+class USSDBuyNowTestCase(TestCase):
+    """Test USSD Buy Now purchases"""
+    
+    def setUp(self):
+        self.seller = User.objects.create_user(username='ussd_buynow_seller', password='testpass123')
+        self.buyer = User.objects.create_user(username='ussd_buynow_buyer', password='testpass123')
+        self.buyer.wallet.balance = Decimal('500000')
+        self.buyer.wallet.save()
+        
+        self.category = Category.objects.create(name='USSD Buy Now Category')
+        self.item = Item.objects.create(
+            title='USSD Buy Now Item',
+            seller=self.seller,
+            category=self.category,
+            description='Test item for USSD Buy Now',
+            starting_price=Decimal('100000'),
+            current_price=Decimal('100000'),
+            buy_now_price=Decimal('200000'),
+            min_increment=Decimal('5000'),
+            end_time=timezone.now() + timedelta(hours=24),
+            status='active'
+        )
+    
+    def test_buy_now_refreshes_seller_counts(self):
+        """Test that a USSD Buy Now sale moves the item from the seller's active to sold count"""
+        from payments.ussd_views import handle_buy_now_confirmation
+        
+        self.seller.profile.refresh_from_db()
+        self.assertEqual(self.seller.profile.active_item_count, 1)
+        self.assertEqual(self.seller.profile.sold_item_count, 0)
+        
+        session = USSDSession.objects.create(
+            session_id=str(uuid.uuid4()),
+            phone_number='+256700333333',
+            user=self.buyer,
+            selected_item=self.item
+        )
+        handle_buy_now_confirmation(session, '1234')
+        
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.status, 'sold')
+        self.assertEqual(self.item.winner, self.buyer)
+        self.seller.profile.refresh_from_db()
+        self.assertEqual(self.seller.profile.active_item_count, 0)
+        self.assertEqual(self.seller.profile.sold_item_count, 1)
@@ -1,15 +1,17 @@
-from django.shortcuts import render
+from django.shortcuts import render, redirect
+from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
+from django.db.models import F
 from decimal import Decimal, InvalidOperation
 import uuid
 
 from .models import USSDSession, Payment
 from .sms_service import SMSService
 from .services import FlutterwaveService
-from auctions.models import Item, Bid
+from auctions.models import Item, Bid, bump_home_cache_version
 
 @login_required
 def ussd_simulator(request):
@@ -365,7 +367,7 @@ def handle_buy_now_pin_entry(session, pin):
 def handle_buy_now_confirmation(session, pin):
     """Process Buy Now purchase"""
     from django.db import transaction
-    from auctions.models import Item
+    from auctions.models import Item, invalidate_seller_page, recount_seller_items
     from users.models import Wallet, WalletTransaction
     
     try:
@@ -423,6 +425,11 @@ def handle_buy_now_confirmation(session, pin):
                     'end_session': True
                 })
             
+            # The queryset update sends no post_save, so refresh what the Item signals would have
+            recount_seller_items(item.seller_id)
+            invalidate_seller_page(item.seller_id)
+            bump_home_cache_version()
+            
             # Purchase successful - process wallet transactions
             wallet.balance -= total_amount
             wallet.save()
@@ -431,8 +438,9 @@ def handle_buy_now_confirmation(session, pin):
                 wallet=wallet,
                 transaction_type='purchase',
                 amount=-total_amount,
+                balance_after=wallet.balance,
                 description=f'Buy Now purchase (USSD): {item.title}',
-                reference=f'USSD-BUYNOW-{item.pk}-{timezone.now().timestamp()}'
+                payment_reference=f'USSD-BUYNOW-{item.pk}-{timezone.now().timestamp()}'
             )
             
             seller_wallet, _ = Wallet.objects.get_or_create(user=item.seller)
@@ -443,16 +451,18 @@ def handle_buy_now_confirmation(session, pin):
                 wallet=seller_wallet,
                 transaction_type='sale',
                 amount=seller_receives,
+                balance_after=seller_wallet.balance,
                 description=f'Sale (USSD Buy Now): {item.title} (5% platform fee deducted)',
-                reference=f'USSD-BUYNOW-SALE-{item.pk}-{timezone.now().timestamp()}'
+                payment_reference=f'USSD-BUYNOW-SALE-{item.pk}-{timezone.now().timestamp()}'
             )
             
             WalletTransaction.objects.create(
                 wallet=seller_wallet,
                 transaction_type='platform_tax',
                 amount=-tax_amount,
+                balance_after=seller_wallet.balance,
                 description=f'Platform tax (5%) for {item.title}',
-                reference=f'USSD-TAX-{item.pk}-{timezone.now().timestamp()}'
+                payment_reference=f'USSD-TAX-{item.pk}-{timezone.now().timestamp()}'
             )
         
         # Create transaction log
@@ -613,8 +623,13 @@ def handle_bid_confirmation(session, pin):
             amount=session.bid_amount
         )
         
+        Item.objects.filter(pk=session.selected_item.pk).update(
+            current_price=session.bid_amount,
+            bid_count=F('bid_count') + 1
+        )
+        bump_home_cache_version()
         session.selected_item.current_price = session.bid_amount
-        session.selected_item.save()
+        session.selected_item.bid_count += 1
         
         payment = Payment.objects.create(
             user=session.user,
@@ -1193,7 +1208,7 @@ def ussd_wallet_deposit(request, payment_id):
         payment = Payment.objects.select_related('user').get(
             payment_id=payment_id, 
             user=request.user, 
-            status='pending'
+            status__in=['pending_init', 'pending', 'failed']
         )
     except Payment.DoesNotExist:
         messages.error(request, 'Payment not found or unauthorized.')
@@ -1203,6 +1218,12 @@ def ussd_wallet_deposit(request, payment_id):
         messages.error(request, 'Unauthorized access to payment.')
         return redirect('wallet_deposit')
     
+    if payment.status == 'failed':
+        messages.error(request, f'Payment failed: {payment.provider_message}')
+        return redirect('checkout' if 'cart_items' in payment.metadata else 'wallet_deposit')
+    if payment.status == 'pending_init':
+        messages.info(request, 'We are still confirming this payment with the provider. You can enter your PIN in a moment.')
+    
     phone_number = payment.phone_number or ''
     
     context = {
@@ -1270,7 +1291,7 @@ def ussd_wallet_initiate(request):
             payment = Payment.objects.select_related('user').get(
                 payment_id=payment_id, 
                 user=request.user, 
-                status='pending'
+                status__in=['pending_init', 'pending']
             )
         except Payment.DoesNotExist:
             return JsonResponse({'error': 'Payment not found or unauthorized'}, status=400)
@@ -1363,6 +1384,7 @@ def ussd_wallet_respond(request):
 
 def handle_wallet_pin_confirmation(session, pin):
     """Handle wallet transaction PIN confirmation"""
+    from django.db import transaction
     from users.models import Wallet
     
     if len(pin) != 4 or not pin.isdigit():
@@ -1379,128 +1401,138 @@ def handle_wallet_pin_confirmation(session, pin):
         total_amount = Decimal(str(session.session_data.get('total_amount', 0)))
         shipping_cost = Decimal(str(session.session_data.get('shipping_cost', 0)))
         
-        payment = Payment.objects.get(payment_id=payment_id, user=session.user, status='pending')
-        wallet, created = Wallet.objects.get_or_create(user=session.user)
-        
-        network_name = 'MTN' if session.network == 'mtn' else 'Airtel'
-        
-        if action == 'deposit':
-            is_checkout = 'cart_items' in payment.metadata
-            
-            wallet.deposit(
-                amount=base_amount,
-                description=f'{network_name} Mobile Money deposit - {payment.transaction_reference}',
-                transaction_type='deposit',
-                payment_method=session.network
+        with transaction.atomic():
+            # Lock the payment so the background provider call cannot change it underneath us
+            payment = Payment.objects.select_for_update().get(
+                payment_id=payment_id, user=session.user, status__in=['pending_init', 'pending']
             )
+            if payment.status == 'pending_init':
+                return JsonResponse({
+                    'message': 'Your payment is still being confirmed with the provider.\n\nPlease enter your PIN again in a moment:',
+                    'stage': 'wallet_pin_entry'
+                })
             
-            payment.amount = total_amount
-            payment.platform_tax = tax_amount
-            payment.status = 'completed'
-            payment.completed_at = timezone.now()
-            payment.metadata['base_amount'] = str(base_amount)
-            payment.metadata['platform_tax'] = str(tax_amount)
-            payment.metadata['total'] = str(total_amount)
-            payment.save()
+            wallet, created = Wallet.objects.get_or_create(user=session.user)
             
-            SMSService.send_wallet_confirmation(
-                phone_number=session.phone_number,
-                amount=float(base_amount),
-                tax_amount=float(tax_amount),
-                total_amount=float(total_amount),
-                balance=float(wallet.balance),
-                action='deposit',
-                network=network_name,
-                demo_mode=True
-            )
+            network_name = 'MTN' if session.network == 'mtn' else 'Airtel'
             
-            if is_checkout:
-                from auctions.models import Cart, CartItem
-                from payments.services import settle_payment_to_sellers
+            if action == 'deposit':
+                is_checkout = 'cart_items' in payment.metadata
+                
+                wallet.deposit(
+                    amount=base_amount,
+                    description=f'{network_name} Mobile Money deposit - {payment.transaction_reference}',
+                    transaction_type='deposit',
+                    payment_method=session.network
+                )
+                
+                payment.amount = total_amount
+                payment.platform_tax = tax_amount
+                payment.status = 'completed'
+                payment.completed_at = timezone.now()
+                payment.metadata['base_amount'] = str(base_amount)
+                payment.metadata['platform_tax'] = str(tax_amount)
+                payment.metadata['total'] = str(total_amount)
+                payment.save(update_fields=['amount', 'platform_tax', 'status', 'completed_at', 'metadata', 'updated_at'])
+                
+                SMSService.send_wallet_confirmation(
+                    phone_number=session.phone_number,
+                    amount=float(base_amount),
+                    tax_amount=float(tax_amount),
+                    total_amount=float(total_amount),
+                    balance=float(wallet.balance),
+                    action='deposit',
+                    network=network_name,
+                    demo_mode=True
+                )
                 
-                try:
-                    cart = Cart.objects.get(user=session.user)
-                    cart_items = list(cart.items.all())
+                if is_checkout:
+                    from auctions.models import Cart, CartItem
+                    from payments.services import settle_payment_to_sellers
                     
-                    if cart_items:
-                        settle_payment_to_sellers(payment, cart_items)
-                        cart.items.all().delete()
-                except Cart.DoesNotExist:
-                    pass
+                    try:
+                        cart = Cart.objects.get(user=session.user)
+                        cart_items = list(cart.items.all())
+                        
+                        if cart_items:
+                            settle_payment_to_sellers(payment, cart_items)
+                            cart.items.all().delete()
+                    except Cart.DoesNotExist:
+                        pass
+                    
+                    message = f"✅ Payment Successful!\n\n"
+                    message += f"Subtotal: UGX {base_amount:,.0f}\n"
+                    if shipping_cost > 0:
+                        message += f"Shipping: UGX {shipping_cost:,.0f}\n"
+                    message += f"Platform Tax (5%): UGX {tax_amount:,.0f}\n"
+                    message += f"Total Paid: UGX {total_amount:,.0f}\n"
+                    message += f"Payment: {network_name} MoMo\n\n"
+                    message += f"Processing your order...\n"
+                    message += f"SMS sent to {session.phone_number}\n\n"
+                    message += "Thank you!"
+                else:
+                    message = f"✅ Deposit Successful!\n\n"
+                    message += f"Amount: UGX {base_amount:,.0f}\n"
+                    message += f"Tax (5%): UGX {tax_amount:,.0f}\n"
+                    message += f"Total Paid: UGX {total_amount:,.0f}\n"
+                    message += f"New Balance: UGX {wallet.balance:,.0f}\n"
+                    message += f"Payment: {network_name} MoMo\n\n"
+                    message += f"SMS sent to {session.phone_number}\n\n"
+                    message += "Thank you!"
                 
-                message = f"✅ Payment Successful!\n\n"
-                message += f"Subtotal: UGX {base_amount:,.0f}\n"
-                if shipping_cost > 0:
-                    message += f"Shipping: UGX {shipping_cost:,.0f}\n"
-                message += f"Platform Tax (5%): UGX {tax_amount:,.0f}\n"
-                message += f"Total Paid: UGX {total_amount:,.0f}\n"
-                message += f"Payment: {network_name} MoMo\n\n"
-                message += f"Processing your order...\n"
-                message += f"SMS sent to {session.phone_number}\n\n"
-                message += "Thank you!"
-            else:
-                message = f"✅ Deposit Successful!\n\n"
+            elif action == 'withdraw':
+                if not wallet.can_withdraw(base_amount):
+                    message = f"❌ Withdrawal Failed\n\n"
+                    message += f"Insufficient balance or wallet locked.\n\n"
+                    message += f"Available: UGX {wallet.balance:,.0f}"
+                    
+                    session.is_active = False
+                    session.save()
+                    
+                    return JsonResponse({
+                        'message': message,
+                        'stage': 'completed',
+                        'end_session': True,
+                        'error': 'Insufficient balance'
+                    })
+                
+                wallet.withdraw(
+                    amount=base_amount,
+                    description=f'{network_name} Mobile Money withdrawal - {payment.transaction_reference}',
+                    payment_method=session.network
+                )
+                
+                payment.amount = total_amount
+                payment.platform_tax = tax_amount
+                payment.status = 'completed'
+                payment.completed_at = timezone.now()
+                payment.metadata['base_amount'] = str(base_amount)
+                payment.metadata['platform_tax'] = str(tax_amount)
+                payment.metadata['total'] = str(total_amount)
+                payment.save(update_fields=['amount', 'platform_tax', 'status', 'completed_at', 'metadata', 'updated_at'])
+                
+                SMSService.send_wallet_confirmation(
+                    phone_number=session.phone_number,
+                    amount=float(base_amount),
+                    tax_amount=float(tax_amount),
+                    total_amount=float(total_amount),
+                    balance=float(wallet.balance),
+                    action='withdraw',
+                    network=network_name,
+                    demo_mode=True
+                )
+                
+                message = f"✅ Withdrawal Successful!\n\n"
                 message += f"Amount: UGX {base_amount:,.0f}\n"
                 message += f"Tax (5%): UGX {tax_amount:,.0f}\n"
-                message += f"Total Paid: UGX {total_amount:,.0f}\n"
+                message += f"Total Cost: UGX {total_amount:,.0f}\n"
+                message += f"Sent to: {session.phone_number}\n"
                 message += f"New Balance: UGX {wallet.balance:,.0f}\n"
                 message += f"Payment: {network_name} MoMo\n\n"
-                message += f"SMS sent to {session.phone_number}\n\n"
+                message += f"SMS sent\n\n"
                 message += "Thank you!"
-            
-        elif action == 'withdraw':
-            if not wallet.can_withdraw(base_amount):
-                message = f"❌ Withdrawal Failed\n\n"
-                message += f"Insufficient balance or wallet locked.\n\n"
-                message += f"Available: UGX {wallet.balance:,.0f}"
-                
-                session.is_active = False
-                session.save()
-                
-                return JsonResponse({
-                    'message': message,
-                    'stage': 'completed',
-                    'end_session': True,
-                    'error': 'Insufficient balance'
-                })
-            
-            wallet.withdraw(
-                amount=base_amount,
-                description=f'{network_name} Mobile Money withdrawal - {payment.transaction_reference}',
-                payment_method=session.network
-            )
-            
-            payment.amount = total_amount
-            payment.platform_tax = tax_amount
-            payment.status = 'completed'
-            payment.completed_at = timezone.now()
-            payment.metadata['base_amount'] = str(base_amount)
-            payment.metadata['platform_tax'] = str(tax_amount)
-            payment.metadata['total'] = str(total_amount)
-            payment.save()
-            
-            SMSService.send_wallet_confirmation(
-                phone_number=session.phone_number,
-                amount=float(base_amount),
-                tax_amount=float(tax_amount),
-                total_amount=float(total_amount),
-                balance=float(wallet.balance),
-                action='withdraw',
-                network=network_name,
-                demo_mode=True
-            )
-            
-            message = f"✅ Withdrawal Successful!\n\n"
-            message += f"Amount: UGX {base_amount:,.0f}\n"
-            message += f"Tax (5%): UGX {tax_amount:,.0f}\n"
-            message += f"Total Cost: UGX {total_amount:,.0f}\n"
-            message += f"Sent to: {session.phone_number}\n"
-            message += f"New Balance: UGX {wallet.balance:,.0f}\n"
-            message += f"Payment: {network_name} MoMo\n\n"
-            message += f"SMS sent\n\n"
-            message += "Thank you!"
-        else:
-            message = "Invalid action"
+            else:
+                message = "Invalid action"
         
         session.stage = 'wallet_completed'
         session.is_active = False
@@ -11,11 +11,16 @@ from auctions.models import Item, Cart, CartItem
 from users.models import Wallet
 import uuid
 
+# Columns a payment page writes when it confirms a payment
+CONFIRMED_FIELDS = ['status', 'completed_at', 'metadata', 'updated_at']
+
 
 @login_required
 def card_payment_page(request, payment_id):
     """Display card payment form"""
-    payment = get_object_or_404(Payment, payment_id=payment_id, user=request.user, status='pending')
+    payment = get_object_or_404(
+        Payment, payment_id=payment_id, user=request.user, status__in=['pending_init', 'pending', 'failed']
+    )
     
     # Determine payment context and return URL
     payment_context = request.GET.get('context', 'checkout')
@@ -33,6 +38,12 @@ def card_payment_page(request, payment_id):
         cancel_url_name = 'checkout'
         payment_type = 'Purchase'
     
+    if payment.status == 'failed':
+        messages.error(request, f'Payment failed: {payment.provider_message}')
+        return redirect(cancel_url_name)
+    if payment.status == 'pending_init':
+        messages.info(request, 'We are still confirming this payment with the provider. You can submit it in a moment.')
+    
     # Extract tax info from metadata
     base_amount = payment.metadata.get('base_amount', str(payment.amount - payment.platform_tax))
     tax_amount = payment.platform_tax
@@ -70,17 +81,24 @@ def process_card_payment(request):
         messages.error(request, 'All fields are required.')
         return redirect('card_payment_page', payment_id=payment_id)
     
-    try:
-        payment = Payment.objects.get(payment_id=payment_id, user=request.user, status='pending')
-    except Payment.DoesNotExist:
-        messages.error(request, 'Payment not found or already processed.')
-        return redirect('home')
-    
-    # Extract amounts from metadata
-    base_amount = Decimal(payment.metadata.get('base_amount', str(payment.amount - payment.platform_tax)))
-    
     try:
         with db_transaction.atomic():
+            # Lock the payment so the background provider call cannot change it underneath us
+            try:
+                payment = Payment.objects.select_for_update().get(
+                    payment_id=payment_id, user=request.user, status__in=['pending_init', 'pending']
+                )
+            except Payment.DoesNotExist:
+                messages.error(request, 'Payment not found or already processed.')
+                return redirect('home')
+            
+            if payment.status == 'pending_init':
+                messages.info(request, 'We are still confirming this payment with the provider. Please try again in a moment.')
+                return redirect('card_payment_page', payment_id=payment_id)
+            
+            # Extract amounts from metadata
+            base_amount = Decimal(payment.metadata.get('base_amount', str(payment.amount - payment.platform_tax)))
+            
             if payment_context == 'wallet_deposit':
                 # Wallet deposit
                 wallet, created = Wallet.objects.get_or_create(user=request.user)
@@ -95,7 +113,7 @@ def process_card_payment(request):
                 payment.completed_at = timezone.now()
                 payment.metadata['card_last4'] = card_number[-4:]
                 payment.metadata['cardholder_name'] = cardholder_name
-                payment.save()
+                payment.save(update_fields=CONFIRMED_FIELDS)
                 
                 messages.success(request, f'Successfully deposited UGX {base_amount:,} to your wallet!')
                 messages.info(request, f'Transaction: Amount UGX {base_amount:,} + Tax (5%) UGX {payment.platform_tax:,} = Total UGX {payment.amount:,}')
@@ -114,7 +132,7 @@ def process_card_payment(request):
                 payment.completed_at = timezone.now()
                 payment.metadata['card_last4'] = card_number[-4:]
                 payment.metadata['cardholder_name'] = cardholder_name
-                payment.save()
+                payment.save(update_fields=CONFIRMED_FIELDS)
                 
                 messages.success(request, f'Successfully withdrew UGX {payment.amount:,} from your wallet!')
                 messages.info(request, f'Breakdown: Amount UGX {base_amount:,} + Tax (5%) UGX {payment.platform_tax:,} = Total UGX {payment.amount:,}')
@@ -135,7 +153,7 @@ def process_card_payment(request):
                 payment.completed_at = timezone.now()
                 payment.metadata['card_last4'] = card_number[-4:]
                 payment.metadata['cardholder_name'] = cardholder_name
-                payment.save()
+                payment.save(update_fields=CONFIRMED_FIELDS)
                 
                 cart_items.delete()
                 
@@ -144,8 +162,10 @@ def process_card_payment(request):
                 return redirect('home')
                 
     except Exception as e:
-        payment.status = 'failed'
-        payment.save()
+        Payment.objects.filter(payment_id=payment_id, user=request.user, status='pending').update(
+            status='failed',
+            updated_at=timezone.now()
+        )
         messages.error(request, f'Payment failed: {str(e)}')
         return redirect('checkout')
 
@@ -153,7 +173,9 @@ def process_card_payment(request):
 @login_required
 def paypal_login_page(request, payment_id):
     """Display PayPal login page"""
-    payment = get_object_or_404(Payment, payment_id=payment_id, user=request.user, status='pending')
+    payment = get_object_or_404(
+        Payment, payment_id=payment_id, user=request.user, status__in=['pending_init', 'pending', 'failed']
+    )
     
     # Determine payment context and return URL
     payment_context = request.GET.get('context', 'checkout')
@@ -171,6 +193,12 @@ def paypal_login_page(request, payment_id):
         cancel_url_name = 'checkout'
         payment_type = 'Purchase'
     
+    if payment.status == 'failed':
+        messages.error(request, f'Payment failed: {payment.provider_message}')
+        return redirect(cancel_url_name)
+    if payment.status == 'pending_init':
+        messages.info(request, 'We are still confirming this payment with the provider. You can submit it in a moment.')
+    
     # Extract tax info from metadata
     base_amount = payment.metadata.get('base_amount', str(payment.amount - payment.platform_tax))
     tax_amount = payment.platform_tax
@@ -205,17 +233,24 @@ def process_paypal_payment(request):
         messages.error(request, 'Email and password are required.')
         return redirect('paypal_login_page', payment_id=payment_id)
     
-    try:
-        payment = Payment.objects.get(payment_id=payment_id, user=request.user, status='pending')
-    except Payment.DoesNotExist:
-        messages.error(request, 'Payment not found or already processed.')
-        return redirect('home')
-    
-    # Extract amounts from metadata
-    base_amount = Decimal(payment.metadata.get('base_amount', str(payment.amount - payment.platform_tax)))
-    
     try:
         with db_transaction.atomic():
+            # Lock the payment so the background provider call cannot change it underneath us
+            try:
+                payment = Payment.objects.select_for_update().get(
+                    payment_id=payment_id, user=request.user, status__in=['pending_init', 'pending']
+                )
+            except Payment.DoesNotExist:
+                messages.error(request, 'Payment not found or already processed.')
+                return redirect('home')
+            
+            if payment.status == 'pending_init':
+                messages.info(request, 'We are still confirming this payment with the provider. Please try again in a moment.')
+                return redirect('paypal_login_page', payment_id=payment_id)
+            
+            # Extract amounts from metadata
+            base_amount = Decimal(payment.metadata.get('base_amount', str(payment.amount - payment.platform_tax)))
+            
             if payment_context == 'wallet_deposit':
                 # Wallet deposit
                 wallet, created = Wallet.objects.get_or_create(user=request.user)
@@ -229,7 +264,7 @@ def process_paypal_payment(request):
                 payment.status = 'completed'
                 payment.completed_at = timezone.now()
                 payment.metadata['paypal_email'] = email
-                payment.save()
+                payment.save(update_fields=CONFIRMED_FIELDS)
                 
                 messages.success(request, f'Successfully deposited UGX {base_amount:,} to your wallet!')
                 messages.info(request, f'Transaction: Amount UGX {base_amount:,} + Tax (5%) UGX {payment.platform_tax:,} = Total UGX {payment.amount:,}')
@@ -247,7 +282,7 @@ def process_paypal_payment(request):
                 payment.status = 'completed'
                 payment.completed_at = timezone.now()
                 payment.metadata['paypal_email'] = email
-                payment.save()
+                payment.save(update_fields=CONFIRMED_FIELDS)
                 
                 messages.success(request, f'Successfully withdrew UGX {payment.amount:,} from your wallet!')
                 messages.info(request, f'Breakdown: Amount UGX {base_amount:,} + Tax (5%) UGX {payment.platform_tax:,} = Total UGX {payment.amount:,}')
@@ -267,7 +302,7 @@ def process_paypal_payment(request):
                 payment.status = 'completed'
                 payment.completed_at = timezone.now()
                 payment.metadata['paypal_email'] = email
-                payment.save()
+                payment.save(update_fields=CONFIRMED_FIELDS)
                 
                 cart_items.delete()
                 
@@ -276,7 +311,9 @@ def process_paypal_payment(request):
                 return redirect('home')
                 
     except Exception as e:
-        payment.status = 'failed'
-        payment.save()
+        Payment.objects.filter(payment_id=payment_id, user=request.user, status='pending').update(
+            status='failed',
+            updated_at=timezone.now()
+        )
         messages.error(request, f'Payment failed: {str(e)}')
         return redirect('checkout')
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-16 19:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    UserProfile = apps.get_model('users', 'UserProfile')
+    Follow = apps.get_model('users', 'Follow')
+    Item = apps.get_model('auctions', 'Item')
+
+    def counted(queryset, key):
+        totals = queryset.order_by().values(key).annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(totals), 0)
+
+    UserProfile.objects.update(
+        follower_count=counted(Follow.objects.filter(following_id=OuterRef('user_id')), 'following_id'),
+        following_count=counted(Follow.objects.filter(follower_id=OuterRef('user_id')), 'follower_id'),
+        active_item_count=counted(Item.objects.filter(seller_id=OuterRef('user_id'), status='active'), 'seller_id'),
+        sold_item_count=counted(Item.objects.filter(seller_id=OuterRef('user_id'), status='sold'), 'seller_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_userprofile_bypass_account_age_check_and_more'),
+        ('auctions', '0013_itemimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='active_item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='follower_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='following_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='sold_item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
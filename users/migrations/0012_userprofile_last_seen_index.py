@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-16 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_userprofile_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_userprofile_last_seen_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['seller_status', '-seller_application_date'], name='users_userp_seller__a1bbe1_idx'),
+        ),
+    ]
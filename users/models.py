@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from decimal import Decimal
 from django.utils import timezone
@@ -33,6 +34,12 @@ class UserProfile(models.Model):
     rating_sum = models.IntegerField(default=0)
     rating_count = models.IntegerField(default=0)
     
+    # Denormalized counters, maintained by signals with F() updates
+    follower_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+    active_item_count = models.IntegerField(default=0)
+    sold_item_count = models.IntegerField(default=0)
+    
     mobile_money_number = models.CharField(max_length=20, blank=True)
     mobile_money_provider = models.CharField(max_length=20, blank=True, choices=[
         ('mtn', 'MTN Mobile Money'),
@@ -42,7 +49,7 @@ class UserProfile(models.Model):
     is_verified = models.BooleanField(default=False)
     verification_date = models.DateTimeField(null=True, blank=True)
     
-    last_seen = models.DateTimeField(null=True, blank=True)
+    last_seen = models.DateTimeField(null=True, blank=True, db_index=True)
     
     hide_phone_number = models.BooleanField(default=False)
     
@@ -101,9 +108,25 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    COUNTER_FIELDS = ('follower_count', 'following_count', 'active_item_count', 'sold_item_count')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['seller_status', '-seller_application_date']),
+        ]
+    
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
+    def save(self, *args, **kwargs):
+        # Never write back counters from a possibly stale instance; signals own them
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
     def average_rating(self):
         if self.rating_count == 0:
             return 0
@@ -125,9 +148,21 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    if hasattr(instance, 'profile'):
+    # Only a profile already loaded onto the user can carry unsaved changes
+    if User.profile.is_cached(instance):
         instance.profile.save()
 
+@receiver(post_save, sender=Follow)
+def increment_follow_counts(sender, instance, created, **kwargs):
+    if created:
+        UserProfile.objects.filter(user_id=instance.following_id).update(follower_count=F('follower_count') + 1)
+        UserProfile.objects.filter(user_id=instance.follower_id).update(following_count=F('following_count') + 1)
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_counts(sender, instance, **kwargs):
+    UserProfile.objects.filter(user_id=instance.following_id).update(follower_count=F('follower_count') - 1)
+    UserProfile.objects.filter(user_id=instance.follower_id).update(following_count=F('following_count') - 1)
+
 class Wallet(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wallet')
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
@@ -1,3 +1,32 @@
 from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from users.models import Follow, UserProfile
 
-# Create your tests here.
+
+class FollowCountTestCase(TestCase):
+    """Test that follower/following counters track Follow rows"""
+    
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='pass123')
+        self.buyer = User.objects.create_user(username='buyer', password='pass123')
+    
+    def counts(self, user):
+        return UserProfile.objects.values_list('follower_count', 'following_count').get(user=user)
+    
+    def test_follow_and_unfollow_update_counts(self):
+        """Test that following and unfollowing move both users' counters"""
+        self.client.login(username='buyer', password='pass123')
+        
+        self.client.post(reverse('follow_user', args=['seller']))
+        self.assertEqual(self.counts(self.seller), (1, 0))
+        self.assertEqual(self.counts(self.buyer), (0, 1))
+        
+        # Following again is a no-op
+        self.client.post(reverse('follow_user', args=['seller']))
+        self.assertEqual(self.counts(self.seller), (1, 0))
+        
+        self.client.post(reverse('unfollow_user', args=['seller']))
+        self.assertEqual(self.counts(self.seller), (0, 0))
+        self.assertEqual(self.counts(self.buyer), (0, 0))
+        self.assertFalse(Follow.objects.exists())
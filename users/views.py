@@ -6,7 +6,7 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.models import User
 from .forms import UserRegisterForm, UserLoginForm, ProfileUpdateForm
-from .models import Follow
+from .models import Follow, UserProfile
 
 def register_view(request):
     import secrets
@@ -221,8 +221,8 @@ def profile_view(request):
     
     try:
         cart = Cart.objects.get(user=user)
-        cart_items = cart.items.all()
-        cart_total = cart.total()
+        cart_items = list(cart.items.select_related('item'))
+        cart_total = cart.total(cart_items)
     except Cart.DoesNotExist:
         cart = None
         cart_items = []
@@ -237,8 +237,8 @@ def profile_view(request):
         item__status='active'
     ).select_related('item').order_by('-bid_time')[:5]
     
-    followers_count = user.followers.count()
-    following_count = user.following.count()
+    followers_count = user.profile.follower_count
+    following_count = user.profile.following_count
     
     followers_list = Follow.objects.filter(following=user).select_related('follower')[:10]
     following_list = Follow.objects.filter(follower=user).select_related('following')[:10]
@@ -295,7 +295,7 @@ def follow_user(request, username):
         return JsonResponse({
             'success': True,
             'following': True,
-            'followers_count': user_to_follow.followers.count()
+            'followers_count': UserProfile.objects.values_list('follower_count', flat=True).get(user=user_to_follow)
         })
     
     messages.success(request, f'You are now following {username}.')
@@ -315,7 +315,7 @@ def unfollow_user(request, username):
         return JsonResponse({
             'success': True,
             'following': False,
-            'followers_count': user_to_unfollow.followers.count()
+            'followers_count': UserProfile.objects.values_list('follower_count', flat=True).get(user=user_to_unfollow)
         })
     
     messages.success(request, f'You have unfollowed {username}.')
@@ -577,7 +577,7 @@ def seller_dashboard_view(request):
     active_items = my_items.filter(status='active')
     sold_items = my_items.filter(status='sold')
     
-    total_sales = sold_items.count()
+    total_sales = profile.sold_item_count
     total_revenue = Payment.objects.filter(
         item__seller=request.user,
         status='completed'
@@ -591,7 +591,7 @@ def seller_dashboard_view(request):
     net_revenue = total_revenue - platform_tax_paid
     
     total_items_listed = my_items.count()
-    active_listings = active_items.count()
+    active_listings = profile.active_item_count
     
     total_views = my_items.aggregate(Sum('views'))['views__sum'] or 0
     